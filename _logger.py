@@ -1,13 +1,21 @@
 import logging
+import logging.handlers
 import os
 import threading
 from datetime import datetime
+from queue import SimpleQueue
+
+# Обработчики, уже подключённые к логгерам: повторное создание CustomLogger их переиспользует
+_REGISTRY = {}
+_REGISTRY_LOCK = threading.Lock()
 
 
 class CustomLogger:
     """Кастомный логгер"""
 
-    def __init__(self, path_to_folder: str = None, flow_name: str = None, console_output: bool = True) -> None:
+    def __init__(self, path_to_folder: str = None, flow_name: str = None, console_output: bool = True,
+                 use_queue: bool = False, rotation: str = None, max_bytes: int = 10 * 1024 * 1024,
+                 backup_count: int = 7) -> None:
         """
         Инициализация параметров
 
@@ -15,6 +23,11 @@ class CustomLogger:
             path_to_folder (str, optional): путь до папки. Defaults to None.
             flow_name (str, optional): имя потока для логирования. Defaults to None.
             console_output (bool, optional): вывод информации в консоль (True or False). Defaults to True.
+            use_queue (bool, optional): потоки только кладут записи в очередь, а запись в файл и консоль
+                выполняет один фоновый поток. Defaults to False.
+            rotation (str, optional): ротация файла: 'size' - по размеру, 'time' - каждую полночь. Defaults to None.
+            max_bytes (int, optional): размер файла для ротации по размеру. Defaults to 10 МБ.
+            backup_count (int, optional): количество хранимых старых файлов при ротации. Defaults to 7.
         """
         self.name_folder = 'Log'
         self.current_day = datetime.now().strftime("%d.%m.%Y")
@@ -31,19 +44,43 @@ class CustomLogger:
             current_day_and_time = datetime.now().strftime("%d.%m.%Y")
             self.path_to_file = os.path.join(self.path_to_folder, f'{current_day_and_time}.log')
 
+        self.rotation = rotation
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
         self.log = logging.getLogger(self.path_to_file)
 
-        if not console_output:
-            self.console_handler = False
-        else:
-            self.console_handler = self._setting_for_log_formatter_console()
-            self.log.addHandler(self.console_handler)
+        with _REGISTRY_LOCK:
+            state = _REGISTRY.get(self.path_to_file)
+            if state is None:
+                state = self._attach_handlers(console_output=console_output, use_queue=use_queue)
+                _REGISTRY[self.path_to_file] = state
+            state['refs'] += 1
 
-        self.file_handler = self._setting_for_log_formatter_file()
-        self.log.addHandler(self.file_handler)
+        self.file_handler = state['file_handler']
+        self.console_handler = state['console_handler']
+        self.listener = state['listener']
 
         self.log.setLevel(logging.DEBUG)
 
+    def _attach_handlers(self, console_output: bool, use_queue: bool) -> dict:
+        """Создание обработчиков и подключение их к логгеру (напрямую или через очередь)"""
+
+        console_handler = self._setting_for_log_formatter_console() if console_output else False
+        file_handler = self._setting_for_log_formatter_file()
+        handlers = [handler for handler in (file_handler, console_handler) if handler]
+
+        listener = None
+        if use_queue:
+            records = SimpleQueue()
+            listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+            listener.start()
+            self.log.addHandler(logging.handlers.QueueHandler(records))
+        else:
+            for handler in handlers:
+                self.log.addHandler(handler)
+
+        return {'file_handler': file_handler, 'console_handler': console_handler, 'listener': listener, 'refs': 0}
+
     def _check_folder_for_log_file(self) -> None:
         """Создание директории для логирования"""
         if not os.path.exists(self.path_to_folder):
@@ -53,7 +90,14 @@ class CustomLogger:
         """Настройка для формата записи файла *.log"""
         file_formatter = logging.Formatter(
             '%(asctime)s - [%(levelname)s] - [%(filename)s] - %(funcName)s: (%(lineno)d) - %(message)s')
-        file_handler = logging.FileHandler(self.path_to_file, encoding='UTF-8')
+        if self.rotation == 'size':
+            file_handler = logging.handlers.RotatingFileHandler(self.path_to_file, maxBytes=self.max_bytes,
+                                                                backupCount=self.backup_count, encoding='UTF-8')
+        elif self.rotation == 'time':
+            file_handler = logging.handlers.TimedRotatingFileHandler(self.path_to_file, when='midnight',
+                                                                     backupCount=self.backup_count, encoding='UTF-8')
+        else:
+            file_handler = logging.FileHandler(self.path_to_file, encoding='UTF-8')
         file_handler.setFormatter(file_formatter)
 
         return file_handler
@@ -67,13 +111,28 @@ class CustomLogger:
         return console_handler
 
     def close_logger(self) -> None:
-        """Общее закрытие обработчиков (файл, консоль) и удаление их из логгера"""
-        self.file_handler.close()
-        self.log.removeHandler(self.file_handler)
+        """Общее закрытие обработчиков (файл, консоль) и удаление их из логгера.
+        Обработчики закрываются, когда закрыт последний CustomLogger с этим файлом"""
+        with _REGISTRY_LOCK:
+            state = _REGISTRY.get(self.path_to_file)
+            if state is None:
+                return
+            state['refs'] -= 1
+            if state['refs'] > 0:
+                return
+            del _REGISTRY[self.path_to_file]
+
+        if self.listener:
+            # Дописывает оставшиеся в очереди записи
+            self.listener.stop()
+
+        for handler in list(self.log.handlers):
+            self.log.removeHandler(handler)
+            handler.close()
 
+        self.file_handler.close()
         if self.console_handler:
             self.console_handler.close()
-            self.log.removeHandler(self.console_handler)
 
     def get_path_to_file_log(self) -> str:
         """Возвращает полный путь до файла логгера"""
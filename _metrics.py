@@ -0,0 +1,178 @@
+import json
+import math
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from time import perf_counter
+from typing import Callable, Iterator
+
+
+class MetricsRecorder:
+    """Замеры времени стадий и счётчики с записью в JSON lines"""
+
+    PERCENTILES = (50, 90, 99)
+
+    def __init__(self, path_to_file: str = None) -> None:
+        """
+        Инициализация параметров
+
+        :param path_to_file: Путь до файла *.jsonl. Если не задан, замеры копятся только в памяти
+        """
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._durations = defaultdict(list)
+        self._errors = defaultdict(int)
+        self._counters = defaultdict(int)
+        if path_to_file:
+            self.configure(path_to_file)
+
+    def configure(self, path_to_file: str) -> None:
+        """
+        Открытие файла для записи замеров
+
+        :param path_to_file: Путь до файла *.jsonl
+        """
+
+        with self._lock:
+            if self._file:
+                self._file.close()
+            self._file = open(path_to_file, 'a', encoding='utf-8')
+
+    def _write(self, event: dict) -> None:
+        """Запись события в файл (вызывается под блокировкой)"""
+
+        if self._file:
+            self._file.write(json.dumps(event, ensure_ascii=False) + '\n')
+            self._file.flush()
+
+    def record(self, name: str, seconds: float, error: str = None, **tags) -> None:
+        """
+        Запись готового замера (например, полученного из другого процесса)
+
+        :param name: Название замера
+        :param seconds: Длительность (в секундах)
+        :param error: Текст ошибки, если операция завершилась неудачно
+        :param tags: Метки замера (url, worker и т.п.)
+        """
+
+        tags.setdefault('worker', threading.current_thread().name)
+        event = {'ts': datetime.now().isoformat(timespec='milliseconds'), 'type': 'span', 'name': name,
+                 'seconds': round(seconds, 4), **tags}
+        if error:
+            event['error'] = error
+
+        with self._lock:
+            self._durations[name].append(seconds)
+            if error:
+                self._errors[name] += 1
+            self._write(event)
+
+    @contextmanager
+    def span(self, name: str, **tags) -> Iterator[None]:
+        """
+        Замер времени блока кода
+
+        :param name: Название замера
+        :param tags: Метки замера (url, worker и т.п.)
+        """
+
+        started = perf_counter()
+        try:
+            yield
+        except BaseException as ex_span:
+            self.record(name, perf_counter() - started, error=type(ex_span).__name__, **tags)
+            raise
+        self.record(name, perf_counter() - started, **tags)
+
+    def timed(self, name: str) -> Callable:
+        """
+        Декоратор для замера времени функции
+
+        :param name: Название замера
+        """
+
+        def decorator(func: Callable) -> Callable:
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def incr(self, name: str, value: int = 1, **tags) -> None:
+        """
+        Увеличение счётчика
+
+        :param name: Название счётчика
+        :param value: Прирост
+        :param tags: Метки события
+        """
+
+        tags.setdefault('worker', threading.current_thread().name)
+        with self._lock:
+            self._counters[name] += value
+            self._write({'ts': datetime.now().isoformat(timespec='milliseconds'), 'type': 'counter', 'name': name,
+                         'value': value, **tags})
+
+    @staticmethod
+    def _percentile(values: list, percent: float) -> float:
+        """Перцентиль по методу ближайшего ранга (values отсортирован)"""
+
+        rank = max(1, math.ceil(percent / 100 * len(values)))
+        return values[rank - 1]
+
+    def summary(self) -> dict:
+        """Сводка по всем замерам: количество, ошибки, перцентили и сумма времени"""
+
+        with self._lock:
+            durations = {name: sorted(values) for name, values in self._durations.items()}
+            errors = dict(self._errors)
+            counters = dict(self._counters)
+
+        spans = {}
+        for name, values in sorted(durations.items()):
+            spans[name] = {
+                'count': len(values),
+                'errors': errors.get(name, 0),
+                'total': round(sum(values), 3),
+                'max': round(values[-1], 3),
+                **{f'p{percent}': round(self._percentile(values, percent), 3) for percent in self.PERCENTILES},
+            }
+
+        return {'spans': spans, 'counters': counters}
+
+    def log_summary(self, log: object) -> dict:
+        """
+        Запись сводки в лог и в файл замеров
+
+        :param log: Объект логгера
+        :return: Сводка
+        """
+
+        summary = self.summary()
+        for name, stats in summary['spans'].items():
+            log.info(f'{name}: {stats["count"]} шт., p50 {stats["p50"]} с, p90 {stats["p90"]} с, '
+                     f'p99 {stats["p99"]} с, всего {stats["total"]} с, ошибок {stats["errors"]}')
+        for name, value in summary['counters'].items():
+            log.info(f'{name}: {value}')
+
+        with self._lock:
+            self._write({'ts': datetime.now().isoformat(timespec='milliseconds'), 'type': 'summary', **summary})
+
+        return summary
+
+    def close(self) -> None:
+        """Закрытие файла замеров"""
+
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+
+METRICS = MetricsRecorder()
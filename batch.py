@@ -0,0 +1,251 @@
+import json
+import threading
+from dataclasses import asdict, dataclass, replace
+from queue import Queue
+from typing import Iterator
+
+from _metrics import METRICS
+
+from catalog_api import WildberriesCatalogAPI
+from config import CONFIG, CONFIG_QUERIES, CONFIG_TV
+from ledger import RunLedger
+from link_collection import Wildberries
+from product_cards import CardWriter
+
+
+@dataclass(frozen=True)
+class Query:
+    """Поисковый запрос: бренд, диагональ и диапазон цен"""
+
+    brand_name: str
+    diagonal: str
+    price_start: str
+    price_end: str
+
+    @property
+    def key(self) -> str:
+        """Ключ запроса для журнала прогресса и отчёта"""
+        return f'{self.brand_name}|{self.diagonal}|{self.price_start}|{self.price_end}'
+
+    def params(self) -> dict:
+        """Параметры для сборщиков ссылок"""
+        return asdict(self)
+
+    @property
+    def price_width(self) -> int:
+        """Ширина диапазона цен (в рублях, включая границы)"""
+        return int(self.price_end) - int(self.price_start) + 1
+
+    def can_split(self) -> bool:
+        """Можно ли ещё разделить диапазон цен"""
+        return self.price_width >= 2 * CONFIG['shard_min_width']
+
+    def split(self, parts: int = 2) -> list['Query']:
+        """
+        Разделение запроса на подзапросы с соседними диапазонами цен
+
+        :param parts: Количество частей
+        :return: Список подзапросов, покрывающих весь исходный диапазон
+        """
+
+        parts = max(1, min(parts, self.price_width // CONFIG['shard_min_width']))
+        start = int(self.price_start)
+        step = self.price_width / parts
+        bounds = [start + round(step * number) for number in range(parts)] + [int(self.price_end) + 1]
+
+        return [replace(self, price_start=str(bounds[number]), price_end=str(bounds[number + 1] - 1))
+                for number in range(parts)]
+
+
+def load_queries(path_to_file: str = None) -> list[Query]:
+    """
+    Загрузка списка запросов из JSON файла, из CONFIG_QUERIES или из CONFIG_TV
+
+    :param path_to_file: Путь до JSON файла со списком запросов
+    :return: Список запросов без повторов
+    """
+
+    if path_to_file:
+        with open(path_to_file, encoding='utf-8') as file:
+            raw_queries = json.load(file)
+    else:
+        raw_queries = CONFIG_QUERIES or [CONFIG_TV]
+
+    queries = []
+    for raw_query in raw_queries:
+        query = Query(**{key: str(value) for key, value in raw_query.items()})
+        if query not in queries:
+            queries.append(query)
+
+    return queries
+
+
+def iter_query_cards(log: object, query: Query) -> Iterator[list]:
+    """
+    Постраничный сбор карточек товаров по запросу. Сначала через API каталога, при ошибке через браузер.
+
+    :param log: Объект логгера
+    :param query: Поисковый запрос
+    :return: Генератор списков карточек
+    """
+
+    params = dict(custom_logger=log, **query.params())
+
+    if CONFIG['catalog_collector'] == 'http':
+        try:
+            yield from WildberriesCatalogAPI(**params).iter_product_cards()
+            return
+        except Exception as ex_api:
+            log.info(f'Не смог собрать ссылки через API каталога, перехожу на браузер! Ошибка:\n{ex_api}')
+
+    yield from Wildberries(**params).iter_product_cards()
+
+
+class BatchCollector:
+    """
+    Одновременный сбор ссылок по нескольким запросам с общим потоком ссылок на выходе.
+    Диапазон цен каждого запроса делится на части, которые собираются параллельно. Если часть
+    оказывается слишком большой (больше shard_max_pages страниц), она делится пополам ещё раз
+    """
+
+    def __init__(self, custom_logger: object, ledger: RunLedger, queries: list[Query], workers: int = None,
+                 shards: int = None, path_to_cards: str = None) -> None:
+        """
+        Инициализация параметров
+
+        :param custom_logger: Объект логгера
+        :param ledger: Журнал прогресса
+        :param queries: Список запросов
+        :param workers: Количество частей запросов, собираемых одновременно
+        :param shards: На сколько частей по цене делится каждый запрос в начале
+        :param path_to_cards: Путь до файла *.csv или *.jsonl для карточек товаров. По умолчанию из config.py
+        """
+
+        self.log = custom_logger
+        self.ledger = ledger
+        self.queries = queries
+        self.workers = workers or CONFIG['query_workers']
+        self.shards = shards or CONFIG['price_shards']
+        self.path_to_cards = path_to_cards or CONFIG['path_to_cards']
+
+        self._batches = Queue(maxsize=CONFIG['queue_size'])
+        self._pending = Queue()
+        self._lock = threading.Lock()
+        self._remaining = {}
+        self._failed = set()
+
+    def _schedule(self, query: Query, shards: list[Query]) -> None:
+        """Постановка частей запроса в очередь (вызывается под блокировкой)"""
+
+        self._remaining[query.key] = self._remaining.get(query.key, 0) + len(shards)
+        for shard in shards:
+            self._pending.put((query, shard))
+
+    def _finish_shard(self, query: Query, failed: bool = False) -> None:
+        """Учёт законченной части. Последняя часть запроса отмечает запрос собранным"""
+
+        with self._lock:
+            if failed:
+                self._failed.add(query.key)
+            self._remaining[query.key] -= 1
+            if not self._remaining[query.key] and query.key not in self._failed:
+                self.ledger.mark_crawled(query.key)
+            if not any(self._remaining.values()):
+                for _ in range(self.workers):
+                    self._pending.put(None)
+
+    def _crawl_shard(self, query: Query, shard: Query) -> None:
+        """
+        Сбор ссылок по одной части запроса с пометкой ссылок ключом запроса
+
+        :param query: Исходный запрос
+        :param shard: Часть запроса с узким диапазоном цен
+        """
+
+        if self.ledger.is_crawled(shard.key):
+            return
+
+        self.log.info(f'Собираю ссылки по запросу {query.key}, цены {shard.price_start}-{shard.price_end}')
+        pages = iter_query_cards(self.log, shard)
+        try:
+            for page, cards in enumerate(pages, 1):
+                if page > CONFIG['shard_max_pages'] and shard.can_split():
+                    halves = shard.split()
+                    self.log.info(f'Цены {shard.price_start}-{shard.price_end}: больше {CONFIG["shard_max_pages"]} '
+                                  f'страниц, делю на {len(halves)} части')
+                    METRICS.incr('catalog.shard_split')
+                    with self._lock:
+                        self._schedule(query, halves)
+                    return
+
+                self.ledger.tag_urls([card['url'] for card in cards], query.key)
+                self._batches.put(cards)
+        finally:
+            pages.close()
+
+        METRICS.incr('catalog.shard_done')
+        self.ledger.mark_crawled(shard.key)
+
+    def _worker(self) -> None:
+        """Поток, забирающий части запросов по очереди"""
+
+        while True:
+            task = self._pending.get()
+            if task is None:
+                break
+
+            query, shard = task
+            try:
+                self._crawl_shard(query, shard)
+            except Exception as ex_query:
+                self.log.info(f'Не смог собрать ссылки по запросу {query.key}, цены {shard.price_start}-'
+                              f'{shard.price_end}! Ошибка:\n{ex_query}')
+                self._finish_shard(query, failed=True)
+            else:
+                self._finish_shard(query)
+
+        self._batches.put(None)
+
+    def iter_product_urls(self) -> Iterator[list]:
+        """
+        Ссылки со всех запросов по мере сбора без повторов между запросами и частями.
+        Карточки товаров с ценой, брендом, названием и рейтингом попутно пишутся в path_to_cards
+
+        :return: Генератор списков ссылок
+        """
+
+        with self._lock:
+            for query in self.queries:
+                if self.ledger.is_crawled(query.key):
+                    self.log.info(f'Ссылки по запросу {query.key} уже собраны, продолжаю с сохранённого места')
+                    continue
+                self._schedule(query, query.split(self.shards))
+            if not any(self._remaining.values()):
+                return
+
+        threads = [threading.Thread(target=self._worker, name=f'catalog-{number}', daemon=True)
+                   for number in range(1, self.workers + 1)]
+        for thread in threads:
+            thread.start()
+
+        writer = CardWriter(self.path_to_cards, keep_existing=True) if self.path_to_cards else None
+        seen_urls = set()
+        finished = 0
+        try:
+            while finished < self.workers:
+                cards = self._batches.get()
+                if cards is None:
+                    finished += 1
+                    continue
+
+                new_cards = [card for card in cards if card['url'] not in seen_urls]
+                seen_urls.update(card['url'] for card in new_cards)
+                if not new_cards:
+                    continue
+
+                if writer:
+                    writer.write(new_cards)
+                yield [card['url'] for card in new_cards]
+        finally:
+            if writer:
+                writer.close()
@@ -0,0 +1 @@
+"""Офлайн-бенчмарк робота на локальной копии Wildberries"""
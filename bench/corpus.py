@@ -0,0 +1,63 @@
+import os
+
+import fitz
+
+from other import create_folder
+
+FILLER_TEXT = ('Декларация о соответствии требованиям технического регламента Евразийского экономического союза. '
+               'Продукция изготовлена в соответствии с документацией изготовителя. ') * 8
+
+
+def certificate_contacts(product_id: int) -> tuple[str, str]:
+    """
+    Контакты заявителя, которые записываются в сертификат товара
+
+    :param product_id: id товара
+    :return: Номер телефона и email
+    """
+
+    return f'+7 (495) {product_id % 1000:03d}-{product_id % 100:02d}-{product_id % 97:02d}', f'seller{product_id}@example.ru'
+
+
+def build_certificate(product_id: int, pages: int = 3) -> bytes:
+    """
+    Генерация синтетического сертификата. Контакты стоят на последней странице,
+    чтобы разбор читал документ целиком
+
+    :param product_id: id товара
+    :param pages: Количество страниц
+    :return: Содержимое PDF
+    """
+
+    phone, email = certificate_contacts(product_id)
+    with fitz.open() as doc:
+        for page_number in range(pages):
+            page = doc.new_page()
+            html = f'<h3>Декларация ЕАЭС N RU Д-CN.РА01.В.{product_id:05d}/25</h3><p>{FILLER_TEXT}</p>'
+            if page_number == pages - 1:
+                html += (f'<p>Номер телефона</p><p>{phone}</p>'
+                         f'<p>Адрес электронной почты</p><p>{email}</p>')
+            page.insert_htmlbox(page.rect + (36, 36, -36, -36), html)
+
+        return doc.tobytes()
+
+
+def make_corpus(path_to_folder: str, product_ids: list, pages: int = 3) -> list:
+    """
+    Запись корпуса сертификатов на диск
+
+    :param path_to_folder: Директория для PDF
+    :param product_ids: id товаров
+    :param pages: Количество страниц в каждом сертификате
+    :return: Пути до созданных файлов
+    """
+
+    create_folder(path_to_folder)
+    paths = []
+    for product_id in product_ids:
+        path_to_file = os.path.join(path_to_folder, f'{product_id}.pdf')
+        with open(path_to_file, 'wb') as file:
+            file.write(build_certificate(product_id, pages=pages))
+        paths.append(path_to_file)
+
+    return paths
@@ -0,0 +1,238 @@
+"""
+Запуск: python -m bench.run_bench [--stages catalog_http,product_http,pdf,excel] [--products 60]
+
+Поднимает локальную копию сайта, прогоняет стадии робота и сохраняет замеры в bench/results
+"""
+import argparse
+import glob
+import json
+import os
+import subprocess
+import tempfile
+from datetime import datetime
+from functools import partial
+from time import perf_counter
+
+from _logger import CustomLogger
+from _metrics import METRICS
+from bench.corpus import make_corpus
+from bench.stub_site import CATALOG_PATH, StubSite
+from browser_pool import BrowserPool
+from catalog_api import WildberriesCatalogAPI
+from cert_fetcher import CertificateFetcher
+from config import CONFIG, CONFIG_BROWSER
+from link_collection import Wildberries
+from pars_data_product import WildberriesProduct
+from scheduler import WorkerScheduler
+from work_with_excel import ExcelReportWriter
+from work_with_pdf import extract_files
+
+PATH_TO_RESULTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+QUERY = dict(brand_name='Xiaomi', diagonal='40', price_start='1000', price_end='200000')
+ALL_STAGES = ('catalog_http', 'catalog_browser', 'product_http', 'product_browser', 'pdf', 'excel')
+
+
+def configure(site: StubSite, workdir: str, headless: bool) -> None:
+    """Перенаправление робота на локальный сайт и временные директории"""
+
+    CONFIG_BROWSER['headless'] = headless
+    CONFIG['path_to_save_pdf'] = os.path.join(workdir, 'data')
+    CONFIG['path_to_downloads'] = os.path.join(workdir, 'data', '.downloads')
+    CONFIG['catalog_api_url'] = f'{site.base_url}/api'
+    CONFIG['certificate_info_url'] = f'{site.base_url}/api/card?nm={{product_id}}'
+    CONFIG['product_url_template'] = f'{site.base_url}/catalog/{{product_id}}/detail.aspx'
+    WildberriesProduct.PATH_TO_SAVE_FILE = CONFIG['path_to_save_pdf']
+    Wildberries.MAIN_URL = f'{site.base_url}{CATALOG_PATH}'
+
+
+def measure(stage: str, func, *args) -> dict:
+    """
+    Замер одной стадии
+
+    :param stage: Название стадии
+    :param func: Функция стадии, возвращающая количество обработанных элементов
+    :return: Результат замера
+    """
+
+    started = perf_counter()
+    items = func(*args)
+    seconds = perf_counter() - started
+
+    return {
+        'stage': stage,
+        'items': items,
+        'seconds': round(seconds, 3),
+        'items_per_minute': round(items / seconds * 60, 1) if seconds else None,
+    }
+
+
+def stage_catalog_http(log: object, site: StubSite, workdir: str) -> int:
+    """Сбор ссылок через API каталога"""
+
+    return sum(len(batch) for batch in WildberriesCatalogAPI(custom_logger=log, **QUERY).iter_product_urls())
+
+
+def stage_catalog_browser(log: object, site: StubSite, workdir: str) -> int:
+    """Сбор ссылок через браузер"""
+
+    return sum(len(batch) for batch in Wildberries(custom_logger=log, **QUERY).iter_product_urls())
+
+
+def stage_product_http(log: object, site: StubSite, workdir: str) -> int:
+    """Скачивание сертификатов по HTTP"""
+
+    urls = [WildberriesCatalogAPI.product_url(product_id) for product_id in site.product_ids]
+    fetcher = CertificateFetcher(custom_logger=log, path_to_folder=os.path.join(workdir, 'http'))
+    fetcher.fetch_all(urls)
+    return len(urls)
+
+
+def _process_in_browser(url: str, log: object, pool: BrowserPool) -> str | None:
+    """Обработка товара в браузере из пула"""
+
+    with pool.session(owner=url) as session:
+        return WildberriesProduct(custom_logger=log, url=url, driver=session.driver,
+                                  download_dir=session.download_dir).get_data()
+
+
+def stage_product_browser(log: object, site: StubSite, workdir: str) -> int:
+    """Обработка страниц товаров в браузерах"""
+
+    urls = [WildberriesCatalogAPI.product_url(product_id) for product_id in site.product_ids]
+    pool = BrowserPool(driver_factory=WildberriesProduct.create_driver, size=CONFIG['browser_pool_size'],
+                       max_uses=CONFIG['browser_max_uses'], custom_logger=log,
+                       download_root=CONFIG['path_to_downloads'])
+    try:
+        results = WorkerScheduler(func=partial(_process_in_browser, log=log, pool=pool), workers=CONFIG['workers'],
+                                  task_timeout=CONFIG['task_timeout'], custom_logger=log,
+                                  on_timeout=pool.abort).map(urls)
+    finally:
+        pool.close()
+
+    failed = [result for result in results if not result.ok]
+    if failed:
+        log.info(f'Товаров с ошибкой: {len(failed)}')
+    return len(results)
+
+
+def prepare_pdf(site: StubSite, workdir: str, corpus_size: int = 100) -> list:
+    """Запись корпуса сертификатов до замера: генерация PDF не должна попадать во время разбора"""
+
+    return make_corpus(os.path.join(workdir, 'corpus'), site.product_ids[:corpus_size], pages=site.certificate_pages)
+
+
+def stage_pdf(log: object, site: StubSite, workdir: str, paths: list) -> int:
+    """Разбор корпуса сертификатов, подготовленного prepare_pdf"""
+
+    extract_files(paths, workers=CONFIG['pdf_workers'])
+    return len(paths)
+
+
+def stage_excel(log: object, site: StubSite, workdir: str, rows: int = 5000) -> int:
+    """Запись отчёта"""
+
+    with ExcelReportWriter(path_to_file=os.path.join(workdir, 'result.xlsx')) as report:
+        for number in range(rows):
+            report.add_row([f'+7 (495) 000-{number % 100:02d}-{number % 97:02d}', f'seller{number}@example.ru'])
+    return rows
+
+
+STAGES = {
+    'catalog_http': stage_catalog_http,
+    'catalog_browser': stage_catalog_browser,
+    'product_http': stage_product_http,
+    'product_browser': stage_product_browser,
+    'pdf': stage_pdf,
+    'excel': stage_excel,
+}
+
+# Подготовка данных стадии вне замера. Результат передаётся стадии последним аргументом
+PREPARE = {
+    'pdf': prepare_pdf,
+}
+
+
+def current_commit() -> str:
+    """Короткий хеш текущего коммита"""
+
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def previous_results() -> dict:
+    """Замеры последнего сохранённого запуска по стадиям"""
+
+    files = sorted(glob.glob(os.path.join(PATH_TO_RESULTS, '*.json')))
+    if not files:
+        return {}
+
+    with open(files[-1], encoding='utf-8') as file:
+        return {stage['stage']: stage for stage in json.load(file)['stages']}
+
+
+def save_results(stages: list, params: dict, spans: dict) -> str:
+    """Сохранение замеров для сравнения между коммитами"""
+
+    os.makedirs(PATH_TO_RESULTS, exist_ok=True)
+    commit = current_commit()
+    path_to_file = os.path.join(PATH_TO_RESULTS, f'{datetime.now():%Y%m%d_%H%M%S}_{commit}.json')
+    with open(path_to_file, 'w', encoding='utf-8') as file:
+        json.dump({'commit': commit, 'created_at': datetime.now().isoformat(timespec='seconds'), 'params': params,
+                   'stages': stages, 'spans': spans}, file, ensure_ascii=False, indent=2)
+
+    return path_to_file
+
+
+def print_report(stages: list, previous: dict) -> None:
+    """Вывод таблицы замеров со сравнением с прошлым запуском"""
+
+    print(f'{"Стадия":<18}{"Элементов":>10}{"Секунд":>10}{"В минуту":>12}{"Было":>12}')
+    for stage in stages:
+        before = previous.get(stage['stage'], {}).get('items_per_minute')
+        print(f'{stage["stage"]:<18}{stage["items"]:>10}{stage["seconds"]:>10}{stage["items_per_minute"]!s:>12}'
+              f'{before if before is not None else "-"!s:>12}')
+
+
+def main() -> None:
+    """Запуск бенчмарка"""
+
+    parser = argparse.ArgumentParser(description='Офлайн-бенчмарк робота Wildberries')
+    parser.add_argument('--stages', default=','.join(ALL_STAGES), help='Стадии через запятую')
+    parser.add_argument('--products', type=int, default=60, help='Количество товаров в каталоге')
+    parser.add_argument('--per-page', type=int, default=20, help='Товаров на странице каталога')
+    parser.add_argument('--certificate-every', type=int, default=10, help='Сертификат у каждого N-го товара')
+    parser.add_argument('--pdf-pages', type=int, default=3, help='Страниц в сертификате')
+    parser.add_argument('--headed', action='store_true', help='Показывать окна браузера')
+    args = parser.parse_args()
+
+    stages = [stage for stage in args.stages.split(',') if stage]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f'Неизвестные стадии: {", ".join(sorted(unknown))}')
+
+    workdir = tempfile.mkdtemp(prefix='wb_bench_')
+    logger = CustomLogger(path_to_folder=workdir, console_output=False, use_queue=True)
+    log = logger.start_initialization()
+    METRICS.configure(os.path.join(workdir, 'metrics.jsonl'))
+
+    results = []
+    with StubSite(products=args.products, per_page=args.per_page, certificate_every=args.certificate_every,
+                  certificate_pages=args.pdf_pages) as site:
+        configure(site, workdir, headless=not args.headed)
+        for stage in stages:
+            prepared = (PREPARE[stage](site, workdir),) if stage in PREPARE else ()
+            results.append(measure(stage, STAGES[stage], log, site, workdir, *prepared))
+
+    previous = previous_results()
+    path_to_file = save_results(results, vars(args), METRICS.summary())
+    METRICS.close()
+    logger.close_logger()
+    print_report(results, previous)
+    print(f'Замеры сохранены: {path_to_file}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,336 @@
+import json
+import threading
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from bench.corpus import build_certificate
+
+CATALOG_PATH = '/catalog/televizory'
+BRANDS = ('Xiaomi', 'Samsung', 'LG', 'Haier', 'TCL', 'Hisense')
+DIAGONALS = ('32"', '40"', '43"', '50"', '55"', '65"')
+
+STYLE = '''
+<style>
+  body { font-family: sans-serif; }
+  .checkbox-with-text__decor { display: inline-block; width: 14px; height: 14px; border: 1px solid #333; margin-right: 4px; }
+  .product-card { display: block; height: 120px; margin: 8px; border: 1px solid #ccc; }
+  .hidden { display: none; }
+</style>
+'''
+
+CATALOG_PAGE = '''<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Телевизоры</title>{style}</head><body>
+<button class="dropdown-filter j-show-all-filtres">Все фильтры</button>
+<div class="dropdown-filter__btn dropdown-filter__btn--priceU">Цена</div>
+<div id="filters" class="hidden">
+  <input class="j-price" name="startN" value="">
+  <input class="j-price" name="endN" value="">
+  <div class="not-found-result"></div>
+  <div class="filters-desktop__item j-filter-container filters-desktop__item--type-6 filters-desktop__item--fbrand open show">
+    <span>Бренд</span>
+    <button class="filter__show-all j-show-whole-filters">Показать все</button>
+    <input class="j-search-filter hidden" value="">
+    <ul class="filter__list">{brands}</ul>
+  </div>
+  <div class="filters-desktop__item j-filter-container filters-desktop__item--type-1 filters-desktop__item--f92740 open show">
+    <span>Диагональ</span>
+    <ul class="filter__list">{diagonals}</ul>
+  </div>
+  <button class="filters-desktop__btn-main btn-main">Показать</button>
+</div>
+<script>
+  const brands = {brand_names};
+  const brandList = document.querySelector('.filters-desktop__item--fbrand .filter__list');
+  const searchInput = document.querySelector('.j-search-filter');
+  function renderBrands(names) {{
+    brandList.innerHTML = names.map(name =>
+      '<li class="filter__item"><span class="checkbox-with-text__decor"></span>' + name + '</li>').join('');
+  }}
+  document.querySelector('.j-show-all-filtres').addEventListener('click', () => {{
+    document.getElementById('filters').classList.remove('hidden');
+  }});
+  document.querySelector('.j-show-whole-filters').addEventListener('click', () => {{
+    searchInput.classList.remove('hidden');
+  }});
+  searchInput.addEventListener('input', () => {{
+    const query = searchInput.value.toLowerCase();
+    setTimeout(() => renderBrands(brands.filter(name => name.toLowerCase().startsWith(query))), 50);
+  }});
+  document.querySelector('.btn-main').addEventListener('click', () => {{
+    location.href = '{catalog_path}/results?page=1';
+  }});
+</script>
+</body></html>'''
+
+RESULTS_PAGE = '''<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Телевизоры - страница {page}</title>{style}</head><body>
+{cards}
+{next_page}
+</body></html>'''
+
+PRODUCT_PAGE = '''<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Товар {product_id}</title>{style}</head><body>
+<h1>Телевизор {product_id}</h1>
+<button class="product-page__btn-detail hide-mobile j-details-btn-desktop">Все характеристики и описание</button>
+<div id="details" class="hidden">
+  {certificate}
+  <div id="popup" class="hidden">
+    <a class="popup__step-link" href="/cert/{product_id}" target="_blank">Перейти к документу</a>
+  </div>
+</div>
+<script>
+  document.querySelector('.j-details-btn-desktop').addEventListener('click', () => {{
+    document.getElementById('details').classList.remove('hidden');
+  }});
+  const certificate = document.querySelector('.btn-certificate');
+  if (certificate) {{
+    certificate.addEventListener('click', () => document.getElementById('popup').classList.remove('hidden'));
+  }}
+</script>
+</body></html>'''
+
+CERTIFICATE_PAGE = '''<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Сертификат {product_id}</title></head><body>
+<a class="btn btn_accent btn-download-pdf" href="/cert/{product_id}.pdf">Скачать PDF</a>
+</body></html>'''
+
+
+@lru_cache(maxsize=None)
+def _certificate_bytes(product_id: int, pages: int) -> bytes:
+    """Сгенерированный сертификат товара (генерируется один раз)"""
+    return build_certificate(product_id, pages=pages)
+
+
+class StubSite:
+    """Локальная копия Wildberries с теми же селекторами, что используют роботы"""
+
+    FIRST_PRODUCT_ID = 100000
+
+    def __init__(self, products: int = 60, per_page: int = 20, certificate_every: int = 10,
+                 certificate_pages: int = 3, host: str = '127.0.0.1', port: int = 0) -> None:
+        """
+        Инициализация параметров
+
+        :param products: Количество товаров в каталоге
+        :param per_page: Количество товаров на странице каталога
+        :param certificate_every: Сертификат есть у каждого N-го товара
+        :param certificate_pages: Количество страниц в сертификате
+        :param host: Адрес сервера
+        :param port: Порт сервера (0 - любой свободный)
+        """
+
+        self.product_ids = [self.FIRST_PRODUCT_ID + number for number in range(products)]
+        self.per_page = per_page
+        self.certificate_every = certificate_every
+        self.certificate_pages = certificate_pages
+
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        """Адрес запущенного сервера"""
+
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def pages(self) -> int:
+        """Количество страниц каталога"""
+        return max(1, -(-len(self.product_ids) // self.per_page))
+
+    def has_certificate(self, product_id: int) -> bool:
+        """Есть ли у товара сертификат"""
+        return (product_id - self.FIRST_PRODUCT_ID) % self.certificate_every == 0
+
+    def certificate_flag(self, product_id: int) -> bool | None:
+        """Признак проверенных документов в карточке товара. У товаров без сертификата с чётным id
+        признак равен False, у остальных его нет: по такой карточке нельзя судить о документах"""
+
+        if self.has_certificate(product_id):
+            return True
+        return False if product_id % 2 == 0 else None
+
+    @staticmethod
+    def price(product_id: int) -> int:
+        """Цена товара (в рублях)"""
+        return 10000 + product_id % 1000 * 100
+
+    @staticmethod
+    def brand(product_id: int) -> str:
+        """Бренд товара"""
+        return BRANDS[product_id % len(BRANDS)]
+
+    @staticmethod
+    def diagonal(product_id: int) -> str:
+        """Диагональ экрана товара"""
+        return DIAGONALS[product_id // len(BRANDS) % len(DIAGONALS)]
+
+    def page_products(self, page: int, product_ids: list = None) -> list:
+        """
+        id товаров на странице каталога
+
+        :param page: Номер страницы
+        :param product_ids: Отфильтрованные товары. По умолчанию весь каталог
+        """
+
+        product_ids = self.product_ids if product_ids is None else product_ids
+        start = (page - 1) * self.per_page
+        return product_ids[start:start + self.per_page] if page >= 1 else []
+
+    def filter_products(self, price: str = None, brand: str = None, diagonal: str = None) -> list:
+        """
+        Товары, подходящие под фильтры API каталога
+
+        :param price: Диапазон цен в формате API: 'min;max' в копейках
+        :param brand: id бренда из api_filters
+        :param diagonal: id диагонали из api_filters
+        :return: Список id товаров
+        """
+
+        price_min, price_max = (int(value) for value in price.split(';')) if price else (0, float('inf'))
+        brand_name = BRANDS[int(brand) - 1] if brand else None
+        diagonal_name = DIAGONALS[int(diagonal) - 1] if diagonal else None
+
+        return [product_id for product_id in self.product_ids
+                if price_min <= self.price(product_id) * 100 <= price_max
+                and brand_name in (None, self.brand(product_id))
+                and diagonal_name in (None, self.diagonal(product_id))]
+
+    def start(self) -> 'StubSite':
+        """Запуск сервера в фоновом потоке"""
+
+        self._thread = threading.Thread(target=self._server.serve_forever, name='stub-site', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Остановка сервера"""
+
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'StubSite':
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.stop()
+
+    def _make_handler(self) -> type:
+        """Обработчик запросов, привязанный к этому сайту"""
+
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args) -> None:
+                pass
+
+            def _send(self, body: bytes, content_type: str, headers: dict = None) -> None:
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_html(self, html: str) -> None:
+                self._send(html.encode('utf-8'), 'text/html; charset=utf-8')
+
+            def _send_json(self, data: dict) -> None:
+                self._send(json.dumps(data).encode('utf-8'), 'application/json')
+
+            def do_GET(self) -> None:
+                url = urlsplit(self.path)
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+                parts = [part for part in url.path.split('/') if part]
+
+                if url.path == CATALOG_PATH:
+                    return self._send_html(site.render_catalog())
+                if url.path == f'{CATALOG_PATH}/results':
+                    return self._send_html(site.render_results(int(query.get('page', 1))))
+                if len(parts) == 3 and parts[0] == 'catalog' and parts[2] == 'detail.aspx':
+                    return self._send_html(site.render_product(int(parts[1])))
+                if len(parts) == 2 and parts[0] == 'cert' and parts[1].endswith('.pdf'):
+                    product_id = int(parts[1][:-4])
+                    return self._send(_certificate_bytes(product_id, site.certificate_pages), 'application/pdf',
+                                      {'Content-Disposition': f'attachment; filename="certificate_{product_id}.pdf"'})
+                if len(parts) == 2 and parts[0] == 'cert':
+                    return self._send_html(CERTIFICATE_PAGE.format(product_id=int(parts[1])))
+                if url.path == '/api/v4/filters':
+                    return self._send_json(site.api_filters())
+                if url.path == '/api/v2/catalog':
+                    return self._send_json(site.api_catalog(int(query.get('page', 1)), price=query.get('priceU'),
+                                                            brand=query.get('fbrand'),
+                                                            diagonal=query.get('f92740')))
+                if url.path == '/api/card':
+                    return self._send_json(site.api_card(int(query.get('nm', 0))))
+
+                self.send_error(404)
+
+        return Handler
+
+    def render_catalog(self) -> str:
+        """Страница каталога с панелью фильтров"""
+
+        item = '<li class="filter__item"><span class="checkbox-with-text__decor"></span>{}</li>'
+        return CATALOG_PAGE.format(style=STYLE, catalog_path=CATALOG_PATH, brand_names=json.dumps(BRANDS),
+                                   brands=''.join(item.format(name) for name in BRANDS),
+                                   diagonals=''.join(item.format(name) for name in DIAGONALS))
+
+    def render_results(self, page: int) -> str:
+        """Страница с карточками товаров и переходом на следующую страницу"""
+
+        cards = ''.join(
+            f'<article class="product-card" data-nm-id="{product_id}">'
+            f'<a class="j-card-link" href="/catalog/{product_id}/detail.aspx">Телевизор {product_id}</a>'
+            f'<ins class="price__lower-price">{self.price(product_id)} ₽</ins>'
+            f'<span class="product-card__brand">{self.brand(product_id)}</span>'
+            f'<span class="product-card__name"> / Телевизор {product_id}</span>'
+            f'<span class="address-rate-mini">4.{product_id % 10}</span></article>'
+            for product_id in self.page_products(page))
+        next_page = ''
+        if page < self.pages:
+            next_page = (f'<a class="pagination-next pagination__next j-next-page" '
+                         f'href="{CATALOG_PATH}/results?page={page + 1}">Следующая страница</a>')
+
+        return RESULTS_PAGE.format(style=STYLE, page=page, cards=cards, next_page=next_page)
+
+    def render_product(self, product_id: int) -> str:
+        """Страница товара с кнопкой 'Документы проверены' или без неё"""
+
+        certificate = '<button class="btn-certificate">Документы проверены</button>' \
+            if self.has_certificate(product_id) else ''
+        return PRODUCT_PAGE.format(style=STYLE, product_id=product_id, certificate=certificate)
+
+    @staticmethod
+    def api_filters() -> dict:
+        """Ответ API фильтров каталога"""
+
+        return {'data': {'filters': [
+            {'key': 'fbrand', 'items': [{'id': number, 'name': name} for number, name in enumerate(BRANDS, 1)]},
+            {'key': 'f92740', 'items': [{'id': number, 'name': name} for number, name in enumerate(DIAGONALS, 1)]},
+        ]}}
+
+    def api_catalog(self, page: int, price: str = None, brand: str = None, diagonal: str = None) -> dict:
+        """Ответ API каталога с учётом фильтров priceU, fbrand и f92740 (см. filter_products)"""
+
+        product_ids = self.filter_products(price=price, brand=brand, diagonal=diagonal)
+        return {'data': {'products': [
+            {'id': product_id, 'brand': self.brand(product_id), 'name': f'Телевизор {product_id}',
+             'salePriceU': self.price(product_id) * 100, 'reviewRating': float(f'4.{product_id % 10}')}
+            for product_id in self.page_products(page, product_ids)
+        ]}}
+
+    def api_card(self, product_id: int) -> dict:
+        """Ответ API карточки товара"""
+
+        product = {'id': product_id}
+        if self.has_certificate(product_id):
+            product['certificate'] = {'verified': True, 'url': f'/cert/{product_id}.pdf'}
+        elif self.certificate_flag(product_id) is False:
+            product['hasCertificate'] = False
+
+        return {'data': {'products': [product]}}
@@ -0,0 +1,84 @@
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+from config import CONFIG_BROWSER
+from other import create_folder
+
+# Шаблоны URL для блокируемых типов ресурсов. CDP блокирует запросы только по URL,
+# поэтому типы ресурсов переводятся в расширения файлов
+RESOURCE_TYPE_PATTERNS = {
+    'image': ('*.jpg', '*.jpeg', '*.png', '*.gif', '*.webp', '*.avif', '*.svg', '*.ico'),
+    'media': ('*.mp4', '*.webm', '*.m3u8', '*.ts', '*.mp3'),
+    'font': ('*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot'),
+}
+
+
+def blocked_url_patterns(profile: dict) -> list:
+    """
+    Список шаблонов URL, которые браузер не будет загружать
+
+    :param profile: Настройки профиля браузера
+    """
+
+    patterns = []
+    for resource_type in profile['blocked_resource_types']:
+        patterns.extend(RESOURCE_TYPE_PATTERNS.get(resource_type, ()))
+    patterns.extend(profile['blocked_url_patterns'])
+
+    return patterns
+
+
+def build_options(profile: dict, download_dir: str = None) -> Options:
+    """
+    Настройки запуска Chrome по профилю
+
+    :param profile: Настройки профиля браузера
+    :param download_dir: Директория загрузок
+    """
+
+    options = Options()
+    if profile['headless']:
+        options.add_argument("--headless=new")
+        options.add_argument(f"--window-size={profile['window_size']}")
+    else:
+        options.add_argument("--start-maximized")
+
+    options.page_load_strategy = profile['page_load_strategy']
+    for argument in profile['extra_arguments']:
+        options.add_argument(argument)
+
+    prefs = {}
+    if 'image' in profile['blocked_resource_types']:
+        prefs["profile.managed_default_content_settings.images"] = 2
+    if download_dir:
+        create_folder(download_dir)
+        prefs.update({
+            "download.default_directory": download_dir,
+            "download.prompt_for_download": False,
+            "download.directory_upgrade": True,
+            "safebrowsing.enabled": True
+        })
+    if prefs:
+        options.add_experimental_option("prefs", prefs)
+
+    return options
+
+
+def create_chrome(download_dir: str = None, **overrides) -> webdriver.Chrome:
+    """
+    Запуск Chrome с общим облегчённым профилем для обоих роботов
+
+    :param download_dir: Директория загрузок
+    :param overrides: Настройки, заменяющие значения из CONFIG_BROWSER
+    :return: Объект webdriver
+    """
+
+    profile = {**CONFIG_BROWSER, **overrides}
+    driver = webdriver.Chrome(options=build_options(profile, download_dir=download_dir))
+
+    patterns = blocked_url_patterns(profile)
+    if patterns:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+
+    return driver
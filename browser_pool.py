@@ -0,0 +1,261 @@
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from queue import Empty, Queue
+from typing import Callable, Iterator
+
+from selenium.common.exceptions import (NoSuchElementException, StaleElementReferenceException, TimeoutException,
+                                        WebDriverException)
+
+from downloads import clear_folder
+from other import create_folder
+
+
+class BrowserSession:
+    """Долгоживущая сессия браузера, выдаваемая пулом"""
+
+    def __init__(self, driver: object, session_id: int, download_dir: str = None) -> None:
+        """
+        Инициализация параметров
+
+        :param driver: Объект webdriver
+        :param session_id: Порядковый номер сессии в пуле
+        :param download_dir: Собственная директория загрузок сессии
+        """
+
+        self.driver = driver
+        self.session_id = session_id
+        self.download_dir = download_dir
+        self.uses = 0
+        self.broken = False
+
+
+class BrowserPool:
+    """Пул переиспользуемых сессий Chrome для обработки товаров"""
+
+    BLANK_PAGE = 'about:blank'
+    # Ошибки ожидания элементов на странице: браузер при этом исправен и возвращается в пул
+    PAGE_ERRORS = (TimeoutException, NoSuchElementException, StaleElementReferenceException)
+
+    def __init__(self, driver_factory: Callable[[str | None], object], size: int, max_uses: int,
+                 custom_logger: object = None, download_root: str = None) -> None:
+        """
+        Инициализация параметров
+
+        :param driver_factory: Функция, создающая новый webdriver. Принимает директорию загрузок сессии
+        :param size: Максимальное количество одновременно открытых браузеров
+        :param max_uses: Количество товаров, после которого сессия пересоздаётся
+        :param custom_logger: Объект логгера
+        :param download_root: Директория, внутри которой каждая сессия получает свою временную папку загрузок
+        """
+
+        if size < 1:
+            raise ValueError('Размер пула браузеров должен быть больше 0')
+
+        self.driver_factory = driver_factory
+        self.size = size
+        self.max_uses = max_uses
+        self.log = custom_logger
+        self.download_root = download_root
+
+        self._idle = Queue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._sessions = set()
+        self._owners = {}
+        self._counter = 0
+        self._closed = False
+
+    def _log_info(self, message: str) -> None:
+        """Запись сообщения в лог, если логгер передан"""
+
+        if self.log:
+            self.log.info(message)
+
+    def _new_session(self) -> BrowserSession:
+        """Запуск нового браузера"""
+
+        download_dir = None
+        if self.download_root:
+            create_folder(self.download_root)
+            download_dir = tempfile.mkdtemp(prefix='session_', dir=self.download_root)
+
+        try:
+            driver = self.driver_factory(download_dir)
+        except Exception:
+            if download_dir:
+                shutil.rmtree(download_dir, ignore_errors=True)
+            raise
+
+        with self._lock:
+            self._counter += 1
+            session = BrowserSession(driver=driver, session_id=self._counter, download_dir=download_dir)
+            self._sessions.add(session)
+
+        self._log_info(f'Запущен браузер №{session.session_id}')
+        return session
+
+    def _destroy(self, session: BrowserSession) -> None:
+        """Закрытие браузера и удаление сессии из пула"""
+
+        with self._lock:
+            self._sessions.discard(session)
+
+        try:
+            session.driver.quit()
+        except Exception as ex_quit:
+            self._log_info(f'Не смог корректно закрыть браузер №{session.session_id}! Ошибка:\n{ex_quit}')
+
+        if session.download_dir:
+            shutil.rmtree(session.download_dir, ignore_errors=True)
+
+    def _is_alive(self, session: BrowserSession) -> bool:
+        """Отвечает ли браузер сессии"""
+
+        try:
+            session.driver.window_handles
+            return True
+        except Exception as ex_probe:
+            self._log_info(f'Браузер №{session.session_id} не отвечает! Ошибка:\n{ex_probe}')
+            return False
+
+    def _reset(self, session: BrowserSession) -> bool:
+        """
+        Сброс состояния сессии между товарами: закрытие лишних вкладок, переход на пустую страницу
+        и очистка директории загрузок от недокачанных файлов
+
+        :param session: Сессия браузера
+        :return: True, если сессия пригодна для дальнейшей работы
+        """
+
+        driver = session.driver
+        try:
+            handles = driver.window_handles
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(handles[0])
+            driver.get(self.BLANK_PAGE)
+
+        except WebDriverException as ex_reset:
+            self._log_info(f'Браузер №{session.session_id} не отвечает, пересоздаю его! Ошибка:\n{ex_reset}')
+            return False
+
+        if session.download_dir:
+            try:
+                clear_folder(session.download_dir)
+            except OSError as ex_clear:
+                self._log_info(f'Не смог очистить папку загрузок браузера №{session.session_id}! Ошибка:\n{ex_clear}')
+                return False
+
+        return True
+
+    def acquire(self, timeout: float = None) -> BrowserSession:
+        """
+        Получение свободной сессии из пула
+
+        :param timeout: Максимальное время ожидания свободной сессии (в секундах)
+        :return: Сессия браузера
+        """
+
+        if self._closed:
+            raise RuntimeError('Пул браузеров уже закрыт')
+
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError('Истекло время ожидания свободного браузера')
+
+        try:
+            try:
+                session = self._idle.get_nowait()
+            except Empty:
+                session = self._new_session()
+        except Exception:
+            self._slots.release()
+            raise
+
+        session.uses += 1
+        return session
+
+    def release(self, session: BrowserSession) -> None:
+        """
+        Возврат сессии в пул. Сломанные и отработавшие свой лимит сессии закрываются
+
+        :param session: Сессия браузера
+        """
+
+        try:
+            if self._closed or session.broken or session.uses >= self.max_uses:
+                self._destroy(session)
+            elif self._reset(session):
+                self._idle.put(session)
+            else:
+                self._destroy(session)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def session(self, timeout: float = None, owner: object = None) -> Iterator[BrowserSession]:
+        """
+        Контекстный менеджер для работы с сессией из пула
+
+        :param timeout: Максимальное время ожидания свободной сессии (в секундах)
+        :param owner: Задача, которой выдана сессия. По ней зависшую задачу можно прервать через abort
+        """
+
+        session = self.acquire(timeout=timeout)
+        if owner is not None:
+            with self._lock:
+                self._owners[owner] = session
+        try:
+            yield session
+        except self.PAGE_ERRORS:
+            raise
+        except Exception:
+            # Браузер упал или перестал отвечать: такую сессию не возвращаем в пул, а пересоздаём
+            if not self._is_alive(session):
+                session.broken = True
+            raise
+        finally:
+            if owner is not None:
+                with self._lock:
+                    self._owners.pop(owner, None)
+            self.release(session)
+
+    def abort(self, owner: object) -> bool:
+        """
+        Принудительное закрытие браузера зависшей задачи: её вызовы WebDriver завершатся ошибкой,
+        а сессия вернётся в пул сломанной и освободит место
+
+        :param owner: Задача, переданная в session
+        :return: True, если у задачи была сессия
+        """
+
+        with self._lock:
+            session = self._owners.get(owner)
+        if session is None:
+            return False
+
+        session.broken = True
+        self._log_info(f'Прерываю зависшую задачу в браузере №{session.session_id}')
+        try:
+            session.driver.quit()
+        except Exception as ex_quit:
+            self._log_info(f'Не смог закрыть браузер №{session.session_id}! Ошибка:\n{ex_quit}')
+        return True
+
+    def close(self) -> None:
+        """Закрытие всех браузеров пула"""
+
+        self._closed = True
+        with self._lock:
+            sessions = list(self._sessions)
+
+        for session in sessions:
+            self._destroy(session)
+
+        while True:
+            try:
+                self._idle.get_nowait()
+            except Empty:
+                break
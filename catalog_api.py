@@ -0,0 +1,155 @@
+import json
+import os
+from typing import Iterator
+
+import urllib3
+from urllib3.util.retry import Retry
+
+from config import CONFIG
+from product_cards import card_from_api, write_cards
+
+
+class WildberriesCatalogAPI:
+    """Сбор ссылок на товары через JSON API каталога Wildberries без браузера"""
+
+    BRAND_FILTER_KEY = 'fbrand'
+    DIAGONAL_FILTER_KEY = 'f92740'
+    BASE_PARAMS = {
+        'appType': '1',
+        'curr': 'rub',
+        'dest': '-1257786',
+        'sort': 'popular',
+        'spp': '30',
+    }
+
+    def __init__(self, custom_logger: object, brand_name: str, diagonal: str, price_start: str, price_end: str,
+                 api_url: str = None, http: urllib3.PoolManager = None) -> None:
+        """
+        Инициализация параметров
+
+        :param custom_logger: Объект логгера
+        :param brand_name: Название бренда
+        :param diagonal: Диагональ экрана
+        :param price_start: Начальная цена
+        :param price_end: Конечная цена
+        :param api_url: Базовый адрес API каталога. По умолчанию берётся из config.py
+        :param http: Общий пул HTTP соединений
+        """
+
+        self.log = custom_logger
+        self.brand_name = brand_name
+        self.diagonal = diagonal
+        self.price_start = price_start
+        self.price_end = price_end
+        self._check_price_input_user()
+
+        self.api_url = (api_url or CONFIG['catalog_api_url']).rstrip('/')
+        self.http = http or urllib3.PoolManager(
+            maxsize=CONFIG['http_pool_size'],
+            timeout=urllib3.Timeout(total=CONFIG['http_timeout']),
+            retries=Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504)),
+        )
+
+    def _check_price_input_user(self) -> None:
+        """Проверка цены, введенной пользователем"""
+
+        if int(self.price_end) < int(self.price_start):
+            raise ValueError('Конечная цена должна быть больше начальной цены')
+
+    def _get_json(self, path: str, params: dict) -> dict:
+        """
+        GET запрос к API каталога
+
+        :param path: Путь относительно базового адреса API
+        :param params: Параметры запроса
+        :return: Ответ в виде словаря
+        """
+
+        response = self.http.request('GET', f'{self.api_url}{path}', fields={**self.BASE_PARAMS, **params})
+        if response.status != 200:
+            raise ConnectionError(f'API каталога вернуло статус {response.status} для {path}')
+
+        return json.loads(response.data.decode('utf-8'))
+
+    def _price_param(self) -> str:
+        """Диапазон цен в формате API (в копейках)"""
+
+        return f'{int(self.price_start) * 100};{int(self.price_end) * 100}'
+
+    def _base_filter_params(self) -> dict:
+        """Общие параметры фильтрации каталога"""
+
+        return {'cat': CONFIG['catalog_subject_id'], 'priceU': self._price_param()}
+
+    def _resolve_filters(self) -> dict:
+        """
+        Получение id бренда и диагонали по их названиям
+
+        :return: Параметры фильтров для запроса каталога
+        """
+
+        filters = self._get_json(CONFIG['catalog_api_filters_path'], self._base_filter_params())
+        filter_items = {item.get('key'): item.get('items') or [] for item in filters.get('data', {}).get('filters', [])}
+
+        params = {}
+        for brand in filter_items.get(self.BRAND_FILTER_KEY, []):
+            if str(brand.get('name', '')).lower() == self.brand_name.lower():
+                self.log.info(f'Бренд "{self.brand_name}" существует, выбираю его!')
+                params[self.BRAND_FILTER_KEY] = str(brand['id'])
+                break
+        else:
+            self.log.info(f'Бренда "{self.brand_name}" не существует, проверьте корректность ввода бренда!')
+            raise ValueError(f'Бренда "{self.brand_name}" не существует, проверьте корректность ввода бренда!')
+
+        for diagonal in filter_items.get(self.DIAGONAL_FILTER_KEY, []):
+            if str(diagonal.get('name', ''))[0:2] == self.diagonal:
+                params[self.DIAGONAL_FILTER_KEY] = str(diagonal['id'])
+                break
+        else:
+            self.log.info(
+                f'Не смог найти диагональ "{self.diagonal}" у бренда {self.brand_name}! Продолжаю работу без нее!')
+
+        return params
+
+    @staticmethod
+    def product_url(product_id: int | str) -> str:
+        """Ссылка на страницу товара по его id"""
+
+        return CONFIG['product_url_template'].format(product_id=product_id)
+
+    def _iter_pages(self, filter_params: dict) -> Iterator[list]:
+        """
+        Постраничное получение товаров каталога
+
+        :param filter_params: Параметры фильтров
+        :return: Генератор списков товаров
+        """
+
+        for page in range(1, CONFIG['catalog_max_pages'] + 1):
+            data = self._get_json(CONFIG['catalog_api_catalog_path'],
+                                  {**self._base_filter_params(), **filter_params, 'page': str(page)})
+            products = data.get('data', {}).get('products') or []
+            if not products:
+                break
+
+            self.log.info(f'Страница {page}: найдено товаров {len(products)}')
+            yield products
+
+    def iter_product_cards(self) -> Iterator[list]:
+        """Потоковый сбор карточек: карточки с каждой страницы отдаются сразу, не дожидаясь остальных страниц"""
+
+        self.log.info('Собираю ссылки на товары через API каталога')
+        filter_params = self._resolve_filters()
+        for products in self._iter_pages(filter_params):
+            yield [card_from_api(product, self.product_url(product['id'])) for product in products]
+
+    def iter_product_urls(self) -> Iterator[list]:
+        """Потоковый сбор ссылок: ссылки с каждой страницы отдаются сразу, не дожидаясь остальных страниц"""
+
+        for cards in self.iter_product_cards():
+            yield [card['url'] for card in cards]
+
+    def get_TV_data(self) -> str | None:
+        """Основной метод для получения карточек телевизоров"""
+
+        return write_cards(os.path.join(os.getcwd(), 'products.csv'), self.iter_product_cards())
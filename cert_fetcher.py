@@ -0,0 +1,192 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from urllib.parse import urljoin, urlsplit
+
+import urllib3
+from urllib3.util.retry import Retry
+
+from _metrics import METRICS
+from config import CONFIG
+from downloads import product_id_from_url
+from other import create_folder
+
+
+@dataclass
+class FetchResult:
+    """Результат попытки скачать сертификат товара по HTTP"""
+
+    url: str
+    product_id: str
+    path_to_file: str | None = None
+    document_url: str | None = None
+    has_certificate: bool | None = None
+    error: str | None = None
+
+    @property
+    def resolved(self) -> bool:
+        """Ссылка на документ найдена и файл скачан"""
+        return self.path_to_file is not None
+
+
+def find_document_url(payload: object, base_url: str = '', keys: tuple = None) -> str | None:
+    """
+    Поиск ссылки на PDF сертификата в ответе API карточки товара. Ссылка берётся только из полей сертификата
+    или декларации (CONFIG['certificate_document_keys']): другие PDF карточки (инструкции, буклеты) не подходят
+
+    :param payload: Ответ API в виде словаря/списка
+    :param base_url: Адрес запроса, относительно которого раскрываются относительные ссылки
+    :param keys: Поля, внутри которых ищется ссылка. По умолчанию из config.py
+    :return: Ссылка на PDF или None
+    """
+
+    keys = CONFIG['certificate_document_keys'] if keys is None else keys
+    # Пары (узел, находится ли узел внутри поля сертификата)
+    stack = [(payload, False)]
+    while stack:
+        node, inside = stack.pop()
+        if isinstance(node, dict):
+            stack.extend(reversed([(value, inside or key in keys) for key, value in node.items()]))
+        elif isinstance(node, list):
+            stack.extend(reversed([(item, inside) for item in node]))
+        elif inside and isinstance(node, str) and urlsplit(node).path.lower().endswith('.pdf'):
+            return urljoin(base_url, node)
+
+    return None
+
+
+def certificate_presence(payload: object) -> bool | None:
+    """
+    Есть ли у товара проверенные документы по данным карточки товара
+
+    :param payload: Ответ API карточки товара
+    :return: True/False или None, если по ответу нельзя судить (товар не найден или в карточке нет ни одного
+        поля из CONFIG['certificate_flag_keys'])
+    """
+
+    products = payload.get('data', {}).get('products') if isinstance(payload, dict) else None
+    if not products or not isinstance(products[0], dict):
+        return None
+
+    # Отсутствие поля ничего не говорит о документах: "нет" только если поле есть и оно пустое
+    flags = [products[0][key] for key in CONFIG['certificate_flag_keys'] if key in products[0]]
+    if not flags:
+        return None
+
+    return any(flags)
+
+
+class CertificateFetcher:
+    """Скачивание сертификатов напрямую по HTTP, без запуска браузера. Потокобезопасен: один загрузчик
+    с общим пулом соединений используют все потоки конвейера"""
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, custom_logger: object, path_to_folder: str = None, concurrency: int = None,
+                 info_url_template: str = None, http: urllib3.PoolManager = None, index: object = None) -> None:
+        """
+        Инициализация параметров
+
+        :param custom_logger: Объект логгера
+        :param path_to_folder: Директория для сохранения PDF
+        :param concurrency: Максимальное количество одновременных запросов
+        :param info_url_template: Шаблон адреса карточки товара с {product_id}
+        :param http: Общий пул HTTP соединений
+        :param index: Индекс скачанных документов (RunLedger): документ, уже скачанный для другого товара,
+            не скачивается повторно
+        """
+
+        self.log = custom_logger
+        self.path_to_folder = path_to_folder or CONFIG['path_to_save_pdf']
+        self.concurrency = concurrency or CONFIG['cert_concurrency']
+        self.info_url_template = info_url_template or CONFIG['certificate_info_url']
+        self.index = index
+        self.http = http or urllib3.PoolManager(
+            maxsize=self.concurrency,
+            timeout=urllib3.Timeout(total=CONFIG['http_timeout']),
+            retries=Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504)),
+        )
+        create_folder(self.path_to_folder)
+
+    def _resolve_sync(self, product_id: str) -> tuple[str | None, bool | None]:
+        """
+        Проверка карточки товара: ссылка на документ и признак наличия проверенных документов
+
+        :param product_id: id товара
+        :return: Ссылка на документ и признак наличия документов (None - неизвестно)
+        """
+
+        info_url = self.info_url_template.format(product_id=product_id)
+        response = self.http.request('GET', info_url)
+        if response.status == 404:
+            return None, None
+        if response.status != 200:
+            raise ConnectionError(f'Карточка товара {product_id} вернула статус {response.status}')
+
+        payload = json.loads(response.data.decode('utf-8'))
+        document_url = find_document_url(payload, base_url=info_url)
+        return document_url, True if document_url else certificate_presence(payload)
+
+    def _download_sync(self, product_id: str, document_url: str) -> str:
+        """Потоковое скачивание документа во временный файл и атомарное переименование"""
+
+        destination = os.path.join(self.path_to_folder, f'{product_id}.pdf')
+        path_to_tmp = f'{destination}.part'
+
+        response = self.http.request('GET', document_url, preload_content=False)
+        try:
+            if response.status != 200:
+                raise ConnectionError(f'Документ {document_url} вернул статус {response.status}')
+
+            with open(path_to_tmp, 'wb') as file:
+                for chunk in response.stream(self.CHUNK_SIZE):
+                    file.write(chunk)
+        finally:
+            response.release_conn()
+
+        os.replace(path_to_tmp, destination)
+        return destination
+
+    def fetch_sync(self, url: str, raise_errors: bool = False) -> FetchResult:
+        """
+        Поиск и скачивание сертификата одного товара в текущем потоке
+
+        :param url: URL страницы товара
+        :param raise_errors: Пробрасывать ошибки (для повторов и учёта ошибок в Throttle), а не записывать их в результат
+        """
+
+        result = FetchResult(url=url, product_id=product_id_from_url(url))
+        try:
+            with METRICS.span('http.resolve', url=url):
+                result.document_url, result.has_certificate = self._resolve_sync(result.product_id)
+            if result.document_url and self.index:
+                result.path_to_file = self.index.document_file(result.document_url)
+                if result.path_to_file:
+                    METRICS.incr('http.document_reused', url=url)
+            if result.document_url and not result.path_to_file:
+                with METRICS.span('http.download', url=url):
+                    result.path_to_file = self._download_sync(result.product_id, result.document_url)
+                if self.index:
+                    self.index.save_document(result.document_url, result.path_to_file)
+            METRICS.incr('http.resolved' if result.document_url else 'http.unresolved', url=url)
+            if result.has_certificate is False:
+                METRICS.incr('probe.no_certificate', url=url)
+        except Exception as ex_fetch:
+            result.error = repr(ex_fetch)
+            self.log.info(f'Не смог скачать сертификат товара {result.product_id} по HTTP! Ошибка:\n{ex_fetch}')
+            if raise_errors:
+                raise
+
+        return result
+
+    def fetch_all(self, urls: list) -> list[FetchResult]:
+        """
+        Скачивание сертификатов для списка товаров в пуле из concurrency потоков
+
+        :param urls: Список URL товаров
+        :return: Результаты в порядке входного списка
+        """
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='cert') as executor:
+            return list(executor.map(self.fetch_sync, urls))
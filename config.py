@@ -1,9 +1,101 @@
 import os
 
 CONFIG = {
-    'path_to_save_pdf': os.path.join(os.getcwd(), 'data')
+    'path_to_save_pdf': os.path.join(os.getcwd(), 'data'),
+    'path_to_downloads': os.path.join(os.getcwd(), 'data', '.downloads'),
+    'browser_pool_size': 10,
+    'browser_max_uses': 50,
+    'workers': 5,
+    # Количество товаров в работе подстраивается между workers_min и workers_max (не больше browser_pool_size)
+    'workers_min': 1,
+    'workers_max': 10,
+    'throttle_target_latency': 30,
+    'throttle_max_error_rate': 0.2,
+    'throttle_window': 10,
+    # Общая частота обращений к сайту: товары по HTTP и в браузере
+    'requests_per_second': 10,
+    'product_retries': 3,
+    'retry_base_delay': 2,
+    'retry_max_delay': 60,
+    'queue_size': 10,
+    'task_timeout': 300,
+    'wait_timeout': 10,
+    'wait_poll_interval': 0.2,
+    'network_idle_time': 0.5,
+    'scroll_step': 1500,
+    'scroll_settle_time': 1.0,
+    'scroll_timeout': 20,
+    'catalog_page_size': 100,
+    'download_timeout': 60,
+    'catalog_collector': 'http',
+    'catalog_api_url': 'https://catalog.wb.ru/catalog/electronic14',
+    'catalog_api_catalog_path': '/v2/catalog',
+    'catalog_api_filters_path': '/v4/filters',
+    'catalog_subject_id': '9468',
+    'catalog_max_pages': 100,
+    'product_url_template': 'https://www.wildberries.ru/catalog/{product_id}/detail.aspx',
+    'http_pool_size': 10,
+    'http_timeout': 15,
+    'cert_fetcher_enabled': True,
+    'cert_concurrency': 50,
+    'certificate_info_url': 'https://card.wb.ru/cards/v2/detail?appType=1&curr=rub&dest=-1257786&nm={product_id}',
+    # Поля карточки товара, по которым видно, что документы проверены. Если поле есть и пустое,
+    # товар не открывается в браузере. Если ни одного поля нет, товар проверяется в браузере
+    'certificate_flag_keys': ('certificate', 'certificates', 'hasCertificate', 'isCertificateVerified'),
+    # Поля карточки товара, внутри которых ищется ссылка на PDF сертификата. Если ссылки там нет, товар открывается
+    # в браузере
+    'certificate_document_keys': ('certificate', 'certificates', 'declaration', 'declarations'),
+    # Через сколько часов товары, отсеянные проверкой карточки, проверяются снова
+    'probe_ttl_hours': 24,
+    'path_to_ledger': os.path.join(os.getcwd(), 'state', 'ledger.sqlite3'),
+    'max_attempts': 3,
+    'crawl_ttl_hours': 12,
+    'pdf_queue_size': 20,
+    'queries_file': None,
+    'query_workers': 4,
+    'price_shards': 4,
+    'shard_max_pages': 20,
+    'shard_min_width': 100,
+    'path_to_cards': os.path.join(os.getcwd(), 'data', 'products.csv'),
+    'distributed': False,
+    'path_to_job_queue': os.path.join(os.getcwd(), 'state', 'jobs.sqlite3'),
+    'job_lease_seconds': 600,
+    'job_poll_interval': 5,
+    # WAL работает только на локальном диске. Для очереди на сетевом диске нужен 'DELETE'
+    'job_queue_journal_mode': 'WAL',
+    # Форматы результатов, можно несколько: 'excel', 'csv', 'jsonl', 'parquet'
+    'result_sinks': ('excel',),
+    'path_to_results': os.path.join(os.getcwd(), 'result'),
+    'sink_batch_size': 10000,
+    'pdf_workers': os.cpu_count(),
+    'pdf_cache_enabled': True,
+    'path_to_pdf_cache': os.path.join(os.getcwd(), 'state', 'pdf_cache.sqlite3'),
+    'pdf_cache_max_entries': 100000,
+    'log_queue': True,
+    'log_rotation': None,
+    'log_max_bytes': 10 * 1024 * 1024,
+    'log_backup_count': 7,
 }
 
+CONFIG_BROWSER = {
+    'headless': False,
+    'window_size': '1920,1080',
+    'page_load_strategy': 'eager',
+    'blocked_resource_types': ['image', 'media', 'font'],
+    'blocked_url_patterns': [
+        '*mc.yandex.ru*',
+        '*google-analytics.com*',
+        '*googletagmanager.com*',
+        '*top-fwz1.mail.ru*',
+        '*vk.com/rtrg*',
+        '*criteo*',
+    ],
+    'extra_arguments': ['--disable-extensions', '--mute-audio', '--disable-notifications'],
+}
+
+# Список запросов для пакетного режима в формате CONFIG_TV. Если пуст, используется CONFIG_TV
+CONFIG_QUERIES = []
+
 CONFIG_TV = {
     'brand_name': 'Xiaomi',
     'price_start': '1000',
@@ -0,0 +1,89 @@
+import hashlib
+import os
+import re
+from time import monotonic, sleep
+
+PARTIAL_SUFFIXES = ('.crdownload', '.tmp')
+PRODUCT_ID_PATTERN = re.compile(r'/catalog/(\d+)/')
+
+
+def product_id_from_url(url: str) -> str:
+    """
+    Получение id товара из URL. Если id не найден, возвращается короткий хеш URL
+
+    :param url: URL страницы товара
+    :return: id товара
+    """
+
+    match = PRODUCT_ID_PATTERN.search(url)
+    if match:
+        return match.group(1)
+
+    return hashlib.sha1(url.encode('utf-8')).hexdigest()[:12]
+
+
+def list_finished_files(path_to_folder: str) -> set:
+    """
+    Список полностью скачанных файлов в директории (без частичных *.crdownload)
+
+    :param path_to_folder: Путь к директории
+    """
+
+    return {entry for entry in os.listdir(path_to_folder) if not entry.endswith(PARTIAL_SUFFIXES)}
+
+
+def wait_for_download(path_to_folder: str, files_before: set, timeout: float, poll_interval: float = 0.2) -> str:
+    """
+    Ожидание окончания скачивания файла: появился новый файл и в директории не осталось частичных загрузок
+
+    :param path_to_folder: Директория загрузок браузера
+    :param files_before: Файлы, которые были в директории до начала скачивания
+    :param timeout: Максимальное время ожидания (в секундах)
+    :param poll_interval: Интервал проверки директории (в секундах)
+    :return: Полный путь до скачанного файла
+    """
+
+    deadline = monotonic() + timeout
+    while monotonic() < deadline:
+        entries = set(os.listdir(path_to_folder)) - files_before
+        partial = [entry for entry in entries if entry.endswith(PARTIAL_SUFFIXES)]
+        finished = sorted(entry for entry in entries if not entry.endswith(PARTIAL_SUFFIXES))
+
+        if finished and not partial:
+            path_to_file = os.path.join(path_to_folder, finished[0])
+            if os.path.getsize(path_to_file) > 0:
+                return path_to_file
+
+        sleep(poll_interval)
+
+    raise TimeoutError(f'Файл не скачался за {timeout} секунд')
+
+
+def finalize_download(path_to_file: str, path_to_folder: str, product_id: str) -> str:
+    """
+    Атомарное перемещение скачанного файла в итоговую директорию под именем по id товара
+
+    :param path_to_file: Путь до скачанного файла
+    :param path_to_folder: Итоговая директория
+    :param product_id: id товара
+    :return: Итоговый путь до файла
+    """
+
+    extension = os.path.splitext(path_to_file)[1] or '.pdf'
+    destination = os.path.join(path_to_folder, f'{product_id}{extension}')
+    os.replace(path_to_file, destination)
+
+    return destination
+
+
+def clear_folder(path_to_folder: str) -> None:
+    """
+    Удаление всех файлов из директории (остатки прошлых загрузок)
+
+    :param path_to_folder: Путь к директории
+    """
+
+    for entry in os.listdir(path_to_folder):
+        full_path = os.path.join(path_to_folder, entry)
+        if os.path.isfile(full_path):
+            os.remove(full_path)
@@ -0,0 +1,243 @@
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from time import time
+
+from config import CONFIG
+from other import create_folder
+
+
+class JobStatus:
+    """Статусы задач общей очереди"""
+
+    PENDING = 'pending'
+    LEASED = 'leased'
+    DONE = 'done'
+    NO_CERTIFICATE = 'no_certificate'
+    FAILED = 'failed'
+    FINISHED = (DONE, NO_CERTIFICATE, FAILED)
+
+
+@dataclass
+class JobResult:
+    """Результат обработки товара, который обработчик возвращает в очередь"""
+
+    url: str
+    status: str
+    path_to_file: str | None = None
+    phone: str | None = None
+    email: str | None = None
+    error: str | None = None
+    certificate: str | None = None
+
+
+class JobQueue:
+    """
+    Общая очередь товаров в SQLite для нескольких процессов и машин.
+    Обработчик берёт задачу в аренду на lease_seconds. Если он не продлил аренду
+    и не вернул результат (упал, завис, пропала сеть), задачу заберёт другой обработчик
+    """
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS jobs (
+            url TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            worker TEXT,
+            lease_until REAL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            path_to_file TEXT,
+            phone TEXT,
+            email TEXT,
+            error TEXT,
+            certificate TEXT,
+            updated_at TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, lease_until);
+    '''
+
+    def __init__(self, path_to_db: str = None, lease_seconds: float = None, max_attempts: int = None,
+                 journal_mode: str = None, probe_ttl_hours: float = None) -> None:
+        """
+        Инициализация параметров
+
+        :param path_to_db: Путь до файла базы SQLite (на общем диске для нескольких машин)
+        :param lease_seconds: Срок аренды задачи (в секундах)
+        :param max_attempts: Количество попыток для одной задачи
+        :param journal_mode: Режим журнала SQLite. WAL работает только на локальном диске,
+            для сетевых дисков нужен DELETE
+        :param probe_ttl_hours: Через сколько часов товар без сертификата можно опубликовать снова
+        """
+
+        self.path_to_db = path_to_db or CONFIG['path_to_job_queue']
+        self.lease_seconds = lease_seconds or CONFIG['job_lease_seconds']
+        self.max_attempts = max_attempts or CONFIG['max_attempts']
+        self.probe_ttl_hours = CONFIG['probe_ttl_hours'] if probe_ttl_hours is None else probe_ttl_hours
+        create_folder(os.path.dirname(self.path_to_db))
+
+        self._lock = threading.Lock()
+        # Транзакции открываются вручную (BEGIN IMMEDIATE), чтобы два процесса не взяли одну задачу
+        self._connection = sqlite3.connect(self.path_to_db, timeout=60, isolation_level=None,
+                                           check_same_thread=False)
+        self._connection.execute(f'PRAGMA journal_mode={journal_mode or CONFIG["job_queue_journal_mode"]}')
+        self._connection.executescript(self.SCHEMA)
+
+    @staticmethod
+    def _now() -> str:
+        """Текущее время в ISO формате"""
+        return datetime.now().isoformat(timespec='seconds')
+
+    def _transaction(self, statements: list) -> list:
+        """
+        Выполнение запросов в одной транзакции с блокировкой базы на запись
+
+        :param statements: Список пар (запрос, параметры)
+        :return: Результат последнего запроса
+        """
+
+        with self._lock:
+            self._connection.execute('BEGIN IMMEDIATE')
+            try:
+                rows = []
+                for query, params in statements:
+                    rows = self._connection.execute(query, params).fetchall()
+                self._connection.execute('COMMIT')
+            except BaseException:
+                self._connection.execute('ROLLBACK')
+                raise
+
+        return rows
+
+    def publish(self, urls: list, requeue: bool = False) -> int:
+        """
+        Публикация товаров в очередь. Уже опубликованные URL не меняются, кроме товаров без сертификата
+        с устаревшей проверкой (probe_ttl_hours): они возвращаются в очередь
+
+        :param urls: Список URL
+        :param requeue: Вернуть в очередь и задачи, завершённые с ошибкой или без сертификата.
+            Решение о повторе принимает вызывающий (например, по попыткам в RunLedger)
+        :return: Количество новых и возвращённых в очередь задач
+        """
+
+        now = self._now()
+        expired = (datetime.now() - timedelta(hours=self.probe_ttl_hours)).isoformat(timespec='seconds')
+        with self._lock:
+            self._connection.execute('BEGIN IMMEDIATE')
+            try:
+                before = self._connection.total_changes
+                self._connection.executemany(
+                    'INSERT OR IGNORE INTO jobs (url, status, updated_at) VALUES (?, ?, ?)',
+                    [(url, JobStatus.PENDING, now) for url in urls])
+                self._connection.executemany(
+                    '''UPDATE jobs SET status = ?, worker = NULL, lease_until = NULL, attempts = 0, error = NULL,
+                           updated_at = ?
+                       WHERE url = ? AND ((status = ? AND updated_at < ?) OR (? AND status IN (?, ?)))''',
+                    [(JobStatus.PENDING, now, url, JobStatus.NO_CERTIFICATE, expired, requeue,
+                      JobStatus.NO_CERTIFICATE, JobStatus.FAILED) for url in urls])
+                published = self._connection.total_changes - before
+                self._connection.execute('COMMIT')
+            except BaseException:
+                self._connection.execute('ROLLBACK')
+                raise
+
+        return published
+
+    def claim(self, worker_id: str, limit: int = 1) -> list:
+        """
+        Аренда свободных задач и задач с истёкшей арендой
+
+        :param worker_id: Идентификатор обработчика
+        :param limit: Максимальное количество задач
+        :return: Список URL
+        """
+
+        now = time()
+        rows = self._transaction([(
+            '''UPDATE jobs SET status = ?, error = ?, updated_at = ?
+               WHERE status = ? AND lease_until < ? AND attempts >= ?''',
+            (JobStatus.FAILED, 'Истекла аренда последней попытки', self._now(), JobStatus.LEASED, now,
+             self.max_attempts),
+        ), (
+            '''UPDATE jobs SET status = ?, worker = ?, lease_until = ?, attempts = attempts + 1, updated_at = ?
+               WHERE url IN (
+                   SELECT url FROM jobs
+                   WHERE (status = ? OR (status = ? AND lease_until < ?)) AND attempts < ?
+                   ORDER BY rowid LIMIT ?)
+               RETURNING url''',
+            (JobStatus.LEASED, worker_id, now + self.lease_seconds, self._now(),
+             JobStatus.PENDING, JobStatus.LEASED, now, self.max_attempts, limit),
+        )])
+        return [row[0] for row in rows]
+
+    def renew(self, urls: list, worker_id: str) -> None:
+        """
+        Продление аренды задач, которые обработчик ещё выполняет
+
+        :param urls: Список URL
+        :param worker_id: Идентификатор обработчика
+        """
+
+        lease_until = time() + self.lease_seconds
+        self._transaction([
+            ('UPDATE jobs SET lease_until = ? WHERE url = ? AND status = ? AND worker = ?',
+             (lease_until, url, JobStatus.LEASED, worker_id))
+            for url in urls
+        ])
+
+    def complete(self, result: JobResult, worker_id: str) -> bool:
+        """
+        Возврат результата. Результат принимается, только если аренда всё ещё у этого обработчика
+
+        :param result: Результат обработки
+        :param worker_id: Идентификатор обработчика
+        :return: Принят ли результат
+        """
+
+        # Задача с ошибкой возвращается в очередь, пока не кончатся попытки
+        rows = self._transaction([(
+            '''UPDATE jobs SET status = CASE WHEN ? = ? AND attempts < ? THEN ? ELSE ? END, lease_until = NULL,
+                   path_to_file = ?, phone = ?, email = ?, error = ?, certificate = ?, updated_at = ?
+               WHERE url = ? AND status = ? AND worker = ?
+               RETURNING url''',
+            (result.status, JobStatus.FAILED, self.max_attempts, JobStatus.PENDING, result.status,
+             result.path_to_file, result.phone, result.email, result.error, result.certificate, self._now(),
+             result.url, JobStatus.LEASED, worker_id),
+        )])
+        return bool(rows)
+
+    def is_drained(self) -> bool:
+        """Все задачи обработаны или исчерпали попытки"""
+
+        rows = self._transaction([('SELECT COUNT(*) FROM jobs WHERE status = ? OR status = ?',
+                                   (JobStatus.PENDING, JobStatus.LEASED))])
+        return not rows[0][0]
+
+    def results(self, statuses: tuple = (JobStatus.DONE,), since: str = None) -> list[JobResult]:
+        """
+        Результаты обработанных товаров
+
+        :param statuses: Статусы задач. По умолчанию только товары с найденными контактами
+        :param since: Только задачи, завершённые не раньше этого времени (ISO формат)
+        :return: Список результатов
+        """
+
+        rows = self._transaction([(
+            f'''SELECT url, status, path_to_file, phone, email, error, certificate FROM jobs
+                WHERE status IN ({', '.join('?' * len(statuses))}) AND updated_at >= ?
+                ORDER BY rowid''',
+            (*statuses, since or ''),
+        )])
+        return [JobResult(*row) for row in rows]
+
+    def counts(self) -> dict:
+        """Количество задач по статусам"""
+
+        rows = self._transaction([('SELECT status, COUNT(*) FROM jobs GROUP BY status', ())])
+        return dict(rows)
+
+    def close(self) -> None:
+        """Закрытие соединения с базой"""
+
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,286 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Iterator
+
+from config import CONFIG
+from downloads import product_id_from_url
+from other import create_folder
+
+
+class Status:
+    """Статусы обработки URL товара"""
+
+    PENDING = 'pending'
+    NO_CERTIFICATE = 'no_certificate'
+    DOWNLOADED = 'downloaded'
+    EXTRACTED = 'extracted'
+    FAILED = 'failed'
+
+
+class RunLedger:
+    """Журнал прогресса в SQLite, позволяющий продолжить прерванный запуск"""
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS urls (
+            url TEXT PRIMARY KEY,
+            product_id TEXT NOT NULL,
+            status TEXT NOT NULL,
+            path_to_file TEXT,
+            phone TEXT,
+            email TEXT,
+            certificate TEXT,
+            error TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS urls_status ON urls (status);
+        CREATE TABLE IF NOT EXISTS url_queries (
+            url TEXT NOT NULL,
+            query_key TEXT NOT NULL,
+            PRIMARY KEY (url, query_key)
+        );
+        CREATE TABLE IF NOT EXISTS documents (
+            document_url TEXT PRIMARY KEY,
+            path_to_file TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS probes (
+            product_id TEXT PRIMARY KEY,
+            has_certificate INTEGER NOT NULL,
+            checked_at TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS crawls (
+            query_key TEXT PRIMARY KEY,
+            finished_at TEXT NOT NULL
+        );
+    '''
+
+    def __init__(self, path_to_db: str = None, max_attempts: int = None) -> None:
+        """
+        Инициализация параметров
+
+        :param path_to_db: Путь до файла базы SQLite
+        :param max_attempts: Количество попыток для URL, завершившихся ошибкой
+        """
+
+        self.path_to_db = path_to_db or CONFIG['path_to_ledger']
+        self.max_attempts = max_attempts or CONFIG['max_attempts']
+        create_folder(os.path.dirname(self.path_to_db))
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path_to_db, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.executescript(self.SCHEMA)
+        self._migrate()
+
+    def _migrate(self) -> None:
+        """Добавление колонок, которых нет в журналах, созданных прошлыми версиями"""
+
+        columns = {row[1] for row in self._connection.execute('PRAGMA table_info(urls)')}
+        if 'certificate' not in columns:
+            with self._connection:
+                self._connection.execute('ALTER TABLE urls ADD COLUMN certificate TEXT')
+        with self._connection:
+            self._connection.execute('CREATE INDEX IF NOT EXISTS urls_certificate ON urls (certificate)')
+
+    @staticmethod
+    def _now() -> str:
+        """Текущее время в ISO формате"""
+        return datetime.now().isoformat(timespec='seconds')
+
+    def _execute(self, query: str, params: tuple = ()) -> list:
+        """Выполнение запроса под блокировкой с фиксацией изменений"""
+
+        with self._lock, self._connection:
+            return self._connection.execute(query, params).fetchall()
+
+    def is_crawled(self, query_key: str, ttl_hours: float = None) -> bool:
+        """
+        Проверка, собирались ли ссылки по запросу недавно
+
+        :param query_key: Ключ поискового запроса
+        :param ttl_hours: Срок актуальности сбора (в часах)
+        """
+
+        ttl_hours = CONFIG['crawl_ttl_hours'] if ttl_hours is None else ttl_hours
+        rows = self._execute('SELECT finished_at FROM crawls WHERE query_key = ?', (query_key,))
+        if not rows:
+            return False
+
+        return datetime.fromisoformat(rows[0][0]) > datetime.now() - timedelta(hours=ttl_hours)
+
+    def mark_crawled(self, query_key: str) -> None:
+        """Отметка об окончании сбора ссылок по запросу"""
+
+        self._execute('INSERT OR REPLACE INTO crawls (query_key, finished_at) VALUES (?, ?)',
+                      (query_key, self._now()))
+
+    def cached_probe(self, product_id: str, ttl_hours: float = None) -> bool | None:
+        """
+        Сохранённый результат проверки наличия сертификата у товара
+
+        :param product_id: id товара
+        :param ttl_hours: Срок актуальности проверки (в часах)
+        :return: True/False или None, если проверки не было или она устарела
+        """
+
+        ttl_hours = CONFIG['probe_ttl_hours'] if ttl_hours is None else ttl_hours
+        rows = self._execute('SELECT has_certificate, checked_at FROM probes WHERE product_id = ?', (product_id,))
+        if not rows or datetime.fromisoformat(rows[0][1]) < datetime.now() - timedelta(hours=ttl_hours):
+            return None
+
+        return bool(rows[0][0])
+
+    def save_probe(self, product_id: str, has_certificate: bool) -> None:
+        """Сохранение результата проверки наличия сертификата у товара"""
+
+        self._execute('INSERT OR REPLACE INTO probes (product_id, has_certificate, checked_at) VALUES (?, ?, ?)',
+                      (product_id, int(has_certificate), self._now()))
+
+    def requeue_expired_probes(self, ttl_hours: float = None) -> int:
+        """
+        Возврат в обработку товаров, отсеянных проверкой карточки, если проверка устарела
+
+        :param ttl_hours: Срок актуальности проверки (в часах)
+        :return: Количество возвращённых URL
+        """
+
+        ttl_hours = CONFIG['probe_ttl_hours'] if ttl_hours is None else ttl_hours
+        expired = (datetime.now() - timedelta(hours=ttl_hours)).isoformat(timespec='seconds')
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                '''UPDATE urls SET status = ?, updated_at = ?
+                   WHERE status = ? AND product_id IN (
+                       SELECT product_id FROM probes WHERE has_certificate = 0 AND checked_at < ?)''',
+                (Status.PENDING, self._now(), Status.NO_CERTIFICATE, expired))
+            return cursor.rowcount
+
+    def add_urls(self, urls: list) -> list:
+        """
+        Добавление новых URL. Уже известные URL не меняются
+
+        :param urls: Список URL
+        :return: Список URL, которых раньше не было в журнале
+        """
+
+        now = self._now()
+        new_urls = []
+        with self._lock, self._connection:
+            for url in urls:
+                cursor = self._connection.execute(
+                    'INSERT OR IGNORE INTO urls (url, product_id, status, updated_at) VALUES (?, ?, ?, ?)',
+                    (url, product_id_from_url(url), Status.PENDING, now))
+                if cursor.rowcount:
+                    new_urls.append(url)
+
+        return new_urls
+
+    def tag_urls(self, urls: list, query_key: str) -> None:
+        """
+        Пометка URL запросом, по которому они найдены
+
+        :param urls: Список URL
+        :param query_key: Ключ поискового запроса
+        """
+
+        with self._lock, self._connection:
+            self._connection.executemany('INSERT OR IGNORE INTO url_queries (url, query_key) VALUES (?, ?)',
+                                         [(url, query_key) for url in urls])
+
+    def queries_for(self, url: str) -> list:
+        """Ключи всех запросов, по которым найден URL"""
+
+        rows = self._execute('SELECT query_key FROM url_queries WHERE url = ? ORDER BY query_key', (url,))
+        return [row[0] for row in rows]
+
+    def pending_urls(self) -> list:
+        """URL, которые ещё не обработаны или завершились ошибкой и могут быть повторены"""
+
+        rows = self._execute('SELECT url FROM urls WHERE status = ? OR (status = ? AND attempts < ?) ORDER BY rowid',
+                             (Status.PENDING, Status.FAILED, self.max_attempts))
+        return [row[0] for row in rows]
+
+    def downloaded_files(self) -> list:
+        """Скачанные, но ещё не обработанные PDF: список пар (url, путь до файла)"""
+
+        return self._execute('SELECT url, path_to_file FROM urls WHERE status = ? ORDER BY rowid',
+                             (Status.DOWNLOADED,))
+
+    def mark_no_certificate(self, url: str) -> None:
+        """У товара нет сертификата"""
+
+        self._execute('UPDATE urls SET status = ?, error = NULL, updated_at = ? WHERE url = ?',
+                      (Status.NO_CERTIFICATE, self._now(), url))
+
+    def mark_downloaded(self, url: str, path_to_file: str) -> None:
+        """Сертификат товара скачан"""
+
+        self._execute('UPDATE urls SET status = ?, path_to_file = ?, error = NULL, updated_at = ? WHERE url = ?',
+                      (Status.DOWNLOADED, path_to_file, self._now(), url))
+
+    def mark_extracted(self, url: str, phone: str | None, email: str | None, certificate: str = None) -> None:
+        """Данные из сертификата извлечены"""
+
+        self._execute('UPDATE urls SET status = ?, phone = ?, email = ?, certificate = ?, error = NULL, updated_at = ? '
+                      'WHERE url = ?', (Status.EXTRACTED, phone, email, certificate, self._now(), url))
+
+    def document_file(self, document_url: str) -> str | None:
+        """Путь до уже скачанного документа по его адресу, если файл на месте"""
+
+        rows = self._execute('SELECT path_to_file FROM documents WHERE document_url = ?', (document_url,))
+        return rows[0][0] if rows and os.path.exists(rows[0][0]) else None
+
+    def save_document(self, document_url: str, path_to_file: str) -> None:
+        """Запоминание скачанного документа, чтобы другие товары с тем же документом его не скачивали"""
+
+        self._execute('INSERT OR REPLACE INTO documents (document_url, path_to_file) VALUES (?, ?)',
+                      (document_url, path_to_file))
+
+    def certificate_rows(self, batch_size: int = 1000) -> Iterator[dict]:
+        """
+        Уникальные сертификаты из обработанных товаров. Товары без номера документа группируются по файлу.
+        Записи читаются отдельным соединением пачками по batch_size, а не загружаются в память целиком
+
+        :param batch_size: Количество строк, читаемых из базы за раз
+        :return: Генератор записей: номер сертификата, телефон, email, файл, id товаров, ссылки и ключи запросов
+        """
+
+        def split(value: str | None) -> list:
+            return sorted(value.split(',')) if value else []
+
+        # Своё соединение, чтобы чтение отчёта не держало общую блокировку журнала
+        connection = sqlite3.connect(self.path_to_db)
+        try:
+            cursor = connection.execute(
+                '''SELECT COALESCE(u.certificate, u.path_to_file, u.url) AS certificate_key, MAX(u.certificate),
+                          MAX(u.phone), MAX(u.email), MIN(u.path_to_file), GROUP_CONCAT(DISTINCT u.product_id),
+                          GROUP_CONCAT(DISTINCT u.url), GROUP_CONCAT(DISTINCT q.query_key)
+                   FROM urls u LEFT JOIN url_queries q ON q.url = u.url
+                   WHERE u.status = ?
+                   GROUP BY certificate_key
+                   ORDER BY MIN(u.rowid)''', (Status.EXTRACTED,))
+
+            while rows := cursor.fetchmany(batch_size):
+                for _, certificate, phone, email, path_to_file, product_ids, urls, query_keys in rows:
+                    yield {'certificate': certificate, 'phone': phone, 'email': email, 'path_to_file': path_to_file,
+                           'product_ids': split(product_ids), 'urls': split(urls), 'queries': split(query_keys)}
+        finally:
+            connection.close()
+
+    def mark_failed(self, url: str, error: str) -> None:
+        """Обработка URL завершилась ошибкой"""
+
+        self._execute('UPDATE urls SET status = ?, error = ?, attempts = attempts + 1, updated_at = ? WHERE url = ?',
+                      (Status.FAILED, error, self._now(), url))
+
+    def counts(self) -> dict:
+        """Количество URL в каждом статусе"""
+
+        return dict(self._execute('SELECT status, COUNT(*) FROM urls GROUP BY status'))
+
+    def close(self) -> None:
+        """Закрытие соединения с базой"""
+
+        with self._lock:
+            self._connection.close()
@@ -1,13 +1,34 @@
 import os.path
-from time import sleep
+from typing import Iterator
 
-from selenium import webdriver
 from selenium.common.exceptions import NoSuchElementException, TimeoutException
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.ui import WebDriverWait
+
+from _metrics import METRICS
+from browser import create_chrome
+from config import CONFIG
+from product_cards import card_from_dom, write_cards
+from waits import Waiter
+
+# Все данные карточек страницы за один вызов вместо двух запросов к WebDriver на каждую карточку
+HARVEST_SCRIPT = """
+const text = (card, selector) => {
+    const node = card.querySelector(selector);
+    return node ? node.textContent.trim() : null;
+};
+return Array.from(document.querySelectorAll(arguments[0])).map(card => {
+    const link = card.querySelector('a.j-card-link, a.product-card__link');
+    return {
+        id: card.dataset.nmId || null,
+        url: link ? link.href : null,
+        price: text(card, '.price__lower-price, .product-card__price ins'),
+        brand: text(card, '.product-card__brand'),
+        name: text(card, '.product-card__name'),
+        rating: text(card, '.address-rate-mini, .product-card__rating'),
+    };
+});
+"""
 
 
 class Wildberries:
@@ -15,8 +36,9 @@ class Wildberries:
 
     MAIN_URL = 'https://www.wildberries.ru/catalog/elektronika/tv-audio-foto-video-tehnika/televizory/televizory'
     ELEMENT_WAIT_TIME = 10
-    WAITING_TIME_ENTER_WORD = 0.3
-    CLASSIC_SLEEP_TIME = 5
+    CARD_SELECTOR = 'article.product-card'
+    BRAND_FILTER_SELECTOR = '.filters-desktop__item.j-filter-container.filters-desktop__item--type-6.filters-desktop__item--fbrand.open.show'
+    DIAGONAL_FILTER_SELECTOR = '.filters-desktop__item.j-filter-container.filters-desktop__item--type-1.filters-desktop__item--f92740.open.show'
 
     def __init__(self, custom_logger: object, brand_name: str, diagonal: str, price_start: str, price_end: str) -> None:
         """
@@ -37,9 +59,8 @@ class Wildberries:
         self._check_price_input_user()
 
         # Надстройки для браузера
-        options = Options()
-        options.add_argument("--start-maximized")
-        self.driver = webdriver.Chrome(options=options)
+        self.driver = create_chrome()
+        self.wait = Waiter(driver=self.driver, timeout=self.ELEMENT_WAIT_TIME)
 
     def _check_price_input_user(self) -> None:
         """Проверка цены, введенной пользователем"""
@@ -56,22 +77,24 @@ class Wildberries:
 
         self.driver.execute_script("arguments[0].scrollIntoView();", element)
 
-    def smooth_scroll_until_element_appears(self, scroll_pause_time: float = 0.5, scroll_increment: int = 300) -> None:
+    def smooth_scroll_until_element_appears(self, expected: int = None, page: int = None) -> int:
         """
-        Плавно скроллит страницу до тех пор, пока не появится элемент с указанным селектором.
+        Прокручивает страницу крупными шагами, пока подгружаются карточки товаров. Останавливается, как только
+        загружено expected карточек или их количество и высота страницы перестали меняться
 
-        :param scroll_pause_time: Время паузы между скроллами (в секундах)
-        :param scroll_increment: Величина скролла за один шаг (в пикселях)
+        :param expected: Ожидаемое количество карточек на странице
+        :param page: Номер страницы (для замеров)
+        :return: Количество загруженных карточек
         """
 
-        max_scrolls = int(20 / scroll_pause_time)  # Максимальное количество попыток скроллинга для 1 минуты
-        scroll_count = 0
+        expected = CONFIG['catalog_page_size'] if expected is None else expected
+        count, settled = self.wait.cards_loaded(self.CARD_SELECTOR, expected=expected)
+        METRICS.incr('catalog.cards_loaded', count, page=page)
+        if not settled:
+            METRICS.incr('catalog.partial_page', page=page)
+            self.log.info(f'Страница {page}: карточки не догрузились за отведённое время, загружено {count}')
 
-        while scroll_count < max_scrolls:
-            self.driver.execute_script(
-                f"window.scrollTo(0, {self.driver.execute_script('return window.scrollY') + scroll_increment});")
-            sleep(scroll_pause_time)
-            scroll_count += 1
+        return count
 
     def _click_check_box(self, element) -> None:
         """
@@ -98,10 +121,9 @@ class Wildberries:
         self.log.info('Нажимаю "Все фильтры"')
 
         try:
-            all_filters = WebDriverWait(self.driver, timeout=self.ELEMENT_WAIT_TIME).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, '.dropdown-filter.j-show-all-filtres'))
-            )
+            all_filters = self.wait.clickable((By.CSS_SELECTOR, '.dropdown-filter.j-show-all-filtres'))
             all_filters.click()
+            self.wait.visible((By.CSS_SELECTOR, self.BRAND_FILTER_SELECTOR))
 
         except TimeoutException:
             self.log.info(
@@ -125,46 +147,38 @@ class Wildberries:
         """Установка бренда"""
 
         self.log.info('Ввожу название бренда')
-        sleep(self.CLASSIC_SLEEP_TIME)
         try:
-            # all_brand = WebDriverWait(self.driver, timeout=self.ELEMENT_WAIT_TIME).until(
-            #     EC.presence_of_element_located((By.CSS_SELECTOR,
-            #                                     '.filters-desktop__item.j-filter-container.filters-desktop__item--type-6.filters-desktop__item--fbrand.open.show'))
-            # )
-            # if all_brand:
-            daughter_all_brand = self.driver.find_element(By.CSS_SELECTOR,
-                                                          '.filters-desktop__item.j-filter-container.filters-desktop__item--type-6.filters-desktop__item--fbrand.open.show')
-
-            show_all = daughter_all_brand.find_element(By.CSS_SELECTOR, '.filter__show-all.j-show-whole-filters')
+            daughter_all_brand = self.driver.find_element(By.CSS_SELECTOR, self.BRAND_FILTER_SELECTOR)
             self.scroll_to_element(element=daughter_all_brand)
             daughter_all_brand.click()
-            sleep(self.CLASSIC_SLEEP_TIME)
 
+            show_all = self.wait.clickable((By.CSS_SELECTOR, '.filter__show-all.j-show-whole-filters'),
+                                           root=daughter_all_brand)
             show_all.click()
-            sleep(self.CLASSIC_SLEEP_TIME)
 
-            brand_input = daughter_all_brand.find_element(By.CSS_SELECTOR, '.j-search-filter')
+            brand_input = self.wait.clickable((By.CSS_SELECTOR, '.j-search-filter'), root=daughter_all_brand)
+            filter_list = (By.CSS_SELECTOR, '.filter__list')
+            old_list_text = daughter_all_brand.find_element(*filter_list).text
             brand_input.clear()
-            for char in self.brand_name:
-                brand_input.send_keys(char)
-                sleep(self.WAITING_TIME_ENTER_WORD)
+            brand_input.send_keys(self.brand_name)
+
+            try:
+                list_text = self.wait.text_changed(filter_list, old_list_text, root=daughter_all_brand)
+            except TimeoutException:
+                # Список мог не измениться, если бренд уже был первым
+                list_text = old_list_text
 
-            name_bran_on_site = daughter_all_brand.find_element(By.CSS_SELECTOR, '.filter__list').text.split('\n')[
-                0]
+            name_bran_on_site = list_text.split('\n')[0]
             if self._check_name_brand(name_bran_on_site):
                 self.log.info(f'Бренд "{self.brand_name}" существует, выбираю его!')
                 self._click_check_box(element=daughter_all_brand)
-                sleep(self.CLASSIC_SLEEP_TIME)
+                self.wait.network_idle()
 
             else:
                 self.log.info(
                     f'Бренда "{self.brand_name}" не существует, проверьте корректность ввода бренда! Первый попавшийся бренд, это: {name_bran_on_site}')
                 raise ValueError(f'Бренда "{self.brand_name}" не существует, проверьте корректность ввода бренда!')
 
-            # else:
-            #     self.log.info(f'Не смог найти "Бренды"')
-            #     raise ValueError(f'Бренда "{self.brand_name}" не существует, проверьте корректность ввода бренда!')
-
         except NoSuchElementException:
             self.log.info('Не смог найти окно "Бренд", завершаю свою работу!')
             raise NoSuchElementException('Не смог найти элемент "Бренд"')
@@ -179,12 +193,11 @@ class Wildberries:
         self.log.info('Выбираю диагональ')
 
         try:
-            all_diagonal = self.driver.find_element(By.CSS_SELECTOR,
-                                                    '.filters-desktop__item.j-filter-container.filters-desktop__item--type-1.filters-desktop__item--f92740.open.show')
+            all_diagonal = self.driver.find_element(By.CSS_SELECTOR, self.DIAGONAL_FILTER_SELECTOR)
             self.scroll_to_element(element=all_diagonal)
-            sleep(self.CLASSIC_SLEEP_TIME)
+            self.wait.clickable((By.CSS_SELECTOR, '.filter__item'), root=all_diagonal)
 
-        except NoSuchElementException:
+        except (NoSuchElementException, TimeoutException):
             self.log.info('Не смог найти окно "Диагональ", завершаю свою работу!')
             raise NoSuchElementException('Не смог найти элемент "Диагональ"')
 
@@ -211,7 +224,7 @@ class Wildberries:
 
         try:
             self.driver.find_element(By.CSS_SELECTOR, '.filters-desktop__btn-main.btn-main').click()
-            sleep(self.WAITING_TIME_ENTER_WORD)
+            self.wait.network_idle()
 
         except NoSuchElementException:
             self.log.info('Не смог найти кнопку "Показать", завершаю свою работу!')
@@ -239,19 +252,14 @@ class Wildberries:
             elem_price_start = self.driver.find_element(By.CSS_SELECTOR, 'input.j-price[name="startN"]')
             elem_price_start.click()
             elem_price_start.clear()
-            for char in self.price_start:
-                elem_price_start.send_keys(char)
-                sleep(self.WAITING_TIME_ENTER_WORD)
-
+            elem_price_start.send_keys(self.price_start)
 
             elem_price_end = self.driver.find_element(By.CSS_SELECTOR, 'input.j-price[name="endN"]')
             elem_price_end.click()
             elem_price_end.clear()
-            for char in self.price_end:
-                elem_price_end.send_keys(char)
-                sleep(self.WAITING_TIME_ENTER_WORD)
+            elem_price_end.send_keys(self.price_end)
 
-            sleep(self.WAITING_TIME_ENTER_WORD)
+            self.wait.network_idle()
 
             if 'Не нашлось подходящих товаров'.lower() in self.driver.find_element(By.CSS_SELECTOR,
                                                                                    '.not-found-result').text.lower():
@@ -262,41 +270,104 @@ class Wildberries:
             self.log.info(f'Произошла ошибка при установке цены: {ex}')
             raise Exception('Произошла ошибка при установке цены!')
 
-    def _all_product(self) -> str | None:
-        """Сбор всех ссылок на товары"""
+    def _harvest_cards(self) -> list:
+        """Данные всех карточек текущей страницы"""
 
-        path_to_csv = os.path.join(os.getcwd(), 'urls.csv')
+        raw_cards = self.driver.execute_script(HARVEST_SCRIPT, self.CARD_SELECTOR)
+        return [card_from_dom(raw_card) for raw_card in raw_cards if raw_card.get('url')]
 
-        while True:
-            try:
-                self.smooth_scroll_until_element_appears()
-                product_cards = self.driver.find_elements(By.CSS_SELECTOR, 'article.product-card')
-                product_links = [card.find_element(By.CSS_SELECTOR, 'a.j-card-link').get_attribute('href') for card in
-                                 product_cards]
+    def _iter_pages(self) -> Iterator[list]:
+        """
+        Постраничный сбор карточек товаров. После последней страницы браузер закрывается
 
-                with open(path_to_csv, 'a', encoding='utf-8') as file:
-                    for url in product_links:
-                        file.write(url + '\n')
+        :return: Генератор списков новых карточек с каждой страницы
+        """
 
-                next_page = self.driver.find_element(By.CSS_SELECTOR, '.pagination-next.pagination__next.j-next-page')
-                self.scroll_to_element(element=product_cards[-1])
+        seen_urls = set()
+        page = 0
+        try:
+            while True:
+                page += 1
+                with METRICS.span('catalog.page', page=page):
+                    if not self.smooth_scroll_until_element_appears(page=page):
+                        break
+                    cards = self._harvest_cards()
+
+                new_cards = [card for card in cards if card['url'] not in seen_urls]
+                seen_urls.update(card['url'] for card in new_cards)
+                yield new_cards
+
+                try:
+                    next_page = self.driver.find_element(By.CSS_SELECTOR,
+                                                         '.pagination-next.pagination__next.j-next-page')
+                except NoSuchElementException:
+                    break
+
+                # Первая карточка старой страницы: пока она в DOM, новая страница ещё не отрисована
+                old_cards = self.driver.find_elements(By.CSS_SELECTOR, self.CARD_SELECTOR)[:1]
+                old_url = self.driver.current_url
+                self.scroll_to_element(element=next_page)
                 next_page.click()
+                try:
+                    self.wait.page_changed(old_cards[0] if old_cards else None, old_url)
+                except TimeoutException:
+                    self.log.info(f'Страница {page + 1} не открылась после перехода, заканчиваю сбор')
+                    METRICS.incr('catalog.page_not_changed', page=page)
+                    break
+
+        finally:
+            self._quit_driver()
+
+    def _quit_driver(self) -> None:
+        """Закрытие браузера"""
 
+        try:
+            self.driver.close()
+        except Exception as ex_close:
+            self.log.info(f'Не смог закрыть вкладку браузера! Ошибка:\n{ex_close}')
+        finally:
+            self.driver.quit()
+
+    def _all_product(self) -> str | None:
+        """Сбор всех карточек товаров в products.csv"""
 
-            except NoSuchElementException:
-                break
+        return write_cards(os.path.join(os.getcwd(), 'products.csv'), self._iter_pages())
 
-        self.driver.close()
-        self.driver.quit()
-        return path_to_csv
+    def _apply_filters(self) -> None:
+        """Открытие каталога и установка всех фильтров. Если фильтры не установились, браузер закрывается:
+        до сбора страниц, который закрывает его сам, дело уже не дойдёт"""
+
+        try:
+            with METRICS.span('catalog.navigate', url=self.MAIN_URL):
+                self.driver.get(self.MAIN_URL)
+            with METRICS.span('catalog.filter.all_filters'):
+                self._click_all_filters()
+            with METRICS.span('catalog.filter.price'):
+                self._set_price()
+            with METRICS.span('catalog.filter.brand'):
+                self._set_brand()
+            with METRICS.span('catalog.filter.diagonal'):
+                self._set_diagonal()
+            with METRICS.span('catalog.filter.apply'):
+                self._click_button_view()
+        except BaseException:
+            self._quit_driver()
+            raise
+
+    def iter_product_cards(self) -> Iterator[list]:
+        """Потоковый сбор карточек: карточки с каждой страницы отдаются сразу, не дожидаясь остальных страниц"""
+
+        self._apply_filters()
+        yield from self._iter_pages()
+
+    def iter_product_urls(self) -> Iterator[list]:
+        """Потоковый сбор ссылок: ссылки с каждой страницы отдаются сразу, не дожидаясь остальных страниц"""
+
+        for cards in self.iter_product_cards():
+            yield [card['url'] for card in cards]
 
     def get_TV_data(self) -> str | None:
         """Основной метод для получения данных о телевизорах"""
 
-        self.driver.get(self.MAIN_URL)
-        self._click_all_filters()
-        self._set_price()
-        self._set_brand()
-        self._set_diagonal()
-        self._click_button_view()
+        self._apply_filters()
         return self._all_product()
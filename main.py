@@ -1,22 +1,92 @@
-from threading import Thread
+import os
+from datetime import datetime
+from time import sleep
+from typing import Iterable
 
 from _logger import CustomLogger
-from config import CONFIG, CONFIG_TV
-from link_collection import Wildberries
-from other import read_csv_without_header, list_files_in_directory
+from _metrics import METRICS
+from batch import BatchCollector, load_queries
+from browser_pool import BrowserPool
+from cert_fetcher import CertificateFetcher
+from config import CONFIG
+from job_queue import JobQueue, JobResult, JobStatus
+from ledger import RunLedger
 from pars_data_product import WildberriesProduct
-from work_with_excel import write_data_to_excel_wireBank
-from work_with_pdf import PDF
+from pipeline import Pipeline, write_certificate_report
 
 
-def process_url(url_data: str, log: CustomLogger) -> None:
+def run_local(log: object, ledger: RunLedger, url_batches: Iterable[list]) -> None:
     """
-    Запуск обработки URL для потоков.
+    Обработка всех товаров в этом процессе
 
-    :param url_data: URL для обработки.
-    :param log: Объект логгера.
+    :param log: Объект логгера
+    :param ledger: Журнал прогресса
+    :param url_batches: Источник ссылок, отдающий их постранично по мере сбора
     """
-    WildberriesProduct(custom_logger=log, url=url_data).get_data()
+
+    pool = BrowserPool(driver_factory=WildberriesProduct.create_driver, size=CONFIG['browser_pool_size'],
+                       max_uses=CONFIG['browser_max_uses'], custom_logger=log,
+                       download_root=CONFIG['path_to_downloads'])
+    fetcher = CertificateFetcher(custom_logger=log, index=ledger) if CONFIG['cert_fetcher_enabled'] else None
+
+    # Сбор ссылок по всем запросам, скачивание сертификатов и разбор PDF идут одновременно
+    try:
+        Pipeline(custom_logger=log, ledger=ledger, pool=pool, fetcher=fetcher).run(url_batches=url_batches)
+    finally:
+        pool.close()
+
+
+def save_job_result(ledger: RunLedger, result: JobResult) -> None:
+    """
+    Перенос результата обработчика в журнал, чтобы следующий запуск (локальный или распределённый) его учитывал
+
+    :param ledger: Журнал прогресса
+    :param result: Результат задачи общей очереди
+    """
+
+    if result.path_to_file:
+        ledger.mark_downloaded(result.url, result.path_to_file)
+
+    if result.status == JobStatus.DONE:
+        ledger.mark_extracted(result.url, result.phone, result.email, result.certificate)
+    elif result.status == JobStatus.NO_CERTIFICATE:
+        ledger.mark_no_certificate(result.url)
+    elif result.status == JobStatus.FAILED:
+        ledger.mark_failed(result.url, result.error)
+
+
+def run_distributed(log: object, ledger: RunLedger, url_batches: Iterable[list]) -> None:
+    """
+    Публикация ссылок в общую очередь и сбор результатов обработчиков (worker.py) в отчёт
+
+    :param log: Объект логгера
+    :param ledger: Журнал прогресса
+    :param url_batches: Источник ссылок, отдающий их постранично по мере сбора
+    """
+
+    started = datetime.now().isoformat(timespec='seconds')
+    queue = JobQueue()
+    try:
+        # Товары прошлых запусков, у которых по журналу остались попытки, публикуются заново
+        ledger.requeue_expired_probes()
+        log.info(f'Возвращено в очередь из журнала: {queue.publish(ledger.pending_urls(), requeue=True)}')
+
+        for product_links in url_batches:
+            ledger.add_urls(product_links)
+            log.info(f'Получено ссылок: {len(product_links)}, опубликовано: {queue.publish(product_links)}')
+
+        while not queue.is_drained():
+            log.info(f'Жду обработчиков. Очередь: {queue.counts()}')
+            sleep(CONFIG['job_poll_interval'])
+
+        # Только результаты этого запуска: старые уже в журнале, и ошибки не должны считаться дважды
+        for result in queue.results(statuses=JobStatus.FINISHED, since=started):
+            save_job_result(ledger, result)
+        write_certificate_report(ledger)
+
+        log.info(f'Очередь: {queue.counts()}')
+    finally:
+        queue.close()
 
 
 def main() -> None:
@@ -24,36 +94,38 @@ def main() -> None:
     Основная функция для запуска обработки данных.
     """
 
-    logger = CustomLogger()
+    logger = CustomLogger(use_queue=CONFIG['log_queue'], rotation=CONFIG['log_rotation'],
+                          max_bytes=CONFIG['log_max_bytes'], backup_count=CONFIG['log_backup_count'])
     log = logger.start_initialization()
+    METRICS.configure(os.path.join(logger.path_to_folder, f'metrics_{logger.current_day}.jsonl'))
+
+    ledger = None
+    try:
+        ledger = RunLedger()
+        log.info(f'Состояние журнала: {ledger.counts()}')
+
+        queries = load_queries(CONFIG['queries_file'])
+        log.info(f'Запросов: {len(queries)}')
+
+        collector = BatchCollector(custom_logger=log, ledger=ledger, queries=queries)
+        if CONFIG['distributed']:
+            run_distributed(log, ledger, collector.iter_product_urls())
+        else:
+            run_local(log, ledger, collector.iter_product_urls())
+
+        log.info(f'Состояние журнала: {ledger.counts()}')
+
+    except BaseException as ex_main:
+        log.info(f'Работа прервана! Ошибка:\n{ex_main!r}')
+        raise
 
-    # Получение данных о телевизорах
-    path_to_csv = Wildberries(custom_logger=log, brand_name=CONFIG_TV['brand_name'], diagonal=CONFIG_TV['diagonal'],
-                              price_start=CONFIG_TV['price_start'], price_end=CONFIG_TV['price_end']).get_TV_data()
-
-    # Чтение данных из CSV файла
-    all_data = read_csv_without_header(file_path=path_to_csv)
-
-    # Запуск потоков для обработки URL
-    threads = []
-    for url in all_data:
-        if len(threads) >= 5:
-            for thread in threads:
-                thread.join()
-            threads = []
-        thread = Thread(target=process_url, args=(url, log))
-        threads.append(thread)
-        thread.start()
-
-    for thread in threads:
-        thread.join()
-
-    # Обработка PDF файлов
-    all_pdf_list = list_files_in_directory(path_to_folder=CONFIG['path_to_save_pdf'])
-    for pdf_file in all_pdf_list:
-        _pdf = PDF(log=log, path_to_file=pdf_file)
-        number_phone, user_email = _pdf.get_data()
-        write_data_to_excel_wireBank(data=[number_phone, user_email])
+    finally:
+        # Логгер закрывается в любом случае, иначе записи из очереди, в том числе об ошибке, не попадут в файл
+        if ledger:
+            ledger.close()
+        METRICS.log_summary(log)
+        METRICS.close()
+        logger.close_logger()
 
 
 if __name__ == '__main__':
@@ -1,15 +1,16 @@
 import os.path
-from time import sleep
+import shutil
+import tempfile
 
-from selenium import webdriver
 from selenium.common.exceptions import NoSuchElementException, TimeoutException
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.ui import WebDriverWait
 
+from _metrics import METRICS
+from browser import create_chrome
 from other import create_folder
 from config import CONFIG
+from downloads import finalize_download, list_finished_files, product_id_from_url, wait_for_download
+from waits import Waiter
 
 
 class WildberriesProduct:
@@ -17,32 +18,42 @@ class WildberriesProduct:
 
     PATH_TO_SAVE_FILE = CONFIG['path_to_save_pdf']
     ELEMENT_WAIT_TIME = 10
-    WAITING_TIME_ENTER_WORD = 0.3
-    CLASSIC_SLEEP_TIME = 5
 
-    def __init__(self, custom_logger: object, url: str) -> None:
+    def __init__(self, custom_logger: object, url: str, driver: object = None, download_dir: str = None) -> None:
         """
         Инициализация параметров
 
         :param custom_logger: Объект логгера
         :param url: URL страницы продукта
+        :param driver: Готовый webdriver из пула браузеров. Если не передан, запускается собственный браузер
+        :param download_dir: Директория загрузок переданного браузера
         """
 
         self.log = custom_logger
         self.url = url
+        self.product_id = product_id_from_url(url)
 
         create_folder(self.PATH_TO_SAVE_FILE)
 
-        # Надстройки для браузера
-        options = Options()
-        options.add_argument("--start-maximized")
-        options.add_experimental_option("prefs", {
-            "download.default_directory": self.PATH_TO_SAVE_FILE,
-            "download.prompt_for_download": False,
-            "download.directory_upgrade": True,
-            "safebrowsing.enabled": True
-        })
-        self.driver = webdriver.Chrome(options=options)
+        self._own_driver = driver is None
+        if self._own_driver:
+            self.download_dir = tempfile.mkdtemp(prefix='session_', dir=self.PATH_TO_SAVE_FILE)
+            self.driver = self.create_driver(download_dir=self.download_dir)
+        else:
+            self.download_dir = download_dir or self.PATH_TO_SAVE_FILE
+            self.driver = driver
+        self.wait = Waiter(driver=self.driver, timeout=self.ELEMENT_WAIT_TIME)
+        self._details_settled = False
+
+    @classmethod
+    def create_driver(cls, download_dir: str = None) -> object:
+        """
+        Запуск браузера с настройками для скачивания документов
+
+        :param download_dir: Директория загрузок браузера. По умолчанию общая директория для PDF
+        """
+
+        return create_chrome(download_dir=download_dir or cls.PATH_TO_SAVE_FILE)
 
     def _go_to_product_page(self) -> None:
         """Переход на страницу товара"""
@@ -53,12 +64,10 @@ class WildberriesProduct:
         """Ожидание элемента 'Все характеристики и описание' и клик по нему"""
 
         try:
-            all_filters = WebDriverWait(self.driver, timeout=self.ELEMENT_WAIT_TIME).until(
-                EC.presence_of_element_located(
-                    (By.CSS_SELECTOR, '.product-page__btn-detail.hide-mobile.j-details-btn-desktop'))
-            )
+            all_filters = self.wait.clickable(
+                (By.CSS_SELECTOR, '.product-page__btn-detail.hide-mobile.j-details-btn-desktop'))
             all_filters.click()
-            sleep(self.CLASSIC_SLEEP_TIME)
+            self._details_settled = self.wait.network_idle()
 
         except TimeoutException:
             self.log.info(
@@ -76,39 +85,79 @@ class WildberriesProduct:
     def _check_doc(self) -> bool:
         """Проверка наличия кнопки 'Документы проверены' и клик по ней"""
 
+        locator = (By.CSS_SELECTOR, '.btn-certificate')
+        try:
+            # Если сеть на странице так и не затихла, описание могло ещё не отрисоваться: кнопку ждём явно
+            doc_check = self.driver.find_element(*locator) if self._details_settled else self.wait.present(locator)
+        except (NoSuchElementException, TimeoutException):
+            self.log.info('Не смог найти элемент "Документы проверены", завершаю свою работу!')
+            return False
+
+        # Кнопка есть, значит документ есть: ошибка дальше - сбой, который нужно повторить, а не "нет сертификата"
         try:
-            doc_check = self.driver.find_element(By.CSS_SELECTOR, '.btn-certificate')
             doc_check.click()
-            sleep(self.CLASSIC_SLEEP_TIME)
-            self.driver.find_element(By.CSS_SELECTOR, '.popup__step-link').click()
-            sleep(self.CLASSIC_SLEEP_TIME)
+            step_link = self.wait.clickable((By.CSS_SELECTOR, '.popup__step-link'))
+            handles_before = self.driver.window_handles
+            step_link.click()
+            self.wait.new_window(handles_before)
             return True
 
-        except NoSuchElementException:
-            self.log.info('Не смог найти элемент "Документы проверены", завершаю свою работу!')
-            return False
+        except TimeoutException:
+            self.log.info('Не открылось окно с документами, завершаю свою работу!')
+            raise TimeoutException('Истекло время ожидания окна с документами')
 
-    def _download_doc(self) -> None:
-        """Скачивание документа"""
+    def _download_doc(self) -> str | None:
+        """
+        Скачивание документа
+
+        :return: Путь до скачанного PDF файла, названного по id товара
+        """
 
         try:
             self.driver.switch_to.window(self.driver.window_handles[1])
-            down_button = WebDriverWait(self.driver, timeout=self.ELEMENT_WAIT_TIME).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, '.btn.btn_accent.btn-download-pdf'))
-            )
-            sleep(self.CLASSIC_SLEEP_TIME)
+            down_button = self.wait.clickable((By.CSS_SELECTOR, '.btn.btn_accent.btn-download-pdf'))
+            files_before = list_finished_files(self.download_dir)
             down_button.click()
-            sleep(self.CLASSIC_SLEEP_TIME)
+            path_to_file = wait_for_download(self.download_dir, files_before=files_before,
+                                             timeout=CONFIG['download_timeout'],
+                                             poll_interval=CONFIG['wait_poll_interval'])
+            return finalize_download(path_to_file, self.PATH_TO_SAVE_FILE, self.product_id)
 
         except Exception as ex:
             self.log.info(f'Произошла ошибка при скачивании документа: {ex}')
+            raise
 
-    def get_data(self) -> None:
-        """Основной метод для получения данных о товаре"""
+    def get_data(self) -> str | None:
+        """
+        Основной метод для получения данных о товаре
+
+        :return: Путь до скачанного сертификата или None, если сертификата нет.
+            Ошибки загрузки страницы и скачивания пробрасываются, чтобы товар можно было повторить
+        """
 
-        self._go_to_product_page()
-        self._waiting_elem()
-        if self._check_doc():
-            self._download_doc()
-        self.driver.close()
-        self.driver.quit()
+        try:
+            with METRICS.span('product.navigate', url=self.url):
+                self._go_to_product_page()
+            with METRICS.span('product.details', url=self.url):
+                self._waiting_elem()
+            with METRICS.span('product.certificate_check', url=self.url):
+                has_certificate = self._check_doc()
+
+            if not has_certificate:
+                METRICS.incr('product.no_certificate', url=self.url)
+                return None
+
+            try:
+                with METRICS.span('product.download', url=self.url):
+                    path_to_file = self._download_doc()
+            except Exception:
+                METRICS.incr('product.download_failed', url=self.url)
+                raise
+
+            METRICS.incr('product.downloaded', url=self.url)
+            return path_to_file
+
+        finally:
+            if self._own_driver:
+                self.driver.quit()
+                shutil.rmtree(self.download_dir, ignore_errors=True)
@@ -0,0 +1,150 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from config import CONFIG
+from other import create_folder
+from work_with_pdf import EXTRACTOR_VERSION, ExtractionResult
+
+
+class ExtractionCache:
+    """Постоянный кеш результатов разбора PDF по хешу содержимого файла"""
+
+    CHUNK_SIZE = 1024 * 1024
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS files (
+            path_to_file TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            sha256 TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS results (
+            sha256 TEXT PRIMARY KEY,
+            version INTEGER NOT NULL,
+            phone TEXT,
+            email TEXT,
+            certificate TEXT,
+            last_used TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used);
+    '''
+
+    def __init__(self, path_to_db: str = None, max_entries: int = None) -> None:
+        """
+        Инициализация параметров
+
+        :param path_to_db: Путь до файла базы SQLite
+        :param max_entries: Максимальное количество результатов в кеше. Самые старые вытесняются
+        """
+
+        self.path_to_db = path_to_db or CONFIG['path_to_pdf_cache']
+        self.max_entries = max_entries or CONFIG['pdf_cache_max_entries']
+        create_folder(os.path.dirname(self.path_to_db))
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path_to_db, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.executescript(self.SCHEMA)
+        self._migrate()
+
+    def _migrate(self) -> None:
+        """Добавление колонок, которых нет в базах, созданных прошлыми версиями"""
+
+        columns = {row[1] for row in self._connection.execute('PRAGMA table_info(results)')}
+        if 'certificate' not in columns:
+            with self._connection:
+                self._connection.execute('ALTER TABLE results ADD COLUMN certificate TEXT')
+
+    @staticmethod
+    def _now() -> str:
+        """Текущее время в ISO формате"""
+        return datetime.now().isoformat(timespec='microseconds')
+
+    def _hash_file(self, path_to_file: str) -> str:
+        """Подсчёт SHA-256 содержимого файла"""
+
+        digest = hashlib.sha256()
+        with open(path_to_file, 'rb') as file:
+            for chunk in iter(lambda: file.read(self.CHUNK_SIZE), b''):
+                digest.update(chunk)
+
+        return digest.hexdigest()
+
+    def file_hash(self, path_to_file: str) -> str:
+        """
+        Хеш содержимого файла. Если размер и время изменения не поменялись, берётся сохранённый хеш
+
+        :param path_to_file: Полный путь до файла
+        """
+
+        stat = os.stat(path_to_file)
+        with self._lock:
+            row = self._connection.execute('SELECT size, mtime_ns, sha256 FROM files WHERE path_to_file = ?',
+                                           (path_to_file,)).fetchone()
+        if row and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            return row[2]
+
+        sha256 = self._hash_file(path_to_file)
+        with self._lock, self._connection:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO files (path_to_file, size, mtime_ns, sha256) VALUES (?, ?, ?, ?)',
+                (path_to_file, stat.st_size, stat.st_mtime_ns, sha256))
+
+        return sha256
+
+    def get(self, path_to_file: str) -> ExtractionResult | None:
+        """
+        Получение сохранённого результата разбора файла
+
+        :param path_to_file: Полный путь до PDF файла
+        :return: Результат или None, если файла нет в кеше или он разобран старой версией парсера
+        """
+
+        sha256 = self.file_hash(path_to_file)
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                'SELECT phone, email, certificate FROM results WHERE sha256 = ? AND version = ?',
+                (sha256, EXTRACTOR_VERSION)).fetchone()
+            if row is None:
+                return None
+            self._connection.execute('UPDATE results SET last_used = ? WHERE sha256 = ?', (self._now(), sha256))
+
+        return ExtractionResult(path_to_file=path_to_file, phone=row[0], email=row[1], certificate=row[2])
+
+    def put(self, result: ExtractionResult) -> None:
+        """
+        Сохранение результата разбора. Результаты с ошибкой не кешируются
+
+        :param result: Результат разбора PDF
+        """
+
+        if result.error:
+            return
+
+        sha256 = self.file_hash(result.path_to_file)
+        with self._lock, self._connection:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO results (sha256, version, phone, email, certificate, last_used) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (sha256, EXTRACTOR_VERSION, result.phone, result.email, result.certificate, self._now()))
+            self._evict()
+
+    def _evict(self) -> None:
+        """Удаление давно не использованных результатов сверх лимита (вызывается под блокировкой)"""
+
+        count = self._connection.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+        if count <= self.max_entries:
+            return
+
+        self._connection.execute(
+            'DELETE FROM results WHERE sha256 IN (SELECT sha256 FROM results ORDER BY last_used LIMIT ?)',
+            (count - self.max_entries,))
+        self._connection.execute('DELETE FROM files WHERE sha256 NOT IN (SELECT sha256 FROM results)')
+
+    def close(self) -> None:
+        """Закрытие соединения с базой"""
+
+        with self._lock:
+            self._connection.close()
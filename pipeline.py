@@ -0,0 +1,279 @@
+import sqlite3
+import threading
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from queue import Queue
+from typing import Iterable
+
+from _metrics import METRICS
+from browser_pool import BrowserPool
+from cert_fetcher import CertificateFetcher, FetchResult
+from config import CONFIG
+from downloads import product_id_from_url
+from ledger import RunLedger
+from pars_data_product import WildberriesProduct
+from pdf_cache import ExtractionCache
+from scheduler import TaskResult, WorkerScheduler
+from sinks import ResultSink, create_sinks, write_results
+from throttle import Throttle
+from work_with_pdf import ExtractionResult, create_extraction_pool, extract_file
+
+
+def write_certificate_report(ledger: RunLedger, sinks: list[ResultSink] = None) -> None:
+    """
+    Запись результатов: одна запись на уникальный сертификат со списком товаров, которые на него ссылаются
+
+    :param ledger: Журнал прогресса
+    :param sinks: Приёмники результатов (закрываются после записи). По умолчанию CONFIG['result_sinks']
+    """
+
+    write_results(create_sinks() if sinks is None else sinks, ledger.certificate_rows())
+
+
+class Pipeline:
+    """Потоковый конвейер: сбор ссылок -> скачивание сертификатов -> разбор PDF.
+    Стадии связаны ограниченными очередями и работают одновременно"""
+
+    _STOP = object()
+
+    def __init__(self, custom_logger: object, ledger: RunLedger, pool: BrowserPool,
+                 fetcher: CertificateFetcher = None, sinks: list[ResultSink] = None) -> None:
+        """
+        Инициализация параметров
+
+        :param custom_logger: Объект логгера
+        :param ledger: Журнал прогресса
+        :param pool: Пул браузеров
+        :param fetcher: Загрузчик сертификатов по HTTP. Если не передан, все товары открываются в браузере
+        :param sinks: Приёмники результатов. По умолчанию CONFIG['result_sinks']
+        """
+
+        self.log = custom_logger
+        self.ledger = ledger
+        self.pool = pool
+        self.fetcher = fetcher
+
+        self._pdf_queue = Queue(maxsize=CONFIG['pdf_queue_size'])
+        self.sinks = create_sinks() if sinks is None else sinks
+        self.cache = ExtractionCache() if CONFIG['pdf_cache_enabled'] else None
+        self.throttle = Throttle(custom_logger=custom_logger)
+        # У HTTP свой лимит одновременных запросов, но частота запросов к сайту общая с браузерами.
+        # Повторы HTTP делает urllib3, после неудачи товар уходит в браузер
+        self.http_throttle = self.throttle.share(initial=CONFIG['cert_concurrency'],
+                                                 max_limit=CONFIG['cert_concurrency'], attempts=1)
+        # Потоков столько, сколько разрешает верхний лимит, реальную нагрузку задаёт self.throttle
+        self.browser = WorkerScheduler(func=self._process_in_browser, workers=CONFIG['workers_max'],
+                                       queue_size=CONFIG['queue_size'], task_timeout=CONFIG['task_timeout'],
+                                       custom_logger=custom_logger, on_result=self._on_browser_result,
+                                       on_timeout=pool.abort)
+        self.http = None
+        if fetcher:
+            self.http = WorkerScheduler(func=self._fetch, workers=CONFIG['cert_concurrency'],
+                                        custom_logger=custom_logger, on_result=self._on_http_result)
+
+    def _process_in_browser(self, url: str) -> str | None:
+        """
+        Обработка товара в браузере из пула
+
+        :param url: URL товара
+        :return: Путь до скачанного сертификата или None
+        """
+
+        def attempt() -> str | None:
+            # Сессия привязана к url: если задача зависнет, планировщик закроет её браузер через pool.abort
+            with self.pool.session(owner=url) as session:
+                # Задачу могли отменить, пока она ждала браузер: pool.abort тогда не нашёл её сессию
+                if self.browser.is_cancelled(url):
+                    raise CancelledError('Задача отменена до открытия страницы')
+                return WildberriesProduct(custom_logger=self.log, url=url, driver=session.driver,
+                                          download_dir=session.download_dir).get_data()
+
+        return self.throttle.call(attempt, name=url, cancelled=lambda: self.browser.is_cancelled(url),
+                                  untimed=lambda: self.browser.untimed(url))
+
+    def _fetch(self, url: str) -> FetchResult:
+        """Скачивание сертификата по HTTP в пределах общей частоты запросов"""
+
+        return self.http_throttle.call(lambda: self.fetcher.fetch_sync(url, raise_errors=True), name=url)
+
+    def _on_http_result(self, task_result: TaskResult) -> None:
+        """Скачанный по HTTP сертификат сразу уходит на разбор, товары без документов отсеиваются,
+        остальные товары - в браузер"""
+
+        fetched = task_result.result
+        if task_result.ok and fetched.has_certificate is not None:
+            self.ledger.save_probe(fetched.product_id, fetched.has_certificate)
+
+        if task_result.ok and fetched.resolved:
+            self.ledger.mark_downloaded(fetched.url, fetched.path_to_file)
+            self._pdf_queue.put((fetched.url, fetched.path_to_file))
+        elif task_result.ok and fetched.has_certificate is False:
+            self.ledger.mark_no_certificate(fetched.url)
+        else:
+            self.browser.submit(task_result.item)
+
+    def _on_browser_result(self, task_result: TaskResult) -> None:
+        """Запись результата браузера в журнал и передача PDF на разбор"""
+
+        url = task_result.item
+        # Сбой страницы или скачивания приходит ошибкой и повторяется при следующем запуске,
+        # "нет сертификата" - только если на странице нет кнопки "Документы проверены"
+        if not task_result.ok:
+            self.ledger.mark_failed(url, repr(task_result.error))
+        elif task_result.result:
+            self.ledger.mark_downloaded(url, task_result.result)
+            self._pdf_queue.put((url, task_result.result))
+        else:
+            self.ledger.mark_no_certificate(url)
+
+    def _submit_product(self, url: str) -> None:
+        """Передача товара на первую стадию скачивания. Товары, у которых недавно не нашлось документов, пропускаются"""
+
+        if self.http and self.ledger.cached_probe(product_id_from_url(url)) is False:
+            METRICS.incr('probe.cache_hit', url=url)
+            self.ledger.mark_no_certificate(url)
+            return
+
+        (self.http or self.browser).submit(url)
+
+    def _on_extracted(self, url: str, pdf_file: str, future: Future, slots: threading.BoundedSemaphore) -> None:
+        """Сохранение результата разбора из пула процессов"""
+
+        slots.release()
+        try:
+            extracted: ExtractionResult = future.result()
+        except Exception as ex_extract:
+            extracted = ExtractionResult(path_to_file=pdf_file, error=repr(ex_extract))
+        METRICS.record('pdf.parse', extracted.seconds, error=extracted.error, url=url, file=pdf_file)
+
+        if self.cache:
+            try:
+                self.cache.put(extracted)
+            except (OSError, sqlite3.Error) as ex_cache:
+                self.log.info(f'Не смог сохранить результат разбора {pdf_file} в кеш! Ошибка:\n{ex_cache}')
+
+        self._record_extraction(url, extracted)
+
+    def _cached_extraction(self, pdf_file: str) -> ExtractionResult | None:
+        """Поиск результата разбора в кеше"""
+
+        if not self.cache:
+            return None
+
+        try:
+            return self.cache.get(pdf_file)
+        except (OSError, sqlite3.Error) as ex_cache:
+            self.log.info(f'Не смог проверить кеш для {pdf_file}! Ошибка:\n{ex_cache}')
+            return None
+
+    def _record_extraction(self, url: str, extracted: ExtractionResult) -> None:
+        """Запись результата разбора PDF в журнал и буфер отчёта"""
+
+        if extracted.error:
+            self.log.info(f'Не смог обработать PDF {extracted.path_to_file}! Ошибка:\n{extracted.error}')
+            self.ledger.mark_failed(url, extracted.error)
+            return
+
+        self.ledger.mark_extracted(url, extracted.phone, extracted.email, extracted.certificate)
+
+    def _fail_extraction(self, url: str, error: str) -> None:
+        """Отметка об ошибке разбора, которая не должна остановить поток разбора"""
+
+        try:
+            self.ledger.mark_failed(url, error)
+        except Exception as ex_ledger:
+            self.log.info(f'Не смог записать ошибку разбора {url} в журнал! Ошибка:\n{ex_ledger}')
+
+    def _submit_extraction(self, executor: ProcessPoolExecutor, url: str, pdf_file: str,
+                           slots: threading.BoundedSemaphore) -> None:
+        """Разбор PDF из кеша или передача его в пул процессов"""
+
+        cached = self._cached_extraction(pdf_file)
+        if cached:
+            METRICS.incr('pdf.cache_hit', url=url)
+            self._record_extraction(url, cached)
+            return
+
+        slots.acquire()
+        try:
+            future = executor.submit(extract_file, pdf_file)
+        except BaseException:
+            slots.release()
+            raise
+        future.add_done_callback(lambda done: self._on_extracted(url, pdf_file, done, slots))
+
+    def _extract_worker(self) -> None:
+        """Разбор PDF в пуле процессов по мере их появления. Поток работает до _STOP, что бы ни случилось с файлом"""
+
+        workers = CONFIG['pdf_workers']
+        slots = threading.BoundedSemaphore(workers * 2)
+
+        executor = create_extraction_pool(workers)
+        try:
+            while True:
+                item = self._pdf_queue.get()
+                if item is self._STOP:
+                    return
+
+                url, pdf_file = item
+                try:
+                    self._submit_extraction(executor, url, pdf_file, slots)
+
+                except BrokenProcessPool as ex_pool:
+                    # Процесс разбора упал на одном из прошлых PDF: пул больше не принимает задачи.
+                    # Текущий файл не виноват, он отправляется в новый пул ещё раз
+                    self.log.info(f'Пул разбора PDF сломался, пересоздаю его! Ошибка:\n{ex_pool!r}')
+                    METRICS.incr('pdf.pool_restart', url=url)
+                    executor.shutdown(wait=False)
+                    executor = create_extraction_pool(workers)
+                    try:
+                        self._submit_extraction(executor, url, pdf_file, slots)
+                    except Exception as ex_retry:
+                        self.log.info(f'Не смог отправить PDF {pdf_file} на разбор! Ошибка:\n{ex_retry!r}')
+                        self._fail_extraction(url, repr(ex_retry))
+
+                except Exception as ex_extract:
+                    self.log.info(f'Не смог отправить PDF {pdf_file} на разбор! Ошибка:\n{ex_extract!r}')
+                    self._fail_extraction(url, repr(ex_extract))
+        finally:
+            executor.shutdown()
+
+    def run(self, url_batches: Iterable[list]) -> None:
+        """
+        Запуск конвейера
+
+        :param url_batches: Источник ссылок, отдающий их постранично по мере сбора
+        """
+
+        extractor = threading.Thread(target=self._extract_worker, name='pdf-extractor', daemon=True)
+        extractor.start()
+        self.browser.start()
+        if self.http:
+            self.http.start()
+
+        try:
+            # Сначала то, что осталось от прерванных запусков, и товары с устаревшей проверкой карточки
+            requeued = self.ledger.requeue_expired_probes()
+            if requeued:
+                self.log.info(f'Товаров с устаревшей проверкой документов: {requeued}, проверяю их снова')
+            for url, pdf_file in self.ledger.downloaded_files():
+                self._pdf_queue.put((url, pdf_file))
+            for url in self.ledger.pending_urls():
+                self._submit_product(url)
+
+            for product_links in url_batches:
+                new_urls = self.ledger.add_urls(product_links)
+                self.log.info(f'Получено ссылок: {len(product_links)}, новых: {len(new_urls)}')
+                for url in new_urls:
+                    self._submit_product(url)
+
+        finally:
+            # Стадии закрываются по порядку, чтобы каждая успела передать результаты следующей
+            if self.http:
+                self.http.join()
+            self.browser.join()
+            self._pdf_queue.put(self._STOP)
+            extractor.join()
+            write_certificate_report(self.ledger, self.sinks)
+            if self.cache:
+                self.cache.close()
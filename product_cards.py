@@ -0,0 +1,167 @@
+import csv
+import json
+import os
+import re
+from typing import Iterator
+
+from downloads import product_id_from_url
+from other import create_folder
+
+CARD_FIELDS = ('id', 'url', 'price', 'brand', 'name', 'rating')
+NUMBER_PATTERN = re.compile(r'\d+(?:[.,]\d+)?')
+
+
+def _to_number(value: object, kind: type = float) -> int | float | None:
+    """Число из текста карточки ('12 990 ₽' -> 12990, '4,8' -> 4.8)"""
+
+    if value is None or isinstance(value, (int, float)):
+        return value
+
+    match = NUMBER_PATTERN.search(str(value).replace('\xa0', '').replace(' ', ''))
+    return kind(float(match.group(0).replace(',', '.'))) if match else None
+
+
+def card_from_dom(raw: dict) -> dict:
+    """
+    Карточка товара из данных, собранных скриптом на странице каталога
+
+    :param raw: Словарь с сырыми значениями из DOM
+    :return: Карточка с полями CARD_FIELDS
+    """
+
+    url = raw.get('url')
+    return {
+        'id': str(raw.get('id') or product_id_from_url(url or '')),
+        'url': url,
+        'price': _to_number(raw.get('price'), int),
+        'brand': (raw.get('brand') or '').strip(' /') or None,
+        'name': (raw.get('name') or '').strip(' /') or None,
+        'rating': _to_number(raw.get('rating')),
+    }
+
+
+def card_from_api(product: dict, url: str) -> dict:
+    """
+    Карточка товара из ответа API каталога
+
+    :param product: Товар из ответа API
+    :param url: Ссылка на страницу товара
+    :return: Карточка с полями CARD_FIELDS
+    """
+
+    price = product.get('salePriceU') or product.get('priceU')
+    return {
+        'id': str(product['id']),
+        'url': url,
+        'price': price // 100 if price else None,
+        'brand': product.get('brand'),
+        'name': product.get('name'),
+        'rating': product.get('reviewRating', product.get('rating')),
+    }
+
+
+class CardWriter:
+    """Потоковая запись карточек товаров в CSV (с заголовком) или JSON lines (по расширению файла)"""
+
+    def __init__(self, path_to_file: str, keep_existing: bool = False) -> None:
+        """
+        Инициализация параметров
+
+        :param path_to_file: Путь до файла *.csv или *.jsonl. Файл перезаписывается
+        :param keep_existing: Сохранить карточки из прошлого файла, которых нет среди новых (например, по запросам,
+            пропущенным как недавно собранные). Новая карточка заменяет старую с тем же id.
+            Новые карточки пишутся во временный файл, который заменяет прошлый при закрытии
+        """
+
+        self.path_to_file = path_to_file
+        self.jsonl = path_to_file.endswith('.jsonl')
+        self.keep_existing = keep_existing
+        self.rows = 0
+        create_folder(os.path.dirname(os.path.abspath(path_to_file)))
+
+        root, extension = os.path.splitext(path_to_file)
+        self.path_to_tmp = f'{root}.tmp{extension}' if keep_existing else path_to_file
+        self._ids = set()
+
+        # Файл перезаписывается, чтобы повторные запуски не копили дубликаты
+        self._file = open(self.path_to_tmp, 'w', encoding='utf-8', newline='')
+        self._writer = None
+        if not self.jsonl:
+            self._writer = csv.DictWriter(self._file, fieldnames=CARD_FIELDS, extrasaction='ignore')
+            self._writer.writeheader()
+
+    def _write_card(self, card: dict) -> None:
+        """Запись одной карточки"""
+
+        if self.jsonl:
+            self._file.write(json.dumps({field: card.get(field) for field in CARD_FIELDS}, ensure_ascii=False) + '\n')
+        else:
+            self._writer.writerow(card)
+        self.rows += 1
+
+    def write(self, cards: list) -> None:
+        """
+        Запись карточек одной страницы
+
+        :param cards: Список карточек
+        """
+
+        for card in cards:
+            self._write_card(card)
+            if self.keep_existing:
+                self._ids.add(str(card.get('id')))
+        self._file.flush()
+
+    def _existing_cards(self) -> Iterator[dict]:
+        """Карточки из прошлого файла"""
+
+        with open(self.path_to_file, encoding='utf-8', newline='') as file:
+            if not self.jsonl:
+                yield from csv.DictReader(file)
+                return
+
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+    def close(self) -> None:
+        """Закрытие файла. При keep_existing к новым карточкам дописываются прошлые, и файл заменяется"""
+
+        if self._file.closed:
+            return
+
+        try:
+            if self.keep_existing and os.path.exists(self.path_to_file):
+                for card in self._existing_cards():
+                    if str(card.get('id')) not in self._ids:
+                        self._write_card(card)
+        finally:
+            self._file.close()
+
+        if self.keep_existing:
+            os.replace(self.path_to_tmp, self.path_to_file)
+
+    def __enter__(self) -> 'CardWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+def write_cards(path_to_file: str, card_batches) -> str:
+    """
+    Запись карточек в файл целиком через временный файл, чтобы при ошибке не оставить половину списка
+
+    :param path_to_file: Путь до файла *.csv или *.jsonl
+    :param card_batches: Источник списков карточек
+    :return: Путь до файла
+    """
+
+    root, extension = os.path.splitext(path_to_file)
+    path_to_tmp = f'{root}.tmp{extension}'
+    with CardWriter(path_to_tmp) as writer:
+        for cards in card_batches:
+            writer.write(cards)
+
+    os.replace(path_to_tmp, path_to_file)
+    return path_to_file
@@ -0,0 +1,243 @@
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from queue import Queue
+from time import monotonic
+from typing import Any, Callable, Iterable, Iterator
+
+
+@dataclass
+class TaskResult:
+    """Результат обработки одной задачи"""
+
+    item: Any
+    result: Any = None
+    error: BaseException | None = None
+    duration: float = 0.0
+    worker: str = ''
+
+    @property
+    def ok(self) -> bool:
+        """Задача выполнена без ошибок"""
+        return self.error is None
+
+
+class WorkerScheduler:
+    """Планировщик с ограниченной очередью и постоянно занятыми потоками-обработчиками"""
+
+    _STOP = object()
+
+    def __init__(self, func: Callable[[Any], Any], workers: int, queue_size: int = None, task_timeout: float = None,
+                 custom_logger: object = None, on_result: Callable[[TaskResult], None] = None,
+                 on_timeout: Callable[[Any], None] = None) -> None:
+        """
+        Инициализация параметров
+
+        :param func: Функция обработки одной задачи
+        :param workers: Количество потоков-обработчиков
+        :param queue_size: Размер очереди задач. По умолчанию в два раза больше количества потоков
+        :param task_timeout: Максимальное время выполнения одной задачи (в секундах)
+        :param custom_logger: Объект логгера
+        :param on_result: Функция, вызываемая для каждого результата сразу после завершения задачи
+        :param on_timeout: Функция, вызываемая с задачей, не уложившейся в task_timeout. Должна прервать задачу
+            (например, закрыть её браузер), чтобы та освободила занятые ресурсы
+        """
+
+        if workers < 1:
+            raise ValueError('Количество потоков должно быть больше 0')
+
+        self.func = func
+        self.workers = workers
+        self.task_timeout = task_timeout
+        self.log = custom_logger
+        self.on_result = on_result
+        self.on_timeout = on_timeout
+
+        self._queue = Queue(maxsize=queue_size or workers * 2)
+        self._threads = []
+        self._results = []
+        self._cancelled = set()
+        self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+        self._clocks = {}
+
+    def _log_info(self, message: str) -> None:
+        """Запись сообщения в лог, если логгер передан"""
+
+        if self.log:
+            self.log.info(message)
+
+    def _call_with_timeout(self, item: Any) -> tuple[Any, BaseException | None]:
+        """
+        Вызов функции обработки с ограничением по времени. Время внутри untimed (ожидание места у регулятора)
+        не считается. Зависшая задача отменяется через on_timeout и доживает в фоне,
+        а поток-обработчик освобождается для следующей
+
+        :param item: Задача
+        :return: Результат и ошибка
+        """
+
+        if self.task_timeout is None:
+            try:
+                return self.func(item), None
+            except Exception as ex_task:
+                return None, ex_task
+
+        outcome = {}
+        clock = {'spent': 0.0, 'since': monotonic()}
+
+        def target() -> None:
+            try:
+                outcome['result'] = self.func(item)
+            except Exception as ex_task:
+                outcome['error'] = ex_task
+            finally:
+                with self._condition:
+                    outcome['finished'] = True
+                    self._cancelled.discard(item)
+                    self._condition.notify_all()
+
+        with self._condition:
+            self._clocks[item] = clock
+        task_thread = threading.Thread(target=target, name=f'{threading.current_thread().name}-task', daemon=True)
+        task_thread.start()
+
+        with self._condition:
+            while 'finished' not in outcome:
+                if clock['since'] is None:
+                    self._condition.wait()
+                    continue
+
+                left = self.task_timeout - clock['spent'] - (monotonic() - clock['since'])
+                if left <= 0:
+                    break
+                self._condition.wait(left)
+
+            self._clocks.pop(item, None)
+            timed_out = 'finished' not in outcome
+            if timed_out:
+                self._cancelled.add(item)
+
+        if timed_out:
+            if self.on_timeout:
+                try:
+                    self.on_timeout(item)
+                except Exception as ex_timeout:
+                    self._log_info(f'Не смог прервать зависшую задачу "{item}": {ex_timeout!r}')
+            return None, TimeoutError(f'Задача не завершилась за {self.task_timeout} секунд')
+
+        return outcome.get('result'), outcome.get('error')
+
+    @contextmanager
+    def untimed(self, item: Any) -> Iterator[None]:
+        """
+        Блок задачи, время которого не входит в task_timeout: ожидание места у регулятора или в очереди
+
+        :param item: Задача
+        """
+
+        self._pause_clock(item, paused=True)
+        try:
+            yield
+        finally:
+            self._pause_clock(item, paused=False)
+
+    def _pause_clock(self, item: Any, paused: bool) -> None:
+        """Остановка или продолжение отсчёта task_timeout для задачи"""
+
+        with self._condition:
+            clock = self._clocks.get(item)
+            if clock is None:
+                return
+            if paused and clock['since'] is not None:
+                clock['spent'] += monotonic() - clock['since']
+                clock['since'] = None
+            elif not paused and clock['since'] is None:
+                clock['since'] = monotonic()
+            self._condition.notify_all()
+
+    def is_cancelled(self, item: Any) -> bool:
+        """Задача отменена по таймауту, но ещё не завершилась в фоне"""
+
+        with self._lock:
+            return item in self._cancelled
+
+    def _worker(self) -> None:
+        """Цикл потока-обработчика"""
+
+        while True:
+            item = self._queue.get()
+            try:
+                if item is self._STOP:
+                    return
+
+                started = monotonic()
+                result, error = self._call_with_timeout(item)
+                task_result = TaskResult(item=item, result=result, error=error, duration=monotonic() - started,
+                                         worker=threading.current_thread().name)
+
+                if error is not None:
+                    self._log_info(f'Ошибка при обработке "{item}": {error!r}')
+
+                with self._lock:
+                    self._results.append(task_result)
+
+                if self.on_result:
+                    try:
+                        self.on_result(task_result)
+                    except Exception as ex_callback:
+                        self._log_info(f'Ошибка при обработке результата "{item}": {ex_callback!r}')
+            finally:
+                self._queue.task_done()
+
+    def start(self) -> 'WorkerScheduler':
+        """Запуск потоков-обработчиков"""
+
+        for number in range(1, self.workers + 1):
+            thread = threading.Thread(target=self._worker, name=f'worker-{number}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        return self
+
+    def submit(self, item: Any) -> None:
+        """
+        Добавление задачи в очередь. Блокируется, пока в очереди нет места
+
+        :param item: Задача
+        """
+
+        self._queue.put(item)
+
+    def join(self) -> list[TaskResult]:
+        """
+        Ожидание завершения всех задач и остановка потоков
+
+        :return: Результаты всех задач
+        """
+
+        for _ in self._threads:
+            self._queue.put(self._STOP)
+
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+        with self._lock:
+            results, self._results = self._results, []
+
+        return results
+
+    def map(self, items: Iterable[Any]) -> list[TaskResult]:
+        """
+        Обработка всех задач и получение результатов
+
+        :param items: Задачи
+        :return: Результаты всех задач
+        """
+
+        self.start()
+        for item in items:
+            self.submit(item)
+
+        return self.join()
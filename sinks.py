@@ -0,0 +1,258 @@
+import csv
+import json
+import os
+from itertools import islice
+from typing import Iterable
+
+from _metrics import METRICS
+from config import CONFIG
+from other import create_folder
+from work_with_excel import ExcelReportWriter
+
+# Поля записи результата: один сертификат и все товары, которые на него ссылаются
+RESULT_FIELDS = ('certificate', 'phone', 'email', 'product_ids', 'urls', 'path_to_file', 'queries')
+LIST_FIELDS = ('product_ids', 'urls', 'queries')
+
+
+class ResultSink:
+    """
+    Приёмник результатов. Отчёт - полный снимок журнала: каждый запуск пишет все записи заново.
+    Записи приходят пачками и пишутся во временный файл, который заменяет отчёт прошлого запуска
+    только после успешного закрытия. Если запись прервалась, остаётся прошлый отчёт
+    """
+
+    EXTENSION = ''
+
+    def __init__(self, path_to_file: str) -> None:
+        """
+        Инициализация параметров
+
+        :param path_to_file: Путь до файла отчёта
+        """
+
+        self.path_to_file = path_to_file
+        root, extension = os.path.splitext(path_to_file)
+        self.path_to_tmp = f'{root}.tmp{extension}'
+        self.rows = 0
+        self._closed = False
+        create_folder(os.path.dirname(os.path.abspath(path_to_file)))
+
+    def write(self, records: list[dict]) -> None:
+        """
+        Запись пачки результатов
+
+        :param records: Список словарей с полями RESULT_FIELDS
+        """
+
+        with METRICS.span('report.write', sink=type(self).__name__, rows=len(records)):
+            self._write(records)
+        self.rows += len(records)
+
+    def _write(self, records: list[dict]) -> None:
+        """Запись пачки во временный файл"""
+        raise NotImplementedError
+
+    def _close(self) -> None:
+        """Запись остатка и закрытие временного файла"""
+
+    def close(self) -> None:
+        """Закрытие временного файла и замена им отчёта прошлого запуска"""
+
+        if self._closed:
+            return
+        self._closed = True
+        self._close()
+        if os.path.exists(self.path_to_tmp):
+            os.replace(self.path_to_tmp, self.path_to_file)
+
+    def abort(self) -> None:
+        """Закрытие без замены отчёта: недописанный временный файл удаляется"""
+
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._close()
+        finally:
+            if os.path.exists(self.path_to_tmp):
+                os.remove(self.path_to_tmp)
+
+    def __enter__(self) -> 'ResultSink':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class CsvSink(ResultSink):
+    """CSV с заголовком. Списки записываются через запятую"""
+
+    EXTENSION = '.csv'
+
+    def __init__(self, path_to_file: str) -> None:
+        super().__init__(path_to_file)
+        self._file = open(self.path_to_tmp, 'w', encoding='utf-8', newline='')
+        self._writer = csv.DictWriter(self._file, fieldnames=RESULT_FIELDS, extrasaction='ignore')
+        self._writer.writeheader()
+
+    def _write(self, records: list[dict]) -> None:
+        for record in records:
+            self._writer.writerow({**record, **{field: ', '.join(record.get(field) or []) for field in LIST_FIELDS}})
+
+    def _close(self) -> None:
+        self._file.close()
+
+
+class JsonlSink(ResultSink):
+    """JSON lines: одна запись на строку, списки сохраняются как массивы"""
+
+    EXTENSION = '.jsonl'
+
+    def __init__(self, path_to_file: str) -> None:
+        super().__init__(path_to_file)
+        self._file = open(self.path_to_tmp, 'w', encoding='utf-8')
+
+    def _write(self, records: list[dict]) -> None:
+        for record in records:
+            self._file.write(json.dumps({field: record.get(field) for field in RESULT_FIELDS},
+                                        ensure_ascii=False) + '\n')
+
+    def _close(self) -> None:
+        self._file.close()
+
+
+class ParquetSink(ResultSink):
+    """Parquet: записи копятся до batch_size и сохраняются отдельной группой строк (row group)"""
+
+    EXTENSION = '.parquet'
+
+    def __init__(self, path_to_file: str, batch_size: int = None) -> None:
+        super().__init__(path_to_file)
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as ex_import:
+            raise ImportError('Для записи в Parquet нужен пакет pyarrow (pip install pyarrow)') from ex_import
+
+        self._pa = pa
+        self.batch_size = batch_size or CONFIG['sink_batch_size']
+        self.schema = pa.schema([(field, pa.list_(pa.string()) if field in LIST_FIELDS else pa.string())
+                                 for field in RESULT_FIELDS])
+        self._writer = pq.ParquetWriter(self.path_to_tmp, self.schema)
+        self._buffer = []
+
+    def _flush(self) -> None:
+        """Запись накопленных строк одной группой"""
+
+        if not self._buffer:
+            return
+
+        columns = {field: [record.get(field) for record in self._buffer] for field in RESULT_FIELDS}
+        self._writer.write_table(self._pa.Table.from_pydict(columns, schema=self.schema))
+        self._buffer = []
+
+    def _write(self, records: list[dict]) -> None:
+        self._buffer.extend(records)
+        if len(self._buffer) >= self.batch_size:
+            self._flush()
+
+    def _close(self) -> None:
+        try:
+            self._flush()
+        finally:
+            self._writer.close()
+
+
+class ExcelSink(ResultSink):
+    """Отчёт Excel с русскими названиями колонок"""
+
+    EXTENSION = '.xlsx'
+    COLUMNS = {
+        'certificate': 'Сертификат',
+        'phone': 'Номер телефона',
+        'email': 'Почта',
+        'product_ids': 'Товары',
+        'urls': 'Ссылки',
+        'path_to_file': 'Файл',
+        'queries': 'Запросы',
+    }
+
+    def __init__(self, path_to_file: str) -> None:
+        super().__init__(path_to_file)
+        self._report = ExcelReportWriter(path_to_file=self.path_to_tmp, columns=tuple(self.COLUMNS.values()))
+
+    def _write(self, records: list[dict]) -> None:
+        for record in records:
+            self._report.add_row([', '.join(record.get(field) or []) if field in LIST_FIELDS else record.get(field)
+                                  for field in self.COLUMNS])
+
+    def _close(self) -> None:
+        self._report.close()
+
+
+SINKS = {
+    'csv': CsvSink,
+    'jsonl': JsonlSink,
+    'parquet': ParquetSink,
+    'excel': ExcelSink,
+}
+
+
+def create_sinks(names: list = None, path_to_folder: str = None, file_name: str = 'result') -> list[ResultSink]:
+    """
+    Создание приёмников результатов по названиям
+
+    :param names: Названия из SINKS. По умолчанию CONFIG['result_sinks']
+    :param path_to_folder: Директория для файлов результатов. По умолчанию CONFIG['path_to_results']
+    :param file_name: Имя файлов без расширения
+    :return: Список приёмников
+    """
+
+    path_to_folder = path_to_folder or CONFIG['path_to_results']
+    sinks = []
+    try:
+        for name in names or CONFIG['result_sinks']:
+            if name not in SINKS:
+                raise ValueError(f'Неизвестный формат результатов "{name}". Доступны: {", ".join(SINKS)}')
+            sink_class = SINKS[name]
+            sinks.append(sink_class(os.path.join(path_to_folder, f'{file_name}{sink_class.EXTENSION}')))
+    except Exception:
+        for sink in sinks:
+            sink.abort()
+        raise
+
+    return sinks
+
+
+def write_results(sinks: list[ResultSink], records: Iterable[dict], batch_size: int = None) -> None:
+    """
+    Запись результатов во все приёмники пачками и их закрытие. Записи читаются из источника по мере записи,
+    в памяти держится только одна пачка. Если запись прервалась, отчёты прошлого запуска остаются на месте
+
+    :param sinks: Приёмники
+    :param records: Источник записей с полями RESULT_FIELDS
+    :param batch_size: Размер пачки
+    """
+
+    batch_size = batch_size or CONFIG['sink_batch_size']
+    records = iter(records)
+    try:
+        while batch := list(islice(records, batch_size)):
+            for sink in sinks:
+                sink.write(batch)
+    except BaseException:
+        for sink in sinks:
+            sink.abort()
+        raise
+
+    errors = []
+    for sink in sinks:
+        try:
+            sink.close()
+        except Exception as ex_close:
+            errors.append(ex_close)
+    if errors:
+        raise errors[0]
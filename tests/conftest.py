@@ -0,0 +1,28 @@
+import logging
+import os
+import sys
+
+import pytest
+
+# Модули робота лежат в корне репозитория
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.stub_site import StubSite  # noqa: E402
+from config import CONFIG  # noqa: E402
+
+
+@pytest.fixture
+def log() -> logging.Logger:
+    """Логгер вместо CustomLogger, чтобы тесты не создавали файлов логов"""
+    return logging.getLogger('tests')
+
+
+@pytest.fixture
+def site(monkeypatch: pytest.MonkeyPatch) -> StubSite:
+    """Локальная копия Wildberries, на которую перенаправлены API каталога и карточек"""
+
+    with StubSite(products=120, per_page=10, certificate_every=5, certificate_pages=1) as stub_site:
+        monkeypatch.setitem(CONFIG, 'catalog_api_url', f'{stub_site.base_url}/api')
+        monkeypatch.setitem(CONFIG, 'certificate_info_url', f'{stub_site.base_url}/api/card?nm={{product_id}}')
+        monkeypatch.setitem(CONFIG, 'product_url_template', f'{stub_site.base_url}/catalog/{{product_id}}/detail.aspx')
+        yield stub_site
@@ -0,0 +1,75 @@
+import pytest
+
+pytest.importorskip('selenium')
+from selenium.common.exceptions import TimeoutException, WebDriverException  # noqa: E402
+
+from browser_pool import BrowserPool  # noqa: E402
+
+
+class FakeDriver:
+    """webdriver без браузера: отвечает, пока его не «уронили» через crash"""
+
+    def __init__(self) -> None:
+        self.alive = True
+        self.quit_calls = 0
+        self.switch_to = self
+
+    @property
+    def window_handles(self) -> list:
+        if not self.alive:
+            raise WebDriverException('chrome not reachable')
+        return ['main']
+
+    def window(self, handle: str) -> None:
+        pass
+
+    def get(self, url: str) -> None:
+        if not self.alive:
+            raise WebDriverException('chrome not reachable')
+
+    def close(self) -> None:
+        pass
+
+    def quit(self) -> None:
+        self.quit_calls += 1
+
+
+@pytest.fixture
+def pool() -> BrowserPool:
+    browser_pool = BrowserPool(driver_factory=lambda download_dir: FakeDriver(), size=1, max_uses=10)
+    yield browser_pool
+    browser_pool.close()
+
+
+def fail_in_session(pool: BrowserPool, error: Exception, crash: bool = False) -> FakeDriver:
+    """Ошибка внутри сессии пула. Возвращает драйвер этой сессии"""
+
+    with pytest.raises(type(error)):
+        with pool.session(owner='url') as session:
+            session.driver.alive = not crash
+            raise error
+    return session.driver
+
+
+def test_wait_timeout_keeps_the_browser(pool):
+    driver = fail_in_session(pool, TimeoutException('element not found'))
+
+    assert not driver.quit_calls
+    with pool.session() as session:
+        assert session.driver is driver
+
+
+def test_error_with_a_responsive_browser_keeps_the_browser(pool):
+    driver = fail_in_session(pool, Exception('Произошла непредвиденная ошибка'))
+
+    assert not driver.quit_calls
+    with pool.session() as session:
+        assert session.driver is driver
+
+
+def test_crashed_browser_is_replaced(pool):
+    driver = fail_in_session(pool, Exception('Произошла непредвиденная ошибка'), crash=True)
+
+    assert driver.quit_calls == 1
+    with pool.session() as session:
+        assert session.driver is not driver
@@ -0,0 +1,120 @@
+import csv
+import json
+import os
+import sqlite3
+
+import pytest
+
+from catalog_api import WildberriesCatalogAPI
+from config import CONFIG
+from ledger import RunLedger
+
+pytest.importorskip('selenium')
+from batch import BatchCollector, Query  # noqa: E402
+
+
+def product_urls(product_ids: list) -> list:
+    """Ссылки на товары в порядке каталога"""
+    return [WildberriesCatalogAPI.product_url(product_id) for product_id in product_ids]
+
+
+def collect(collector: object) -> list:
+    """Все ссылки сборщика одним списком"""
+    return [url for batch in collector.iter_product_urls() for url in batch]
+
+
+def test_catalog_api_applies_brand_diagonal_and_price_filters(log, site):
+    api = WildberriesCatalogAPI(custom_logger=log, brand_name='xiaomi', diagonal='40', price_start='10000',
+                                price_end='15000')
+
+    expected = [product_id for product_id in site.product_ids
+                if site.brand(product_id) == 'Xiaomi' and site.diagonal(product_id) == '40"'
+                and 10000 <= site.price(product_id) <= 15000]
+    assert expected
+    assert collect(api) == product_urls(expected)
+
+
+def test_catalog_api_continues_without_unknown_diagonal(log, site):
+    api = WildberriesCatalogAPI(custom_logger=log, brand_name='LG', diagonal='99', price_start='1000',
+                                price_end='200000')
+
+    assert collect(api) == product_urls([product_id for product_id in site.product_ids
+                                         if site.brand(product_id) == 'LG'])
+
+
+def test_catalog_api_rejects_unknown_brand(log, site):
+    api = WildberriesCatalogAPI(custom_logger=log, brand_name='Nokia', diagonal='40', price_start='1000',
+                                price_end='200000')
+
+    with pytest.raises(ValueError):
+        collect(api)
+
+
+def test_query_split_covers_the_price_range_without_gaps(monkeypatch):
+    monkeypatch.setitem(CONFIG, 'shard_min_width', 100)
+    query = Query(brand_name='Xiaomi', diagonal='40', price_start='1000', price_end='1999')
+
+    shards = query.split(3)
+    assert [(shard.price_start, shard.price_end) for shard in shards] == [
+        ('1000', '1332'), ('1333', '1666'), ('1667', '1999')]
+    assert {shard.brand_name for shard in shards} == {'Xiaomi'}
+
+    # Части не бывают уже shard_min_width
+    narrow = Query(brand_name='Xiaomi', diagonal='40', price_start='1000', price_end='1249')
+    assert len(narrow.split(4)) == 2
+    assert narrow.can_split()
+    assert not narrow.split(2)[0].can_split()
+
+
+def test_batch_collector_splits_large_shards_and_keeps_every_product(log, site, tmp_path, monkeypatch):
+    monkeypatch.setitem(CONFIG, 'catalog_collector', 'http')
+    monkeypatch.setitem(CONFIG, 'shard_max_pages', 1)
+    monkeypatch.setitem(CONFIG, 'shard_min_width', 100)
+    path_to_db = os.path.join(tmp_path, 'ledger.sqlite3')
+    path_to_cards = os.path.join(tmp_path, 'products.jsonl')
+    ledger = RunLedger(path_to_db=path_to_db)
+    queries = [Query(brand_name='Xiaomi', diagonal='', price_start='10000', price_end='21999'),
+               Query(brand_name='Samsung', diagonal='', price_start='10000', price_end='21999')]
+
+    urls = collect(BatchCollector(custom_logger=log, ledger=ledger, queries=queries, workers=3, shards=1,
+                                  path_to_cards=path_to_cards))
+
+    expected = product_urls([product_id for product_id in site.product_ids
+                             if site.brand(product_id) in ('Xiaomi', 'Samsung')])
+    assert len(expected) > 2 * site.per_page
+    assert sorted(urls) == sorted(expected)
+    assert all(ledger.is_crawled(query.key) for query in queries)
+    assert ledger.queries_for(expected[0]) == [queries[0].key]
+
+    with open(path_to_cards, encoding='utf-8') as file:
+        assert sorted(json.loads(line)['url'] for line in file) == sorted(expected)
+
+    # Запрос больше одной страницы делится пополам: в журнале обе половины и сам запрос
+    with sqlite3.connect(path_to_db) as connection:
+        crawled = connection.execute('SELECT COUNT(*) FROM crawls').fetchone()[0]
+    assert crawled >= len(queries) * 3
+
+    # Повторный запуск ничего не собирает заново
+    assert collect(BatchCollector(custom_logger=log, ledger=ledger, queries=queries,
+                                   path_to_cards=path_to_cards)) == []
+    ledger.close()
+
+
+def test_partial_recrawl_keeps_cards_of_skipped_queries(log, site, tmp_path, monkeypatch):
+    monkeypatch.setitem(CONFIG, 'catalog_collector', 'http')
+    path_to_cards = os.path.join(tmp_path, 'products.csv')
+    ledger = RunLedger(path_to_db=os.path.join(tmp_path, 'ledger.sqlite3'))
+    xiaomi = Query(brand_name='Xiaomi', diagonal='', price_start='10000', price_end='21999')
+    samsung = Query(brand_name='Samsung', diagonal='', price_start='10000', price_end='21999')
+
+    collect(BatchCollector(custom_logger=log, ledger=ledger, queries=[xiaomi], path_to_cards=path_to_cards))
+    # Xiaomi ещё свежий и пропускается, но его карточки остаются в файле рядом с карточками Samsung
+    collect(BatchCollector(custom_logger=log, ledger=ledger, queries=[xiaomi, samsung], path_to_cards=path_to_cards))
+
+    with open(path_to_cards, encoding='utf-8', newline='') as file:
+        urls = [row['url'] for row in csv.DictReader(file)]
+    expected = product_urls([product_id for product_id in site.product_ids
+                             if site.brand(product_id) in ('Xiaomi', 'Samsung')])
+    assert sorted(urls) == sorted(expected)
+    assert not os.path.exists(os.path.join(tmp_path, 'products.tmp.csv'))
+    ledger.close()
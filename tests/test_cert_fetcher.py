@@ -0,0 +1,31 @@
+from cert_fetcher import find_document_url
+
+BASE_URL = 'https://card.example.ru/cards/v2/detail?nm=100'
+
+
+def test_document_url_is_taken_from_the_certificate_field():
+    payload = {'data': {'products': [{
+        'id': 100,
+        'manual': 'https://static.example.ru/manual.pdf',
+        'media': ['https://static.example.ru/booklet.pdf'],
+        'certificates': [{'verified': True, 'file': {'url': '/docs/100.pdf'}}],
+    }]}}
+
+    assert find_document_url(payload, base_url=BASE_URL) == 'https://card.example.ru/docs/100.pdf'
+
+
+def test_other_pdf_files_are_not_taken_for_a_certificate():
+    payload = {'data': {'products': [{
+        'id': 100,
+        'manual': 'https://static.example.ru/manual.pdf',
+        'certificate': {'verified': True},
+    }]}}
+
+    assert find_document_url(payload, base_url=BASE_URL) is None
+
+
+def test_declaration_field_and_custom_keys():
+    payload = {'data': {'products': [{'declaration': 'https://static.example.ru/d.PDF?v=2'}]}}
+
+    assert find_document_url(payload) == 'https://static.example.ru/d.PDF?v=2'
+    assert find_document_url(payload, keys=('certificate',)) is None
@@ -0,0 +1,21 @@
+import os
+
+from ledger import RunLedger
+
+URLS = [f'https://example.ru/catalog/{product_id}/detail.aspx' for product_id in range(100, 106)]
+
+
+def test_certificate_rows_group_products_by_certificate(tmp_path):
+    ledger = RunLedger(path_to_db=os.path.join(tmp_path, 'ledger.sqlite3'))
+    ledger.add_urls(URLS[:3])
+    ledger.tag_urls(URLS[:3], 'Xiaomi|40|1000|200000')
+    ledger.mark_extracted(URLS[0], '+7', 'a@example.ru', 'RU-1')
+    ledger.mark_extracted(URLS[1], '+7', 'a@example.ru', 'RU-1')
+    ledger.mark_extracted(URLS[2], '+8', 'b@example.ru', None)
+
+    rows = list(ledger.certificate_rows(batch_size=1))
+    assert [row['certificate'] for row in rows] == ['RU-1', None]
+    assert rows[0]['product_ids'] == ['100', '101']
+    assert rows[0]['queries'] == ['Xiaomi|40|1000|200000']
+    assert rows[1]['urls'] == [URLS[2]]
+    ledger.close()
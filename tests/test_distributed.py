@@ -0,0 +1,70 @@
+import os
+import threading
+
+import pytest
+
+from config import CONFIG
+from job_queue import JobQueue, JobResult, JobStatus
+from ledger import RunLedger, Status
+
+pytest.importorskip('selenium')
+from main import run_distributed  # noqa: E402
+
+RESULTS = {
+    'https://example.ru/catalog/100/detail.aspx': JobResult(url='', status=JobStatus.DONE,
+                                                            path_to_file='data/100.pdf', phone='+7',
+                                                            email='a@example.ru', certificate='RU-1'),
+    'https://example.ru/catalog/101/detail.aspx': JobResult(url='', status=JobStatus.NO_CERTIFICATE),
+    'https://example.ru/catalog/102/detail.aspx': JobResult(url='', status=JobStatus.FAILED,
+                                                            path_to_file='data/102.pdf', error='broken pdf'),
+}
+
+
+def fake_worker(path_to_db: str, stop: threading.Event) -> None:
+    """Обработчик очереди, возвращающий заранее известные результаты"""
+
+    queue = JobQueue(path_to_db=path_to_db)
+    try:
+        while not stop.is_set():
+            for url in queue.claim('worker', limit=10):
+                result = RESULTS[url]
+                queue.complete(JobResult(**{**result.__dict__, 'url': url}), 'worker')
+            stop.wait(0.05)
+    finally:
+        queue.close()
+
+
+def run_with_worker(log: object, ledger: RunLedger, urls: list) -> None:
+    """Распределённый запуск с одним обработчиком в соседнем потоке"""
+
+    stop = threading.Event()
+    worker = threading.Thread(target=fake_worker, args=(CONFIG['path_to_job_queue'], stop), daemon=True)
+    worker.start()
+    try:
+        run_distributed(log, ledger, [urls])
+    finally:
+        stop.set()
+        worker.join()
+
+
+def test_distributed_run_writes_every_finished_job_back_to_the_ledger(log, tmp_path, monkeypatch):
+    monkeypatch.setitem(CONFIG, 'path_to_job_queue', os.path.join(tmp_path, 'jobs.sqlite3'))
+    monkeypatch.setitem(CONFIG, 'max_attempts', 1)
+    monkeypatch.setitem(CONFIG, 'job_poll_interval', 0.05)
+    monkeypatch.setitem(CONFIG, 'result_sinks', ('csv',))
+    monkeypatch.setitem(CONFIG, 'path_to_results', os.path.join(tmp_path, 'result'))
+    ledger = RunLedger(path_to_db=os.path.join(tmp_path, 'ledger.sqlite3'), max_attempts=2)
+    urls = list(RESULTS)
+
+    run_with_worker(log, ledger, urls)
+
+    assert ledger.counts() == {Status.EXTRACTED: 1, Status.NO_CERTIFICATE: 1, Status.FAILED: 1}
+    [row] = ledger.certificate_rows()
+    assert row['path_to_file'] == 'data/100.pdf'
+    # Ошибка с оставшимися по журналу попытками будет опубликована следующим запуском
+    assert ledger.pending_urls() == [urls[2]]
+
+    run_with_worker(log, ledger, urls)
+    assert ledger.counts() == {Status.EXTRACTED: 1, Status.NO_CERTIFICATE: 1, Status.FAILED: 1}
+    assert ledger.pending_urls() == []
+    ledger.close()
@@ -0,0 +1,52 @@
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+import work_with_pdf
+from bench.corpus import build_certificate, certificate_contacts
+from config import CONFIG
+from ledger import RunLedger, Status
+
+pytest.importorskip('selenium')
+import pipeline  # noqa: E402
+
+
+class NoBrowserPool:
+    """Пул браузеров, который в тесте не нужен"""
+
+    def abort(self, owner: object) -> None:
+        pass
+
+
+def broken_pool(workers: int = None) -> object:
+    """Пул, процесс которого уже упал на чужом файле"""
+
+    executor = work_with_pdf.create_extraction_pool(1)
+    with pytest.raises(BrokenProcessPool):
+        executor.submit(os._exit, 1).result()
+    return executor
+
+
+def test_file_submitted_to_a_broken_pool_is_retried_in_a_new_pool(log, tmp_path, monkeypatch):
+    monkeypatch.setitem(CONFIG, 'pdf_cache_enabled', False)
+    monkeypatch.setitem(CONFIG, 'pdf_workers', 1)
+    pools = [broken_pool, work_with_pdf.create_extraction_pool]
+    monkeypatch.setattr(pipeline, 'create_extraction_pool', lambda workers=None: pools.pop(0)(workers))
+
+    pdf_file = os.path.join(tmp_path, '100.pdf')
+    with open(pdf_file, 'wb') as file:
+        file.write(build_certificate(100, pages=1))
+    ledger = RunLedger(path_to_db=os.path.join(tmp_path, 'ledger.sqlite3'))
+    ledger.add_urls(['url'])
+
+    extraction = pipeline.Pipeline(custom_logger=log, ledger=ledger, pool=NoBrowserPool(), sinks=[])
+    extraction._pdf_queue.put(('url', pdf_file))
+    extraction._pdf_queue.put(extraction._STOP)
+    extraction._extract_worker()
+
+    assert not pools
+    assert ledger.counts() == {Status.EXTRACTED: 1}
+    [row] = ledger.certificate_rows()
+    assert (row['phone'], row['email']) == certificate_contacts(100)
+    ledger.close()
@@ -0,0 +1,119 @@
+import multiprocessing
+import os
+from time import sleep
+
+from job_queue import JobQueue, JobResult, JobStatus
+
+
+def _claim_all(path_to_db: str, worker_id: str, results: multiprocessing.Queue) -> None:
+    """Обработчик в отдельном процессе: забирает задачи, пока они есть, и сразу их завершает"""
+
+    queue = JobQueue(path_to_db=path_to_db, lease_seconds=60, max_attempts=3)
+    claimed = []
+    try:
+        while urls := queue.claim(worker_id, limit=3):
+            for url in urls:
+                assert queue.complete(JobResult(url=url, status=JobStatus.DONE), worker_id)
+            claimed.extend(urls)
+    finally:
+        queue.close()
+        results.put(claimed)
+
+
+def test_processes_never_claim_the_same_job(tmp_path):
+    path_to_db = os.path.join(tmp_path, 'jobs.sqlite3')
+    urls = [f'https://example.ru/catalog/{number}/detail.aspx' for number in range(200)]
+    queue = JobQueue(path_to_db=path_to_db)
+    assert queue.publish(urls) == len(urls)
+    assert queue.publish(urls[:10]) == 0
+
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    processes = [context.Process(target=_claim_all, args=(path_to_db, f'worker-{number}', results))
+                 for number in range(4)]
+    for process in processes:
+        process.start()
+    claimed = [url for _ in processes for url in results.get(timeout=60)]
+    for process in processes:
+        process.join(timeout=60)
+        assert process.exitcode == 0
+
+    assert sorted(claimed) == sorted(urls)
+    assert queue.is_drained()
+    assert queue.counts() == {JobStatus.DONE: len(urls)}
+    queue.close()
+
+
+def test_expired_lease_is_claimed_again_and_old_owner_is_rejected(tmp_path):
+    queue = JobQueue(path_to_db=os.path.join(tmp_path, 'jobs.sqlite3'), lease_seconds=0.2, max_attempts=3)
+    queue.publish(['url'])
+
+    assert queue.claim('worker-a') == ['url']
+    assert queue.claim('worker-b') == []
+
+    sleep(0.3)
+    assert queue.claim('worker-b') == ['url']
+    assert not queue.complete(JobResult(url='url', status=JobStatus.DONE), 'worker-a')
+    assert queue.complete(JobResult(url='url', status=JobStatus.DONE, phone='+7'), 'worker-b')
+    assert [result.phone for result in queue.results()] == ['+7']
+    queue.close()
+
+
+def test_renew_keeps_the_lease(tmp_path):
+    queue = JobQueue(path_to_db=os.path.join(tmp_path, 'jobs.sqlite3'), lease_seconds=0.5, max_attempts=3)
+    queue.publish(['url'])
+
+    assert queue.claim('worker-a') == ['url']
+    for _ in range(3):
+        sleep(0.2)
+        queue.renew(['url'], 'worker-a')
+        assert queue.claim('worker-b') == []
+
+    assert queue.complete(JobResult(url='url', status=JobStatus.DONE), 'worker-a')
+    queue.close()
+
+
+def test_failed_job_is_retried_until_attempts_run_out(tmp_path):
+    queue = JobQueue(path_to_db=os.path.join(tmp_path, 'jobs.sqlite3'), lease_seconds=60, max_attempts=2)
+    queue.publish(['url'])
+
+    for _ in range(2):
+        assert queue.claim('worker') == ['url']
+        assert queue.complete(JobResult(url='url', status=JobStatus.FAILED, error='boom'), 'worker')
+
+    assert queue.claim('worker') == []
+    assert queue.counts() == {JobStatus.FAILED: 1}
+    assert queue.is_drained()
+    queue.close()
+
+
+def test_expired_last_attempt_is_marked_failed(tmp_path):
+    queue = JobQueue(path_to_db=os.path.join(tmp_path, 'jobs.sqlite3'), lease_seconds=0.1, max_attempts=1)
+    queue.publish(['url'])
+
+    assert queue.claim('worker-a') == ['url']
+    sleep(0.2)
+    assert queue.claim('worker-b') == []
+    assert queue.counts() == {JobStatus.FAILED: 1}
+    queue.close()
+
+
+def test_publish_requeues_expired_no_certificate_and_requested_failures(tmp_path):
+    queue = JobQueue(path_to_db=os.path.join(tmp_path, 'jobs.sqlite3'), lease_seconds=60, max_attempts=1,
+                     probe_ttl_hours=24)
+    urls = ['done', 'no_certificate', 'failed']
+    queue.publish(urls)
+    for url, status in zip(urls, (JobStatus.DONE, JobStatus.NO_CERTIFICATE, JobStatus.FAILED)):
+        assert queue.claim('worker') == [url]
+        queue.complete(JobResult(url=url, status=status), 'worker')
+
+    # Свежая проверка и ошибка без запроса на повтор остаются как есть
+    assert queue.publish(urls) == 0
+    assert queue.publish(['failed'], requeue=True) == 1
+    assert queue.claim('worker') == ['failed']
+
+    queue.probe_ttl_hours = -1
+    assert queue.publish(urls) == 1
+    assert queue.claim('worker') == ['no_certificate']
+    assert queue.counts() == {JobStatus.DONE: 1, JobStatus.LEASED: 2}
+    queue.close()
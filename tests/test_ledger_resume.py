@@ -0,0 +1,27 @@
+import os
+
+from ledger import RunLedger, Status
+
+URLS = [f'https://example.ru/catalog/{product_id}/detail.aspx' for product_id in range(100, 106)]
+
+
+def test_interrupted_run_resumes_from_the_ledger(tmp_path):
+    path_to_db = os.path.join(tmp_path, 'ledger.sqlite3')
+    ledger = RunLedger(path_to_db=path_to_db, max_attempts=2)
+    assert ledger.add_urls(URLS) == URLS
+    ledger.mark_no_certificate(URLS[0])
+    ledger.mark_downloaded(URLS[1], 'data/101.pdf')
+    ledger.mark_extracted(URLS[2], '+7', 'a@example.ru', 'RU-1')
+    ledger.mark_failed(URLS[3], 'timeout')
+    ledger.mark_failed(URLS[4], 'timeout')
+    ledger.mark_failed(URLS[4], 'timeout')
+    ledger.close()
+
+    ledger = RunLedger(path_to_db=path_to_db, max_attempts=2)
+    assert ledger.add_urls(URLS) == []
+    # Ошибка с оставшимися попытками повторяется, исчерпавшая попытки - нет
+    assert ledger.pending_urls() == [URLS[3], URLS[5]]
+    assert ledger.downloaded_files() == [(URLS[1], 'data/101.pdf')]
+    assert ledger.counts() == {Status.PENDING: 1, Status.NO_CERTIFICATE: 1, Status.DOWNLOADED: 1,
+                               Status.EXTRACTED: 1, Status.FAILED: 2}
+    ledger.close()
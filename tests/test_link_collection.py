@@ -0,0 +1,34 @@
+import pytest
+
+pytest.importorskip('selenium')
+from selenium.common.exceptions import TimeoutException  # noqa: E402
+
+import link_collection  # noqa: E402
+
+
+class CatalogDriver:
+    """webdriver, у которого каталог не открывается"""
+
+    def __init__(self) -> None:
+        self.quit_calls = 0
+
+    def get(self, url: str) -> None:
+        raise TimeoutException('catalog did not load')
+
+    def close(self) -> None:
+        pass
+
+    def quit(self) -> None:
+        self.quit_calls += 1
+
+
+def test_browser_is_quit_when_filters_fail(log, monkeypatch):
+    driver = CatalogDriver()
+    monkeypatch.setattr(link_collection, 'create_chrome', lambda: driver)
+    collector = link_collection.Wildberries(custom_logger=log, brand_name='Xiaomi', diagonal='40',
+                                            price_start='1000', price_end='200000')
+
+    with pytest.raises(TimeoutException):
+        next(collector.iter_product_cards())
+
+    assert driver.quit_calls == 1
@@ -0,0 +1,89 @@
+import os
+import threading
+from contextlib import contextmanager
+
+import pytest
+
+from catalog_api import WildberriesCatalogAPI
+from cert_fetcher import CertificateFetcher
+from config import CONFIG
+from ledger import RunLedger, Status
+
+pytest.importorskip('selenium')
+from pipeline import Pipeline  # noqa: E402
+
+
+class UnavailableBrowserPool:
+    """Пул без браузеров: каждый товар, дошедший до браузера, завершается ошибкой"""
+
+    def __init__(self) -> None:
+        self.owners = []
+
+    @contextmanager
+    def session(self, timeout: float = None, owner: object = None):
+        self.owners.append(owner)
+        raise ConnectionError('Браузер недоступен')
+        yield
+
+    def abort(self, owner: object) -> None:
+        pass
+
+
+@pytest.fixture
+def pipeline_config(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Быстрые настройки конвейера для тестов"""
+
+    for key, value in {'product_retries': 1, 'requests_per_second': 1000, 'cert_concurrency': 4, 'workers_max': 2,
+                       'pdf_workers': 1, 'pdf_cache_enabled': False}.items():
+        monkeypatch.setitem(CONFIG, key, value)
+
+
+def create_pipeline(log: object, tmp_path: str) -> tuple[Pipeline, RunLedger]:
+    """Конвейер с загрузчиком по HTTP на локальный сайт, без отчёта"""
+
+    ledger = RunLedger(path_to_db=os.path.join(tmp_path, 'ledger.sqlite3'), max_attempts=1)
+    fetcher = CertificateFetcher(custom_logger=log, path_to_folder=os.path.join(tmp_path, 'data'), index=ledger)
+    pipeline = Pipeline(custom_logger=log, ledger=ledger, pool=UnavailableBrowserPool(), fetcher=fetcher, sinks=[])
+    return pipeline, ledger
+
+
+def stage_threads() -> list:
+    """Живые потоки стадий конвейера"""
+    return [thread for thread in threading.enumerate()
+            if thread.name == 'pdf-extractor' or thread.name.startswith('worker-')]
+
+
+def test_pipeline_processes_every_product_and_stops_its_stages(log, site, tmp_path, pipeline_config):
+    pipeline, ledger = create_pipeline(log, tmp_path)
+    product_ids = site.product_ids[:30]
+    with_certificate = [product_id for product_id in product_ids if site.has_certificate(product_id)]
+    without_certificate = [product_id for product_id in product_ids if site.certificate_flag(product_id) is False]
+    unknown = len(product_ids) - len(with_certificate) - len(without_certificate)
+
+    pipeline.run([[WildberriesCatalogAPI.product_url(product_id) for product_id in product_ids[:15]],
+                  [WildberriesCatalogAPI.product_url(product_id) for product_id in product_ids[15:]]])
+
+    assert not stage_threads()
+    assert ledger.counts() == {Status.EXTRACTED: len(with_certificate), Status.NO_CERTIFICATE: len(without_certificate),
+                               Status.FAILED: unknown}
+    # В браузер попадают только товары, о документах которых карточка ничего не говорит
+    assert len(pipeline.pool.owners) == unknown
+    ledger.close()
+
+
+def test_pipeline_shuts_down_when_the_link_source_fails(log, site, tmp_path, pipeline_config):
+    pipeline, ledger = create_pipeline(log, tmp_path)
+    product_ids = site.product_ids[:10]
+
+    def url_batches():
+        yield [WildberriesCatalogAPI.product_url(product_id) for product_id in product_ids]
+        raise ConnectionError('Каталог недоступен')
+
+    with pytest.raises(ConnectionError):
+        pipeline.run(url_batches())
+
+    # Уже полученные товары обработаны, стадии остановлены
+    assert not stage_threads()
+    assert sum(ledger.counts().values()) == len(product_ids)
+    assert Status.PENDING not in ledger.counts()
+    ledger.close()
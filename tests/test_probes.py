@@ -0,0 +1,116 @@
+import os
+
+import pytest
+
+from catalog_api import WildberriesCatalogAPI
+from cert_fetcher import CertificateFetcher
+from config import CONFIG
+from ledger import RunLedger, Status
+from scheduler import TaskResult
+
+pytest.importorskip('selenium')
+from pipeline import Pipeline  # noqa: E402
+
+URLS = [f'https://example.ru/catalog/{product_id}/detail.aspx' for product_id in range(100, 106)]
+
+
+class RecordingScheduler:
+    """Стадия конвейера (или пул браузеров), которая только запоминает переданные ей товары"""
+
+    def __init__(self) -> None:
+        self.items = []
+
+    def submit(self, item: str) -> None:
+        self.items.append(item)
+
+    def abort(self, owner: object) -> None:
+        pass
+
+
+@pytest.fixture
+def pipeline(log, site, tmp_path, monkeypatch) -> Pipeline:
+    """Конвейер с загрузчиком по HTTP на локальный сайт, стадии которого не запущены"""
+
+    monkeypatch.setitem(CONFIG, 'pdf_cache_enabled', False)
+    ledger = RunLedger(path_to_db=os.path.join(tmp_path, 'ledger.sqlite3'))
+    fetcher = CertificateFetcher(custom_logger=log, path_to_folder=os.path.join(tmp_path, 'data'), index=ledger)
+    pipeline = Pipeline(custom_logger=log, ledger=ledger, pool=RecordingScheduler(), fetcher=fetcher, sinks=[])
+    pipeline.http, pipeline.browser = RecordingScheduler(), RecordingScheduler()
+    yield pipeline
+    ledger.close()
+
+
+def product(site, flag: bool | None) -> tuple[str, str]:
+    """URL и id первого товара сайта с таким признаком документов в карточке"""
+
+    product_id = next(product_id for product_id in site.product_ids if site.certificate_flag(product_id) is flag)
+    return WildberriesCatalogAPI.product_url(product_id), str(product_id)
+
+
+def fetch(pipeline: Pipeline, url: str) -> None:
+    """Скачивание по HTTP и передача результата конвейеру"""
+    pipeline._on_http_result(TaskResult(item=url, result=pipeline.fetcher.fetch_sync(url, raise_errors=True)))
+
+
+def test_card_with_certificate_goes_to_extraction(site, pipeline):
+    url, product_id = product(site, True)
+    pipeline.ledger.add_urls([url])
+
+    fetch(pipeline, url)
+
+    assert pipeline._pdf_queue.get_nowait()[0] == url
+    assert pipeline.ledger.cached_probe(product_id) is True
+    assert not pipeline.browser.items
+
+
+def test_card_without_certificate_is_not_opened_in_the_browser(site, pipeline):
+    url, product_id = product(site, False)
+    pipeline.ledger.add_urls([url])
+
+    fetch(pipeline, url)
+
+    assert pipeline.ledger.counts() == {Status.NO_CERTIFICATE: 1}
+    assert pipeline.ledger.cached_probe(product_id) is False
+    assert not pipeline.browser.items
+
+
+def test_card_without_flags_goes_to_the_browser(site, pipeline):
+    url, product_id = product(site, None)
+    pipeline.ledger.add_urls([url])
+
+    fetch(pipeline, url)
+
+    assert pipeline.browser.items == [url]
+    assert pipeline.ledger.cached_probe(product_id) is None
+    assert pipeline.ledger.pending_urls() == [url]
+
+
+def test_cached_negative_probe_skips_the_download(site, pipeline):
+    skipped_url, skipped_id = product(site, False)
+    checked_url, checked_id = product(site, True)
+    pipeline.ledger.add_urls([skipped_url, checked_url])
+    pipeline.ledger.save_probe(skipped_id, False)
+    pipeline.ledger.save_probe(checked_id, True)
+
+    pipeline._submit_product(skipped_url)
+    pipeline._submit_product(checked_url)
+
+    # Повторно проверяется только товар, у которого документы были
+    assert pipeline.http.items == [checked_url]
+    assert not pipeline.browser.items
+    assert pipeline.ledger.pending_urls() == [checked_url]
+
+
+def test_expired_negative_probe_is_requeued(tmp_path):
+    ledger = RunLedger(path_to_db=os.path.join(tmp_path, 'ledger.sqlite3'))
+    ledger.add_urls(URLS[:2])
+    for url, product_id in zip(URLS[:2], ('100', '101')):
+        ledger.save_probe(product_id, False)
+        ledger.mark_no_certificate(url)
+
+    assert ledger.cached_probe('100') is False
+    assert ledger.requeue_expired_probes(ttl_hours=24) == 0
+    assert ledger.cached_probe('100', ttl_hours=-1) is None
+    assert ledger.requeue_expired_probes(ttl_hours=-1) == 2
+    assert ledger.pending_urls() == URLS[:2]
+    ledger.close()
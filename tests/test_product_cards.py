@@ -0,0 +1,34 @@
+import json
+import os
+
+from product_cards import CardWriter
+
+
+def card(product_id: str, price: int) -> dict:
+    return {'id': product_id, 'url': f'https://example.com/{product_id}', 'price': price}
+
+
+def test_card_writer_keeps_old_cards_and_replaces_rewritten_ones(tmp_path):
+    path_to_cards = os.path.join(tmp_path, 'products.jsonl')
+    with CardWriter(path_to_cards) as writer:
+        writer.write([card('1', 100), card('2', 200)])
+
+    with CardWriter(path_to_cards, keep_existing=True) as writer:
+        writer.write([card('2', 250), card('3', 300)])
+
+    with open(path_to_cards, encoding='utf-8') as file:
+        prices = {row['id']: row['price'] for row in map(json.loads, file)}
+    assert prices == {'1': 100, '2': 250, '3': 300}
+    assert writer.rows == 3
+
+
+def test_card_writer_without_keep_existing_overwrites_the_file(tmp_path):
+    path_to_cards = os.path.join(tmp_path, 'products.csv')
+    with CardWriter(path_to_cards) as writer:
+        writer.write([card('1', 100)])
+
+    with CardWriter(path_to_cards) as writer:
+        writer.write([card('2', 200)])
+
+    with open(path_to_cards, encoding='utf-8') as file:
+        assert len(file.readlines()) == 2
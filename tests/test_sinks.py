@@ -0,0 +1,91 @@
+import csv
+import json
+import os
+
+import pytest
+
+from bench.corpus import certificate_contacts
+from catalog_api import WildberriesCatalogAPI
+from cert_fetcher import CertificateFetcher
+from config import CONFIG
+from ledger import RunLedger
+from sinks import CsvSink, JsonlSink, create_sinks, write_results
+
+pytest.importorskip('selenium')
+from pipeline import Pipeline, write_certificate_report  # noqa: E402
+
+URLS = [f'https://example.ru/catalog/{product_id}/detail.aspx' for product_id in range(100, 103)]
+
+
+class NoBrowserPool:
+    """Пул без браузеров для конвейера, все товары которого скачиваются по HTTP"""
+
+    def abort(self, owner: object) -> None:
+        pass
+
+
+def read_csv(path_to_file: str) -> list:
+    """Строки CSV отчёта"""
+
+    with open(path_to_file, encoding='utf-8', newline='') as file:
+        return list(csv.DictReader(file))
+
+
+@pytest.fixture
+def ledger(tmp_path) -> RunLedger:
+    """Журнал с двумя товарами на одном сертификате и одним товаром без номера сертификата"""
+
+    run_ledger = RunLedger(path_to_db=os.path.join(tmp_path, 'ledger.sqlite3'))
+    run_ledger.add_urls(URLS)
+    run_ledger.mark_extracted(URLS[0], '+7', 'a@example.ru', 'RU-1')
+    run_ledger.mark_extracted(URLS[1], '+7', 'a@example.ru', 'RU-1')
+    run_ledger.mark_extracted(URLS[2], '+8', 'b@example.ru', None)
+    yield run_ledger
+    run_ledger.close()
+
+
+def test_report_is_written_to_every_sink(ledger, tmp_path):
+    sinks = create_sinks(['csv', 'jsonl'], path_to_folder=str(tmp_path))
+
+    write_certificate_report(ledger, sinks)
+
+    rows = read_csv(os.path.join(tmp_path, 'result.csv'))
+    assert [row['product_ids'] for row in rows] == ['100, 101', '102']
+    with open(os.path.join(tmp_path, 'result.jsonl'), encoding='utf-8') as file:
+        assert [json.loads(line)['product_ids'] for line in file] == [['100', '101'], ['102']]
+    assert not any(os.path.exists(sink.path_to_tmp) for sink in sinks)
+
+
+def test_failed_report_keeps_the_previous_one(ledger, tmp_path):
+    path_to_file = os.path.join(tmp_path, 'result.csv')
+    write_certificate_report(ledger, [CsvSink(path_to_file)])
+
+    def broken_rows():
+        yield from ledger.certificate_rows()
+        raise ConnectionError('Журнал недоступен')
+
+    sinks = [CsvSink(path_to_file), JsonlSink(os.path.join(tmp_path, 'result.jsonl'))]
+    with pytest.raises(ConnectionError):
+        write_results(sinks, broken_rows(), batch_size=1)
+
+    assert len(read_csv(path_to_file)) == 2
+    assert not os.path.exists(sinks[1].path_to_file)
+    assert not any(os.path.exists(sink.path_to_tmp) for sink in sinks)
+
+
+def test_pipeline_writes_the_report_after_the_run(log, site, tmp_path, monkeypatch):
+    monkeypatch.setitem(CONFIG, 'pdf_cache_enabled', False)
+    ledger = RunLedger(path_to_db=os.path.join(tmp_path, 'ledger.sqlite3'))
+    fetcher = CertificateFetcher(custom_logger=log, path_to_folder=os.path.join(tmp_path, 'data'), index=ledger)
+    sink = CsvSink(os.path.join(tmp_path, 'result.csv'))
+    with_certificate = [product_id for product_id in site.product_ids[:20] if site.has_certificate(product_id)]
+
+    Pipeline(custom_logger=log, ledger=ledger, pool=NoBrowserPool(), fetcher=fetcher, sinks=[sink]).run(
+        [[WildberriesCatalogAPI.product_url(product_id) for product_id in with_certificate]])
+
+    rows = read_csv(sink.path_to_file)
+    assert sorted(row['product_ids'] for row in rows) == sorted(str(product_id) for product_id in with_certificate)
+    phone, email = certificate_contacts(with_certificate[0])
+    [row] = [row for row in rows if row['product_ids'] == str(with_certificate[0])]
+    assert {'phone': phone, 'email': email}.items() <= row.items()
+    ledger.close()
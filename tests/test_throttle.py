@@ -0,0 +1,65 @@
+import threading
+from concurrent.futures import CancelledError
+from time import monotonic, sleep
+
+import pytest
+
+from config import CONFIG
+from scheduler import WorkerScheduler
+from throttle import Throttle
+
+
+@pytest.fixture
+def throttle(monkeypatch: pytest.MonkeyPatch) -> Throttle:
+    """Регулятор на одну задачу за раз без ограничения частоты и без повторов"""
+
+    monkeypatch.setitem(CONFIG, 'workers_min', 1)
+    monkeypatch.setitem(CONFIG, 'requests_per_second', 0)
+    return Throttle(initial=1, max_limit=1, attempts=1)
+
+
+def test_waiting_for_the_limiter_does_not_count_towards_the_task_timeout(throttle):
+    started = {}
+    scheduler = None
+
+    def process(item: str) -> str:
+        def body() -> str:
+            started[item] = monotonic()
+            sleep(0.5)
+            return item
+
+        return throttle.call(body, name=item, cancelled=lambda: scheduler.is_cancelled(item),
+                             untimed=lambda: scheduler.untimed(item))
+
+    scheduler = WorkerScheduler(func=process, workers=3, task_timeout=0.7)
+    results = scheduler.map(['a', 'b', 'c'])
+
+    # С лимитом 1 задачи идут по очереди, и третья ждёт дольше таймаута, но ни одна не отменена
+    assert sorted(result.result for result in results) == ['a', 'b', 'c']
+    assert all(result.ok for result in results)
+    assert max(started.values()) - min(started.values()) >= 0.9
+    assert throttle.limiter._active == 0
+
+
+def test_hung_task_still_times_out(throttle):
+    release = threading.Event()
+    scheduler = None
+
+    def process(item: str) -> None:
+        throttle.call(release.wait, name=item, untimed=lambda: scheduler.untimed(item))
+
+    scheduler = WorkerScheduler(func=process, workers=1, task_timeout=0.3, on_timeout=lambda item: release.set())
+    [result] = scheduler.map(['a'])
+
+    assert isinstance(result.error, TimeoutError)
+
+
+def test_cancelled_task_is_not_started_and_frees_its_slot(throttle):
+    calls = []
+
+    with pytest.raises(CancelledError):
+        throttle.call(lambda: calls.append(1), name='a', cancelled=lambda: True)
+
+    assert not calls
+    assert throttle.limiter._active == 0
+    assert throttle.call(lambda: 'ok', name='b') == 'ok'
@@ -0,0 +1,61 @@
+import pytest
+
+from work_with_pdf import FieldExtractor
+
+EXTRACTOR = FieldExtractor()
+
+
+def extract(*pages: str) -> dict:
+    return EXTRACTOR.extract(pages)
+
+
+def test_label_and_value_on_the_same_line():
+    assert extract('Номер телефона: +7 (495) 123-45-67\nАдрес электронной почты: info@example.ru') == {
+        'phone': '+7 (495) 123-45-67', 'email': 'info@example.ru', 'certificate': None}
+
+
+def test_value_on_the_next_line():
+    fields = extract('Номер телефона\n+7 (495) 123-45-67\nАдрес электронной почты:\n\ninfo@example.ru')
+
+    assert fields['phone'] == '+7 (495) 123-45-67'
+    assert fields['email'] == 'info@example.ru'
+
+
+def test_value_on_the_next_page():
+    assert extract('Номер телефона', '+7 (495) 123-45-67')['phone'] == '+7 (495) 123-45-67'
+
+
+def test_missing_value_is_not_replaced_by_the_next_line():
+    fields = extract('Номер телефона\nАдрес электронной почты\nfoo@bar.ru')
+
+    assert fields['phone'] is None
+    assert fields['email'] == 'foo@bar.ru'
+
+
+def test_field_without_a_value_can_be_found_at_a_later_label():
+    fields = extract('Номер телефона\nне указан\nКонтакты. Номер телефона +7 (495) 123-45-67')
+
+    assert fields['phone'] == '+7 (495) 123-45-67'
+
+
+def test_certificate_number():
+    assert extract('Декларация ЕАЭС N RU Д-CN.РА01.В.12345/23 от 01.01.2023')['certificate'] == \
+        'ЕАЭС N RU Д-CN.РА01.В.12345/23'
+
+
+@pytest.mark.parametrize('text', ['', 'Номер телефона', 'Адрес электронной почты: не указан'])
+def test_absent_fields_are_none(text):
+    assert extract(text) == {'phone': None, 'email': None, 'certificate': None}
+
+
+def test_pages_are_not_read_after_all_fields_are_found():
+    read = []
+
+    def pages():
+        for text in ('Номер телефона +7 (495) 123-45-67\nАдрес электронной почты info@example.ru\n'
+                     'ЕАЭС N RU Д-CN.РА01.В.12345/23', 'лишняя страница'):
+            read.append(text)
+            yield text
+
+    EXTRACTOR.extract(pages())
+    assert len(read) == 1
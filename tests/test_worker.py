@@ -0,0 +1,38 @@
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from bench.corpus import build_certificate, certificate_contacts
+from job_queue import JobQueue
+from work_with_pdf import create_extraction_pool
+
+pytest.importorskip('selenium')
+from worker import JobWorker  # noqa: E402
+
+
+class NoBrowserPool:
+    """Пул браузеров, который в тесте не нужен"""
+
+    def abort(self, owner: object) -> None:
+        pass
+
+
+def test_extraction_survives_a_pool_broken_by_another_file(log, tmp_path):
+    pdf_file = os.path.join(tmp_path, '100.pdf')
+    with open(pdf_file, 'wb') as file:
+        file.write(build_certificate(100, pages=1))
+
+    queue = JobQueue(path_to_db=os.path.join(tmp_path, 'jobs.sqlite3'))
+    worker = JobWorker(custom_logger=log, queue=queue, pool=NoBrowserPool(), threads=1)
+    worker._executor = create_extraction_pool(1)
+    try:
+        # Процесс разбора падает на другом файле, и пул больше не принимает задачи
+        with pytest.raises(BrokenProcessPool):
+            worker._executor.submit(os._exit, 1).result()
+
+        extracted = worker._extract('url', pdf_file)
+        assert (extracted.phone, extracted.email) == certificate_contacts(100)
+    finally:
+        worker._executor.shutdown()
+        queue.close()
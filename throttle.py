@@ -0,0 +1,233 @@
+import random
+import threading
+from concurrent.futures import CancelledError
+from contextlib import nullcontext
+from time import monotonic, sleep
+from typing import Any, Callable, ContextManager
+
+from _metrics import METRICS
+from config import CONFIG
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """
+    Пауза перед повтором: экспонента со случайным разбросом (full jitter), чтобы потоки не повторяли запросы разом
+
+    :param attempt: Номер неудачной попытки, начиная с 0
+    :param base_delay: Пауза после первой неудачи (в секундах)
+    :param max_delay: Максимальная пауза (в секундах)
+    """
+
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+class TokenBucket:
+    """Общее ограничение частоты запросов для всех потоков"""
+
+    def __init__(self, rate: float, capacity: float = None) -> None:
+        """
+        Инициализация параметров
+
+        :param rate: Запросов в секунду. 0 или None - без ограничения
+        :param capacity: Сколько запросов можно сделать разом после простоя. По умолчанию rate
+        """
+
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate or 1.0)
+        self._tokens = self.capacity
+        self._updated = monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Ожидание разрешения на один запрос
+
+        :return: Время ожидания (в секундах)
+        """
+
+        if not self.rate:
+            return 0.0
+
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+
+            sleep(delay)
+            waited += delay
+
+
+class AIMDLimiter:
+    """
+    Количество одновременных задач, подстраиваемое под сайт: по окну из window результатов
+    лимит растёт на 1, если задержка и доля ошибок в норме, и уменьшается в decrease_factor раз, если нет
+    """
+
+    def __init__(self, initial: int, min_limit: int, max_limit: int, target_latency: float, max_error_rate: float,
+                 window: int, decrease_factor: float = 0.5, custom_logger: object = None) -> None:
+        """
+        Инициализация параметров
+
+        :param initial: Начальный лимит
+        :param min_limit: Минимальный лимит
+        :param max_limit: Максимальный лимит
+        :param target_latency: Допустимая задержка 90% задач (в секундах)
+        :param max_error_rate: Допустимая доля ошибок
+        :param window: Количество результатов, по которым принимается решение
+        :param decrease_factor: Во сколько раз уменьшается лимит при перегрузке
+        :param custom_logger: Объект логгера
+        """
+
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = max(min_limit, min(initial, max_limit))
+        self.target_latency = target_latency
+        self.max_error_rate = max_error_rate
+        self.window = window
+        self.decrease_factor = decrease_factor
+        self.log = custom_logger
+
+        self._active = 0
+        self._samples = []
+        self._condition = threading.Condition()
+
+    def acquire(self) -> None:
+        """Ожидание свободного места в пределах текущего лимита"""
+
+        with self._condition:
+            while self._active >= self.limit:
+                self._condition.wait()
+            self._active += 1
+
+    def release(self, latency: float = None, ok: bool = True) -> None:
+        """
+        Освобождение места с учётом результата задачи
+
+        :param latency: Длительность задачи (в секундах). None - задача не запускалась и в окно не попадает
+        :param ok: Задача выполнена без ошибок
+        """
+
+        with self._condition:
+            self._active -= 1
+            if latency is not None:
+                self._samples.append((latency, ok))
+                if len(self._samples) >= self.window:
+                    self._adjust()
+            self._condition.notify_all()
+
+    def _adjust(self) -> None:
+        """Пересчёт лимита по накопленному окну (вызывается под блокировкой)"""
+
+        latencies = sorted(latency for latency, _ in self._samples)
+        p90 = latencies[max(0, int(len(latencies) * 0.9) - 1)]
+        error_rate = sum(1 for _, ok in self._samples if not ok) / len(self._samples)
+        self._samples.clear()
+
+        old_limit = self.limit
+        if error_rate > self.max_error_rate or p90 > self.target_latency:
+            self.limit = max(self.min_limit, int(self.limit * self.decrease_factor))
+        else:
+            self.limit = min(self.max_limit, self.limit + 1)
+
+        if self.limit != old_limit:
+            METRICS.incr('throttle.limit_change', self.limit - old_limit, limit=self.limit, p90=round(p90, 3),
+                         error_rate=round(error_rate, 3))
+            if self.log:
+                self.log.info(f'Лимит одновременных товаров: {old_limit} -> {self.limit} '
+                              f'(p90 {p90:.1f} с, ошибок {error_rate:.0%})')
+
+
+class Throttle:
+    """Общий регулятор для обработчиков товаров: лимит AIMD, частота запросов и повторы с паузами"""
+
+    def __init__(self, custom_logger: object = None, initial: int = None, max_limit: int = None,
+                 bucket: TokenBucket = None, attempts: int = None) -> None:
+        """
+        Инициализация параметров (значения по умолчанию берутся из config.py)
+
+        :param custom_logger: Объект логгера
+        :param initial: Начальное количество одновременных задач
+        :param max_limit: Максимальное количество одновременных задач
+        :param bucket: Общее ограничение частоты запросов. По умолчанию создаётся своё
+        :param attempts: Количество попыток для одной задачи
+        """
+
+        self.log = custom_logger
+        self.limiter = AIMDLimiter(initial=initial or CONFIG['workers'], min_limit=CONFIG['workers_min'],
+                                   max_limit=max_limit or CONFIG['workers_max'],
+                                   target_latency=CONFIG['throttle_target_latency'],
+                                   max_error_rate=CONFIG['throttle_max_error_rate'],
+                                   window=CONFIG['throttle_window'], custom_logger=custom_logger)
+        self.bucket = bucket or TokenBucket(rate=CONFIG['requests_per_second'])
+        self.attempts = attempts or CONFIG['product_retries']
+
+    def share(self, initial: int, max_limit: int, attempts: int = None) -> 'Throttle':
+        """
+        Регулятор для другого вида задач: свой лимит одновременных задач, но общая с этим регулятором частота запросов
+
+        :param initial: Начальное количество одновременных задач
+        :param max_limit: Максимальное количество одновременных задач
+        :param attempts: Количество попыток для одной задачи
+        """
+
+        return Throttle(custom_logger=self.log, initial=initial, max_limit=max_limit, bucket=self.bucket,
+                        attempts=attempts)
+
+    def _attempt(self, func: Callable[[], Any], cancelled: Callable[[], bool] = None,
+                 untimed: Callable[[], ContextManager] = None) -> Any:
+        """Одна попытка в пределах лимита и частоты запросов"""
+
+        # Ожидание места и разрешения на запрос - это очередь, а не работа задачи: в task_timeout не входит
+        with untimed() if untimed else nullcontext():
+            self.limiter.acquire()
+            try:
+                self.bucket.acquire()
+            except BaseException:
+                self.limiter.release()
+                raise
+
+        # Задачу отменили, пока она ждала: браузер для неё уже не нужен
+        if cancelled and cancelled():
+            self.limiter.release()
+            raise CancelledError('Задача отменена до начала выполнения')
+
+        started = monotonic()
+        ok = False
+        try:
+            result = func()
+            ok = True
+            return result
+        finally:
+            self.limiter.release(monotonic() - started, ok)
+
+    def call(self, func: Callable[[], Any], name: str = '', cancelled: Callable[[], bool] = None,
+             untimed: Callable[[], ContextManager] = None) -> Any:
+        """
+        Выполнение задачи с повторами после ошибок
+
+        :param func: Задача без аргументов
+        :param name: Название задачи для лога
+        :param cancelled: Проверка, что задача отменена и запускать или повторять её не нужно
+        :param untimed: Блок, время которого не входит в таймаут задачи (WorkerScheduler.untimed)
+        :return: Результат задачи
+        """
+
+        for attempt in range(self.attempts):
+            try:
+                return self._attempt(func, cancelled=cancelled, untimed=untimed)
+            except Exception as ex_attempt:
+                if attempt == self.attempts - 1 or (cancelled and cancelled()):
+                    raise
+
+                delay = backoff_delay(attempt, CONFIG['retry_base_delay'], CONFIG['retry_max_delay'])
+                METRICS.incr('throttle.retry', task=name)
+                if self.log:
+                    self.log.info(f'Попытка {attempt + 1} для {name} не удалась, повтор через {delay:.1f} с. '
+                                  f'Ошибка:\n{ex_attempt}')
+                sleep(delay)
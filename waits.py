@@ -0,0 +1,249 @@
+from time import monotonic
+from typing import Any, Callable
+
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException, TimeoutException
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+from _metrics import METRICS
+from config import CONFIG
+
+# Количество ресурсов, загруженных с прошлой проверки. Буфер очищается на каждой проверке,
+# иначе он упирается в лимит браузера (250 записей) и перестаёт расти
+NETWORK_STATE_SCRIPT = """
+const resources = performance.getEntriesByType('resource').length;
+performance.clearResourceTimings();
+return [document.readyState, resources];
+"""
+# Один шаг прокрутки и состояние страницы за один вызов: количество карточек, высота страницы, достигнут ли низ
+SCROLL_STEP_SCRIPT = """
+window.scrollBy(0, arguments[1]);
+const height = document.documentElement.scrollHeight;
+return [document.querySelectorAll(arguments[0]).length, height,
+        window.scrollY + window.innerHeight >= height - 2];
+"""
+
+
+def new_window_opened(handles_before: list) -> Callable[[object], str | bool]:
+    """
+    Условие: открылась новая вкладка
+
+    :param handles_before: Список вкладок до действия
+    :return: Дескриптор новой вкладки или False
+    """
+
+    def _predicate(driver) -> str | bool:
+        new_handles = [handle for handle in driver.window_handles if handle not in handles_before]
+        return new_handles[0] if new_handles else False
+
+    return _predicate
+
+
+def network_idle(idle_time: float) -> Callable[[object], bool]:
+    """
+    Условие: страница загружена и новые ресурсы не запрашивались в течение idle_time секунд
+
+    :param idle_time: Время тишины в сети (в секундах)
+    """
+
+    state = {'since': monotonic()}
+
+    def _predicate(driver) -> bool:
+        ready_state, new_resources = driver.execute_script(NETWORK_STATE_SCRIPT)
+        now = monotonic()
+        if ready_state != 'complete' or new_resources:
+            state['since'] = now
+            return False
+        return now - state['since'] >= idle_time
+
+    return _predicate
+
+
+def cards_loaded(selector: str, expected: int, step: int, settle_time: float,
+                 state: dict = None) -> Callable[[object], bool]:
+    """
+    Условие: прокрутка дошла до конца страницы и карточки перестали подгружаться.
+    На каждой проверке страница прокручивается на step пикселей
+
+    :param selector: CSS селектор карточки
+    :param expected: Ожидаемое количество карточек (0 - не ограничено)
+    :param step: Шаг прокрутки (в пикселях)
+    :param settle_time: Сколько количество карточек и высота страницы не должны меняться (в секундах)
+    :param state: Словарь, в который записывается последнее количество карточек
+    """
+
+    state = {} if state is None else state
+    state.update(count=0, height=None, since=monotonic())
+
+    def _predicate(driver) -> bool:
+        count, height, at_bottom = driver.execute_script(SCROLL_STEP_SCRIPT, selector, step)
+        now = monotonic()
+        if expected and count >= expected:
+            state['count'] = count
+            return True
+        if count != state['count'] or height != state['height'] or not at_bottom:
+            state.update(count=count, height=height, since=now)
+            return False
+        return now - state['since'] >= settle_time
+
+    return _predicate
+
+
+def page_changed(old_element: object | None, old_url: str) -> Callable[[object], bool]:
+    """
+    Условие: после перехода на другую страницу старое содержимое ушло из DOM.
+    Пока старый элемент на месте, страница считается прежней, даже если адрес уже поменялся
+
+    :param old_element: Элемент старой страницы (например, первая карточка) или None
+    :param old_url: Адрес страницы до перехода
+    """
+
+    def _predicate(driver) -> bool:
+        if old_element is None:
+            return driver.current_url != old_url
+        try:
+            old_element.is_enabled()
+        except StaleElementReferenceException:
+            return True
+        return False
+
+    return _predicate
+
+
+def text_changed(root: object, locator: tuple, old_text: str) -> Callable[[object], str | bool]:
+    """
+    Условие: текст элемента изменился (например, обновился список фильтров)
+
+    :param root: Элемент или драйвер, внутри которого ищется элемент
+    :param locator: Локатор элемента
+    :param old_text: Текст элемента до действия
+    :return: Новый текст или False
+    """
+
+    def _predicate(_driver) -> str | bool:
+        try:
+            text = root.find_element(*locator).text
+        except (NoSuchElementException, StaleElementReferenceException):
+            return False
+        return text if text != old_text else False
+
+    return _predicate
+
+
+def element_clickable_in(root: object, locator: tuple) -> Callable[[object], Any]:
+    """
+    Условие: элемент внутри root видим и доступен для клика
+
+    :param root: Элемент, внутри которого ищется элемент
+    :param locator: Локатор элемента
+    :return: Элемент или False
+    """
+
+    def _predicate(_driver) -> Any:
+        try:
+            element = root.find_element(*locator)
+        except (NoSuchElementException, StaleElementReferenceException):
+            return False
+        return element if element.is_displayed() and element.is_enabled() else False
+
+    return _predicate
+
+
+class Waiter:
+    """Ожидание явных условий на странице вместо фиксированных пауз"""
+
+    def __init__(self, driver: object, timeout: float = None, poll_interval: float = None) -> None:
+        """
+        Инициализация параметров
+
+        :param driver: Объект webdriver
+        :param timeout: Время ожидания по умолчанию (в секундах)
+        :param poll_interval: Интервал проверки условия (в секундах)
+        """
+
+        self.driver = driver
+        self.timeout = CONFIG['wait_timeout'] if timeout is None else timeout
+        self.poll_interval = CONFIG['wait_poll_interval'] if poll_interval is None else poll_interval
+
+    def until(self, condition: Callable[[object], Any], timeout: float = None, message: str = '') -> Any:
+        """
+        Ожидание выполнения условия
+
+        :param condition: Условие, принимающее драйвер
+        :param timeout: Время ожидания (в секундах)
+        :param message: Текст ошибки TimeoutException
+        :return: Результат условия
+        """
+
+        wait = WebDriverWait(self.driver, timeout=self.timeout if timeout is None else timeout,
+                             poll_frequency=self.poll_interval,
+                             ignored_exceptions=(StaleElementReferenceException,))
+        return wait.until(condition, message)
+
+    def present(self, locator: tuple, timeout: float = None) -> object:
+        """Ожидание появления элемента в DOM"""
+
+        return self.until(EC.presence_of_element_located(locator), timeout, f'Не появился элемент {locator}')
+
+    def visible(self, locator: tuple, timeout: float = None) -> object:
+        """Ожидание появления видимого элемента (например, всплывающего окна)"""
+
+        return self.until(EC.visibility_of_element_located(locator), timeout, f'Не отобразился элемент {locator}')
+
+    def clickable(self, locator: tuple, root: object = None, timeout: float = None) -> object:
+        """Ожидание доступности элемента для клика"""
+
+        condition = EC.element_to_be_clickable(locator) if root is None else element_clickable_in(root, locator)
+        return self.until(condition, timeout, f'Элемент {locator} не стал доступен для клика')
+
+    def new_window(self, handles_before: list, timeout: float = None) -> str:
+        """Ожидание открытия новой вкладки"""
+
+        return self.until(new_window_opened(handles_before), timeout, 'Не открылась новая вкладка')
+
+    def network_idle(self, idle_time: float = None, timeout: float = None) -> bool:
+        """
+        Ожидание окончания загрузки страницы и сетевых запросов. Ожидание не обязательное: на страницах
+        с постоянными запросами (счётчики, трекеры) тишины может не быть, поэтому по таймауту ошибки нет
+
+        :return: True, если сеть затихла до таймаута
+        """
+
+        idle_time = CONFIG['network_idle_time'] if idle_time is None else idle_time
+        try:
+            return self.until(network_idle(idle_time), timeout, 'Страница не перестала загружать ресурсы')
+        except TimeoutException:
+            METRICS.incr('wait.network_busy')
+            return False
+
+    def cards_loaded(self, selector: str, expected: int = 0, step: int = None, settle_time: float = None,
+                     timeout: float = None) -> tuple[int, bool]:
+        """
+        Прокрутка страницы, пока подгружаются карточки
+
+        :return: Количество загруженных карточек и признак того, что загрузка закончилась до таймаута
+        """
+
+        step = CONFIG['scroll_step'] if step is None else step
+        settle_time = CONFIG['scroll_settle_time'] if settle_time is None else settle_time
+        timeout = CONFIG['scroll_timeout'] if timeout is None else timeout
+
+        state = {}
+        try:
+            self.until(cards_loaded(selector, expected, step, settle_time, state), timeout,
+                       f'Карточки {selector} не перестали подгружаться')
+        except TimeoutException:
+            return state['count'], False
+
+        return state['count'], True
+
+    def page_changed(self, old_element: object | None, old_url: str, timeout: float = None) -> bool:
+        """Ожидание смены страницы: старый элемент пропал из DOM (или сменился адрес, если элемента нет)"""
+
+        return self.until(page_changed(old_element, old_url), timeout, 'Страница не сменилась')
+
+    def text_changed(self, locator: tuple, old_text: str, root: object = None, timeout: float = None) -> str:
+        """Ожидание изменения текста элемента (например, обновления списка фильтров)"""
+
+        return self.until(text_changed(root or self.driver, locator, old_text), timeout,
+                          f'Не изменился текст элемента {locator}')
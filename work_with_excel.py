@@ -1,55 +1,79 @@
 import os
+import threading
 
 import openpyxl
-import pandas as pd
 
+from _metrics import METRICS
 from other import create_folder
 
 
-def auto_size_excel_file(path_to_file: str) -> None:
-    """Автоширина ячеек в Excel"""
-
-    wb = openpyxl.load_workbook(path_to_file)
-    ws = wb.active
-    for column in ws.columns:
-        max_length = 0
-        column = [cell for cell in column]
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(cell.value)
-            except:
-                pass
-        adjusted_width = (max_length + 2)
-        ws.column_dimensions[openpyxl.utils.get_column_letter(column[0].column)].width = adjusted_width
-    wb.save(path_to_file)
-
-
-def write_data_to_excel_wireBank(data: list) -> None:
-    """
-    Создание Excel файла
-
-    :param data: данные
-    :return:
-    """
-
-    number_phone = data[0]
-    user_email = data[1]
-
-    path_to_excel = os.path.join(os.getcwd(), 'result')
-    create_folder(path_to_folder=path_to_excel)
-
-    all_data = {
-        'Номер телефона': [number_phone],
-        'Почта': [user_email]
-    }
-    path_to_file = os.path.join(path_to_excel, 'result.xlsx')
-    new_df = pd.DataFrame(all_data)
-    try:
-        df = pd.read_excel(path_to_file)
-        df = pd.concat([df, new_df], ignore_index=True)
-    except FileNotFoundError:
-        df = new_df
-    df.to_excel(path_to_file, index=False)
-    auto_size_excel_file(path_to_file=path_to_file)
+class ExcelReportWriter:
+    """Запись отчёта в Excel: строки добавляются в книгу в памяти, файл сохраняется один раз при закрытии"""
 
+    DEFAULT_COLUMNS = ('Номер телефона', 'Почта')
+
+    def __init__(self, path_to_file: str = None, columns: tuple = DEFAULT_COLUMNS) -> None:
+        """
+        Инициализация параметров
+
+        :param path_to_file: Путь до файла отчёта. По умолчанию result/result.xlsx. Существующий файл заменяется
+        :param columns: Названия колонок
+        """
+
+        if path_to_file is None:
+            path_to_excel = os.path.join(os.getcwd(), 'result')
+            create_folder(path_to_folder=path_to_excel)
+            path_to_file = os.path.join(path_to_excel, 'result.xlsx')
+
+        self.path_to_file = path_to_file
+        self.columns = list(columns)
+        self.rows = 0
+
+        self._workbook = openpyxl.Workbook()
+        self._widths = {}
+        self._lock = threading.Lock()
+        self._workbook.active.append(self.columns)
+        self._update_widths(self.columns)
+
+    def _update_widths(self, row: list) -> None:
+        """Пересчёт ширины колонок только по новой строке"""
+
+        for index, value in enumerate(row, start=1):
+            if value is not None:
+                self._widths[index] = max(self._widths.get(index, 0), len(str(value)))
+
+    def add_row(self, row: list | tuple | dict) -> None:
+        """
+        Добавление строки в отчёт
+
+        :param row: Значения в порядке колонок или словарь {колонка: значение}
+        """
+
+        if isinstance(row, dict):
+            row = [row.get(column) for column in self.columns]
+
+        with self._lock:
+            self._workbook.active.append(list(row))
+            self._update_widths(row)
+            self.rows += 1
+
+    def close(self) -> None:
+        """Проставление ширины колонок и сохранение отчёта"""
+
+        with self._lock:
+            if self._workbook is None:
+                return
+
+            with METRICS.span('report.save', rows=self.rows):
+                ws = self._workbook.active
+                for index, max_length in self._widths.items():
+                    ws.column_dimensions[openpyxl.utils.get_column_letter(index)].width = max_length + 2
+                self._workbook.save(self.path_to_file)
+            self._workbook.close()
+            self._workbook = None
+
+    def __enter__(self) -> 'ExcelReportWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
@@ -1,9 +1,104 @@
+import logging
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from time import perf_counter
+from typing import Iterable
+
 import fitz
 
 
+@dataclass(frozen=True)
+class FieldPattern:
+    """Описание поля сертификата: регулярное выражение подписи и значения"""
+
+    name: str
+    label: re.Pattern
+    value: re.Pattern
+
+
+# Увеличивается при любом изменении правил разбора, чтобы сбросить кеш результатов
+EXTRACTOR_VERSION = 3
+
+PHONE_PATTERN = re.compile(r'\+?\d[\d\s()\-]{5,}\d')
+EMAIL_PATTERN = re.compile(r'[\w.+\-]+@[\w\-]+(?:\.[\w\-]+)+')
+# Регистрационный номер сертификата или декларации: ЕАЭС N RU Д-CN.РА01.В.12345/23, РОСС RU С-CN.АЯ46.В.01234/21
+CERTIFICATE_PATTERN = re.compile(r'(?:ЕАЭС|РОСС)\s+(?:N\s*|№\s*)?RU\s+[СДC]-[\w.]+/\d{2}')
+
+DEFAULT_FIELDS = (
+    FieldPattern(name='phone', label=re.compile(r'номер\s+телефона', re.IGNORECASE), value=PHONE_PATTERN),
+    FieldPattern(name='email', label=re.compile(r'адрес\s+электронной\s+почты', re.IGNORECASE), value=EMAIL_PATTERN),
+    # У номера документа нет общей подписи, поэтому подписью служит начало самого номера
+    FieldPattern(name='certificate', label=re.compile(r'(?=(?:ЕАЭС|РОСС)\s)'), value=CERTIFICATE_PATTERN),
+)
+
+
+class FieldExtractor:
+    """Извлечение всех полей за один проход по тексту с остановкой, как только найдены все поля"""
+
+    def __init__(self, fields: Iterable[FieldPattern] = DEFAULT_FIELDS) -> None:
+        """
+        Инициализация параметров
+
+        :param fields: Описания полей
+        """
+
+        self.fields = tuple(fields)
+
+    def extract(self, pages: Iterable[str]) -> dict:
+        """
+        Поиск значений полей в тексте страниц. Значение ищется в той же строке после подписи,
+        а если там пусто - в следующей строке. Строка, не подходящая под шаблон значения, значением не считается
+
+        :param pages: Тексты страниц. Читаются лениво и не дочитываются, если все поля уже найдены
+        :return: Словарь {имя поля: значение или None}
+        """
+
+        found = {field.name: None for field in self.fields}
+        remaining = list(self.fields)
+        # Поля, подпись которых стоит отдельной строкой: значение ожидается в следующей строке
+        awaiting = []
+
+        for page_text in pages:
+            for line in page_text.split('\n'):
+                line = line.strip()
+                if not line:
+                    continue
+
+                # Следующая строка без подходящего значения (например, подпись другого поля) значением не считается:
+                # поле остаётся ненайденным и может найтись у следующей подписи
+                for field in awaiting:
+                    match = field.value.search(line)
+                    if match:
+                        found[field.name] = match.group(0)
+                        remaining.remove(field)
+                awaiting = []
+
+                for field in list(remaining):
+                    label = field.label.search(line)
+                    if not label:
+                        continue
+
+                    tail = line[label.end():]
+                    match = field.value.search(tail)
+                    if match:
+                        found[field.name] = match.group(0)
+                        remaining.remove(field)
+                    elif not tail.strip(' :\t'):
+                        awaiting.append(field)
+
+                if not remaining:
+                    return found
+
+        return found
+
+
 class PDF:
     """Класс для работы с PDF"""
 
+    EXTRACTOR = FieldExtractor()
+
     def __init__(self, log: object, path_to_file: str) -> None:
         """
         Инициализация параметров
@@ -13,49 +108,39 @@ class PDF:
 
         self.log = log
         self.path_to_file = path_to_file
-        self.text = self._get_text_pdf()
-
-    def _get_text_pdf(self) -> list | None:
-        """Получение текста из PDF документа"""
+        self.fields = self._get_fields_pdf()
 
-        pdf_text = ''
+    def _get_fields_pdf(self) -> dict | None:
+        """Постраничное чтение PDF документа до тех пор, пока не найдены все поля"""
 
         try:
             with fitz.open(self.path_to_file) as doc:
-                for page_num in range(len(doc)):
-                    page = doc.load_page(page_num)
-                    pdf_text += page.get_text()
+                return self.EXTRACTOR.extract(page.get_text() for page in doc)
 
         except Exception as ex_read_pdf:
             self.log.info(f'Произошла непредвиденная ошибка при чтении PDF файла! Ошибка:\n{ex_read_pdf}')
 
             return None
 
-        return pdf_text.split('\n')
-
-    def _find_value_by_key(self, key) -> str | None:
-        """Находит значение по ключу в тексте"""
-
-        for idx, data in enumerate(self.text):
-            if data.lower() == key.lower():
-                return self.text[idx + 1]
-
-        return None
-
     def _get_number(self) -> str | None:
         """Получение номера телефона"""
 
-        return self._find_value_by_key('номер телефона')
+        return self.fields.get('phone')
 
     def _get_email(self) -> str | None:
         """Получение email"""
 
-        return self._find_value_by_key('адрес электронной почты')
+        return self.fields.get('email')
+
+    def get_certificate_number(self) -> str | None:
+        """Получение регистрационного номера сертификата или декларации"""
+
+        return ' '.join(self.fields['certificate'].split()) if self.fields and self.fields.get('certificate') else None
 
     def get_data(self) -> tuple | None:
         """Получение данных из PDF"""
 
-        if self.text:
+        if self.fields is not None:
             number_phone = self._get_number()
             user_email = self._get_email()
 
@@ -65,3 +150,63 @@ class PDF:
             self.log.info('Не смог получить данные из PDF файла!')
 
             return None, None
+
+
+@dataclass
+class ExtractionResult:
+    """Результат разбора одного PDF файла"""
+
+    path_to_file: str
+    phone: str | None = None
+    email: str | None = None
+    certificate: str | None = None
+    error: str | None = None
+    seconds: float = 0.0
+
+
+def extract_file(path_to_file: str) -> ExtractionResult:
+    """
+    Разбор одного PDF файла. Функция верхнего уровня, чтобы её можно было запускать в пуле процессов
+
+    :param path_to_file: Полный путь до PDF файла
+    :return: Результат разбора с временем разбора
+    """
+
+    started = perf_counter()
+    try:
+        _pdf = PDF(log=logging.getLogger(__name__), path_to_file=path_to_file)
+        if _pdf.fields is None:
+            result = ExtractionResult(path_to_file=path_to_file, error='Не смог получить текст из PDF файла')
+        else:
+            number_phone, user_email = _pdf.get_data()
+            result = ExtractionResult(path_to_file=path_to_file, phone=number_phone, email=user_email,
+                                      certificate=_pdf.get_certificate_number())
+
+    except Exception as ex_extract:
+        result = ExtractionResult(path_to_file=path_to_file, error=repr(ex_extract))
+
+    result.seconds = perf_counter() - started
+    return result
+
+
+def create_extraction_pool(workers: int = None) -> ProcessPoolExecutor:
+    """
+    Пул процессов для разбора PDF. По умолчанию по одному процессу на ядро
+
+    :param workers: Количество процессов
+    """
+
+    return ProcessPoolExecutor(max_workers=workers or os.cpu_count())
+
+
+def extract_files(paths: list, workers: int = None) -> list[ExtractionResult]:
+    """
+    Параллельный разбор списка PDF файлов
+
+    :param paths: Пути до PDF файлов
+    :param workers: Количество процессов
+    :return: Результаты в порядке входного списка
+    """
+
+    with create_extraction_pool(workers) as executor:
+        return list(executor.map(extract_file, paths))
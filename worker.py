@@ -0,0 +1,247 @@
+import argparse
+import os
+import socket
+import threading
+from concurrent.futures import CancelledError
+from concurrent.futures.process import BrokenProcessPool
+
+from _logger import CustomLogger
+from _metrics import METRICS
+from browser_pool import BrowserPool
+from cert_fetcher import CertificateFetcher
+from config import CONFIG
+from job_queue import JobQueue, JobResult, JobStatus
+from pars_data_product import WildberriesProduct
+from scheduler import TaskResult, WorkerScheduler
+from throttle import Throttle
+from work_with_pdf import ExtractionResult, create_extraction_pool, extract_file
+
+
+class JobWorker:
+    """Обработчик общей очереди: берёт товары в аренду, скачивает сертификат, разбирает PDF и возвращает результат"""
+
+    def __init__(self, custom_logger: object, queue: JobQueue, pool: BrowserPool, fetcher: CertificateFetcher = None,
+                 worker_id: str = None, threads: int = None) -> None:
+        """
+        Инициализация параметров
+
+        :param custom_logger: Объект логгера
+        :param queue: Общая очередь задач
+        :param pool: Пул браузеров
+        :param fetcher: Загрузчик сертификатов по HTTP. Если не передан, все товары открываются в браузере
+        :param worker_id: Идентификатор обработчика. По умолчанию имя машины и номер процесса
+        :param threads: Количество товаров, обрабатываемых одновременно
+        """
+
+        self.log = custom_logger
+        self.queue = queue
+        self.pool = pool
+        self.fetcher = fetcher
+        self.worker_id = worker_id or f'{socket.gethostname()}-{os.getpid()}'
+        self.threads = threads or CONFIG['workers']
+
+        self._active = set()
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(self.threads)
+        self._stop = threading.Event()
+        self._executor = None
+        self.throttle = Throttle(custom_logger=custom_logger, initial=self.threads, max_limit=self.threads)
+        self.http_throttle = self.throttle.share(initial=self.threads, max_limit=self.threads, attempts=1)
+        self.scheduler = WorkerScheduler(func=self._process, workers=self.threads, queue_size=self.threads,
+                                         task_timeout=CONFIG['task_timeout'], custom_logger=custom_logger,
+                                         on_result=self._on_result, on_timeout=pool.abort)
+
+    def _download(self, url: str) -> str | None:
+        """
+        Скачивание сертификата: сначала по HTTP, затем в браузере
+
+        :param url: URL товара
+        :return: Путь до скачанного сертификата или None
+        """
+
+        if self.fetcher:
+            try:
+                fetched = self.http_throttle.call(lambda: self.fetcher.fetch_sync(url, raise_errors=True), name=url,
+                                                  cancelled=lambda: self.scheduler.is_cancelled(url),
+                                                  untimed=lambda: self.scheduler.untimed(url))
+            except Exception:
+                # Ошибка уже записана в лог загрузчиком, товар проверяется в браузере
+                fetched = None
+            if fetched and fetched.resolved:
+                return fetched.path_to_file
+            if fetched and fetched.has_certificate is False:
+                return None
+
+        def attempt() -> str | None:
+            with self.pool.session(owner=url) as session:
+                # Задачу могли отменить, пока она ждала браузер: pool.abort тогда не нашёл её сессию
+                if self.scheduler.is_cancelled(url):
+                    raise CancelledError('Задача отменена до открытия страницы')
+                return WildberriesProduct(custom_logger=self.log, url=url, driver=session.driver,
+                                          download_dir=session.download_dir).get_data()
+
+        return self.throttle.call(attempt, name=url, cancelled=lambda: self.scheduler.is_cancelled(url),
+                                  untimed=lambda: self.scheduler.untimed(url))
+
+    def _extract(self, url: str, pdf_file: str) -> ExtractionResult:
+        """
+        Разбор PDF в пуле процессов. Если пул сломался (процесс разбора упал, возможно на чужом файле),
+        пул пересоздаётся и разбор повторяется один раз
+
+        :param url: URL товара
+        :param pdf_file: Путь до PDF
+        :return: Результат разбора
+        """
+
+        executor = self._executor
+        try:
+            return executor.submit(extract_file, pdf_file).result()
+        except BrokenProcessPool as ex_pool:
+            self.log.info(f'Пул разбора PDF сломался, пересоздаю его! Ошибка:\n{ex_pool!r}')
+            METRICS.incr('pdf.pool_restart', url=url)
+            with self._lock:
+                # Пул мог уже пересоздать другой поток, получивший ту же ошибку
+                if self._executor is executor:
+                    executor.shutdown(wait=False)
+                    self._executor = create_extraction_pool(CONFIG['pdf_workers'])
+                executor = self._executor
+
+        return executor.submit(extract_file, pdf_file).result()
+
+    def _process(self, url: str) -> JobResult:
+        """
+        Обработка одного товара
+
+        :param url: URL товара
+        :return: Результат для очереди
+        """
+
+        pdf_file = self._download(url)
+        if not pdf_file:
+            return JobResult(url=url, status=JobStatus.NO_CERTIFICATE)
+
+        extracted = self._extract(url, pdf_file)
+        METRICS.record('pdf.parse', extracted.seconds, error=extracted.error, url=url, file=pdf_file)
+        if extracted.error:
+            return JobResult(url=url, status=JobStatus.FAILED, path_to_file=pdf_file, error=extracted.error)
+
+        return JobResult(url=url, status=JobStatus.DONE, path_to_file=pdf_file, phone=extracted.phone,
+                         email=extracted.email, certificate=extracted.certificate)
+
+    def _on_result(self, task_result: TaskResult) -> None:
+        """Возврат результата в очередь и освобождение места под следующую задачу"""
+
+        url = task_result.item
+        result = task_result.result if task_result.ok else \
+            JobResult(url=url, status=JobStatus.FAILED, error=repr(task_result.error))
+
+        try:
+            if not self.queue.complete(result, self.worker_id):
+                self.log.info(f'Аренда {url} истекла, результат отброшен')
+                METRICS.incr('jobs.lease_lost', url=url)
+        except Exception as ex_complete:
+            self.log.info(f'Не смог вернуть результат {url} в очередь! Ошибка:\n{ex_complete}')
+        finally:
+            with self._lock:
+                self._active.discard(url)
+            self._slots.release()
+
+    def _renew_leases(self) -> None:
+        """Продление аренды выполняемых задач, пока обработчик жив"""
+
+        while not self._stop.wait(self.queue.lease_seconds / 3):
+            with self._lock:
+                urls = list(self._active)
+            if not urls:
+                continue
+
+            try:
+                self.queue.renew(urls, self.worker_id)
+            except Exception as ex_renew:
+                self.log.info(f'Не смог продлить аренду задач! Ошибка:\n{ex_renew}')
+
+    def _claim(self) -> str | None:
+        """Аренда следующей задачи, когда освободилось место"""
+
+        self._slots.acquire()
+        urls = self.queue.claim(self.worker_id, limit=1)
+        if not urls:
+            self._slots.release()
+            return None
+
+        with self._lock:
+            self._active.update(urls)
+        return urls[0]
+
+    def run(self, follow: bool = False) -> None:
+        """
+        Обработка задач очереди
+
+        :param follow: Ждать новые задачи, даже когда очередь опустела
+        """
+
+        self.log.info(f'Обработчик {self.worker_id} запущен')
+        renewer = threading.Thread(target=self._renew_leases, name='lease-renewer', daemon=True)
+
+        self._executor = create_extraction_pool(CONFIG['pdf_workers'])
+        self.scheduler.start()
+        renewer.start()
+        try:
+            while True:
+                url = self._claim()
+                if url:
+                    self.scheduler.submit(url)
+                    continue
+
+                with self._lock:
+                    busy = bool(self._active)
+                # Пока чужие задачи в аренде, обработчик ждёт: их аренда может истечь
+                if not follow and not busy and self.queue.is_drained():
+                    break
+                if self._stop.wait(CONFIG['job_poll_interval']):
+                    break
+
+        finally:
+            self.scheduler.join()
+            self._stop.set()
+            renewer.join()
+            self._executor.shutdown()
+
+        self.log.info(f'Обработчик {self.worker_id} закончил работу. Очередь: {self.queue.counts()}')
+
+
+def main() -> None:
+    """Запуск обработчика общей очереди. На одной или нескольких машинах можно запустить сколько угодно процессов"""
+
+    parser = argparse.ArgumentParser(description='Обработчик общей очереди товаров Wildberries')
+    parser.add_argument('--queue', default=CONFIG['path_to_job_queue'], help='Путь до базы очереди')
+    parser.add_argument('--threads', type=int, default=CONFIG['workers'], help='Товаров одновременно')
+    parser.add_argument('--worker-id', default=None, help='Идентификатор обработчика')
+    parser.add_argument('--follow', action='store_true', help='Ждать новые задачи после опустошения очереди')
+    args = parser.parse_args()
+
+    worker_id = args.worker_id or f'{socket.gethostname()}-{os.getpid()}'
+    logger = CustomLogger(flow_name=f'worker_{worker_id}', use_queue=CONFIG['log_queue'])
+    log = logger.start_initialization()
+    METRICS.configure(os.path.join(logger.path_to_folder, f'metrics_{worker_id}_{logger.current_day}.jsonl'))
+
+    queue = JobQueue(path_to_db=args.queue)
+    # У каждого процесса своя папка загрузок, чтобы обработчики на одной машине не мешали друг другу
+    pool = BrowserPool(driver_factory=WildberriesProduct.create_driver, size=args.threads,
+                       max_uses=CONFIG['browser_max_uses'], custom_logger=log,
+                       download_root=os.path.join(CONFIG['path_to_downloads'], worker_id))
+    fetcher = CertificateFetcher(custom_logger=log) if CONFIG['cert_fetcher_enabled'] else None
+
+    try:
+        JobWorker(custom_logger=log, queue=queue, pool=pool, fetcher=fetcher, worker_id=worker_id,
+                  threads=args.threads).run(follow=args.follow)
+    finally:
+        pool.close()
+        queue.close()
+        METRICS.log_summary(log)
+        METRICS.close()
+        logger.close_logger()
+
+
+if __name__ == '__main__':
+    main()